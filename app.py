@@ -1,21 +1,233 @@
-from flask import Flask, jsonify, request
-from db import connect_to_db
+import functools
+import hashlib
+import threading
+from flask import Flask, Response, g, jsonify, make_response, request, stream_with_context, url_for
+from config import get_settings
+from db import connect_to_db, unit_of_work
 from repository import (
-    add_user, delete_user, get_user_by_id,
-    add_facility, get_facilities_by_id, delete_facility,
-    delete_reservation, add_reservation)
+    add_user, delete_user, get_user_by_id, get_users_by_ids, get_cached_user, invalidate_user,
+    add_facility, get_facilities_by_id, get_facilities_by_ids, get_cached_facility,
+    find_free_facilities, find_first_free_windows,
+    invalidate_facility, delete_facility,
+    delete_reservation, add_reservation, get_facility_availability,
+    get_filtered_reservations, get_reservation_by_id, iter_reservations,
+    import_users, import_reservations, bulk_update_reservation_status, add_reservation_series,
+    add_queued_reservations, ReservationConflictError, RESERVATION_EXPANSIONS, entity_cache)
+from availability import availability_cache, parse_slot, to_minutes, format_minutes
+from pagination import parse_limit, encode_cursor, id_cursor, start_cursor
+from export import EXPORT_FORMATS, RESERVATION_EXPORT_COLUMNS
+from importer import RESERVATION_STATUSES, import_format, parse_stream
+from recurrence import parse_exclude
+from idempotency import IdempotencyInProgress, IdempotencyKeyReused, StoredResponse, make_store
+from booking_queue import BookingQueue, make_queue_backend
+from metrics import end_request, record_request, render_metrics, start_request
+from profiler import check_query_budget, query_profiler
+from logging_setup import configure_logging
 from datetime import time, date, timedelta, datetime
 
 app = Flask(__name__)
 
+def _connect(read_only=False):
+    # V testovacím režimu (app.config['TESTING']) se vždy použije testovací databáze.
+    return connect_to_db(testing=app.testing, read_only=read_only)
+
+_settings = get_settings()
+configure_logging(_settings)
+idempotency_store = make_store(_settings.idempotency_store, _connect,
+                               _settings.idempotency_ttl, _settings.idempotency_wait_timeout)
+
+def idempotent(view):
+    """
+    Podpora hlavičky Idempotency-Key: opakovaný požadavek se stejným klíčem
+    vrátí původní odpověď a zápis se znovu neprovede. Souběžný duplikát
+    počká na dokončení prvního. Stejný klíč s jiným tělem vrátí 422.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 200:
+            return jsonify({'error': 'Idempotency-Key je příliš dlouhý (max. 200 znaků)'}), 400
+
+        scope = f"{request.method} {request.path} {key}"
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        try:
+            stored = idempotency_store.begin(scope, fingerprint)
+        except IdempotencyKeyReused:
+            return jsonify({'error': 'Idempotency-Key už byl použit pro jiný požadavek'}), 422
+        except IdempotencyInProgress:
+            return jsonify({'error': 'Požadavek se stejným Idempotency-Key ještě probíhá'}), 409
+        if stored is not None:
+            response = Response(stored.body, status=stored.status_code, content_type=stored.content_type)
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            idempotency_store.abort(scope)
+            raise
+        if response.status_code >= 500:
+            # Chybu serveru si neukládáme – klient může požadavek zkusit znovu
+            idempotency_store.abort(scope)
+        else:
+            idempotency_store.complete(scope, StoredResponse(
+                response.status_code, response.get_data(as_text=True), response.content_type))
+        return response
+    return wrapper
+
+_booking_queue = None
+_booking_queue_lock = threading.Lock()
+
+def _process_queued_reservations(bookings):
+    conn = _connect()
+    try:
+        return add_queued_reservations(bookings, conn=conn)
+    finally:
+        conn.close()
+
+def _get_booking_queue():
+    """
+    Fronta asynchronního příjmu rezervací (BOOKING_QUEUE), nebo None, pokud je vypnutá.
+    memory je jen pro jeden proces; s více workery BOOKING_QUEUE=db (stav zná každý worker).
+    """
+    global _booking_queue
+    settings = get_settings(testing=app.testing)
+    if not settings.booking_queue:
+        return None
+    with _booking_queue_lock:
+        if _booking_queue is None:
+            _booking_queue = BookingQueue(
+                make_queue_backend(settings.booking_queue, _connect, settings.booking_queue_retention),
+                _process_queued_reservations,
+                batch_size=settings.booking_queue_batch_size,
+                poll_interval=settings.booking_queue_poll_interval)
+            _booking_queue.start()
+    return _booking_queue
+
+@app.before_request
+def _start_metrics():
+    settings = get_settings(testing=app.testing)
+    if settings.metrics_enabled:
+        g.metrics = start_request()
+        if settings.query_budget:
+            g.metrics.statements = []
+
+@app.after_request
+def _record_metrics(response):
+    stats = g.pop("metrics", None)
+    if stats is not None:
+        # Šablona routy (ne konkrétní URL), aby počet řad metrik zůstal omezený
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        total = record_request(stats, request.method, route, response.status_code)
+        response.headers["Server-Timing"] = stats.server_timing(total)
+        check_query_budget(stats, get_settings(testing=app.testing).query_budget, request.method, route)
+    return response
+
+@app.teardown_request
+def _end_metrics(exc):
+    # Po každém požadavku – i po výjimce, kdy after_request neproběhne, jinak by
+    # počítadla (a seznam dotazů pro QUERY_BUDGET) zůstala vláknu do dalšího požadavku
+    end_request()
+
+def _unit_of_work():
+    # Transakce pro celý požadavek: funkce z repository.py necommitují samy,
+    # vše se zapíše jedním commitem (nebo při chybě vrátí)
+    return unit_of_work(testing=app.testing)
+
+def _serialize(row):
+    # Převod časových objektů (time, date, datetime, timedelta) na řetězce,
+    # včetně vnořených entit z ?expand=
+    for k, v in row.items():
+        if isinstance(v, (time, date, datetime, timedelta)):
+            row[k] = str(v)
+        elif isinstance(v, dict):
+            _serialize(v)
+    return row
+
+def _parse_expand():
+    # ?expand=user,facility – vnořené entity načtené JOINem; neznámý název je ValueError
+    expand = [name.strip() for name in request.args.get("expand", "").split(",") if name.strip()]
+    if any(name not in RESERVATION_EXPANSIONS for name in expand):
+        raise ValueError("Neplatný parametr expand")
+    return tuple(dict.fromkeys(expand))
+
+def _page_limit():
+    # Velikost stránky je vždy omezená – výchozí i maximální hodnota jsou v nastavení
+    settings = get_settings(testing=app.testing)
+    return parse_limit(request.args.get("limit"), settings.page_size_default, settings.page_size_max)
+
+def _page_response(rows, limit, cursor_of):
+    """
+    Vrátí stránku jako JSON seznam. Dotaz načítá limit + 1 řádků – pokud
+    existuje další stránka, přidá token do hlaviček X-Next-Cursor a Link.
+    """
+    next_token = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_token = encode_cursor(cursor_of(rows[-1]))
+
+    response = jsonify([_serialize(row) for row in rows])
+    if next_token:
+        args = {**request.args.to_dict(), "after": next_token, "limit": limit}
+        next_url = url_for(request.endpoint, **(request.view_args or {}), **args)
+        response.headers["X-Next-Cursor"] = next_token
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+def _parse_ids():
+    """
+    Seznam id z parametru ?ids=1,2,3; None, pokud parametr chybí.
+    Počet id je omezený stejně jako velikost stránky. Vyhodí ValueError.
+    """
+    raw = request.args.get("ids")
+    if raw is None:
+        return None
+    ids = [int(part) for part in raw.split(",") if part.strip()]
+    if not ids or len(ids) > get_settings(testing=app.testing).page_size_max:
+        raise ValueError("Neplatný seznam id")
+    return ids
+
+def _batch_response(fetch, ids):
+    # Dávkové čtení – jeden dotaz místo N volání GET /<id>; výsledek je {id: řádek}
+    conn = _connect(read_only=True)
+    rows = fetch(ids, conn=conn)
+    conn.close()
+    return jsonify({str(item_id): _serialize(row) for item_id, row in rows.items()})
+
+def _bulk_import(import_rows):
+    """
+    Hromadný import z těla požadavku (NDJSON nebo CSV, ?format= nebo Content-Type).
+    Tělo se čte proudově a vkládá po dávkách (?batch_size=, jinak IMPORT_BATCH_SIZE);
+    chybné řádky import nepřeruší – vrátí se v reportu.
+    """
+    try:
+        fmt = import_format(request.args.get("format"), request.content_type)
+        batch_size = request.args.get("batch_size", type=int)
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("Neplatná velikost dávky")
+    except ValueError:
+        return jsonify({'error': 'Podporované formáty: ndjson, csv; batch_size musí být kladné číslo'}), 400
+
+    conn = _connect()
+    try:
+        report = import_rows(parse_stream(request.stream, fmt), batch_size=batch_size, conn=conn)
+    finally:
+        conn.close()
+    return jsonify(report.as_dict()), 200
+
 # Metody pro tabulku users
 
 # GET /users/<id> – získání konkrétního uživatele podle ID
 @app.route('/users/<int:user_id>', methods=['GET'])
 def api_get_user_by_id(user_id):
-    conn = connect_to_db()
-    user = get_user_by_id(user_id, conn=conn)
-    conn.close()
+    # Nejčastější dotaz – při zásahu do cache se k databázi nepřipojujeme
+    user = get_cached_user(user_id)
+    if user is None:
+        conn = _connect()
+        user = get_user_by_id(user_id, conn=conn)
+        conn.close()
 
     if user:
         return jsonify(user)
@@ -23,9 +235,24 @@ def api_get_user_by_id(user_id):
         return jsonify({"error": "Uživatel nenalezen"}), 404
 
 # GET /users – výpis uživatelů s možností filtrování přes query parametry
+# Stránkování: ?limit=N&after=<token z hlavičky X-Next-Cursor>, řazení podle id
+# Dávkově: ?ids=1,2,3 vrátí objekt {id: uživatel}, neexistující id chybí
 @app.route('/users', methods=['GET'])
 def api_get_users():
-    conn = connect_to_db()
+    try:
+        ids = _parse_ids()
+    except ValueError:
+        return jsonify({'error': 'Neplatný seznam id'}), 400
+    if ids is not None:
+        return _batch_response(get_users_by_ids, ids)
+
+    try:
+        limit = _page_limit()
+        after = id_cursor(request.args.get("after"))
+    except ValueError:
+        return jsonify({'error': 'Neplatný limit nebo stránkovací token'}), 400
+
+    conn = _connect(read_only=True)
     cursor = conn.cursor(dictionary=True)
 
     base_query = "SELECT * FROM users WHERE 1=1"
@@ -43,15 +270,22 @@ def api_get_users():
             base_query += f" AND {column} = %s"
             values.append(value)
 
+    if after is not None:
+        base_query += " AND id > %s"
+        values.append(after)
+    base_query += " ORDER BY id LIMIT %s"
+    values.append(limit + 1)
+
     cursor.execute(base_query, values)
     users = cursor.fetchall()
 
     conn.close()
-    return jsonify(users)
+    return _page_response(users, limit, lambda row: {"id": row["id"]})
 
 
 # POST /users – přidání uživatele
 @app.route('/users', methods=['POST'])
+@idempotent
 def api_add_user():
     data = request.get_json()
     username = data.get('username')
@@ -62,15 +296,20 @@ def api_add_user():
     if not username or not email or not password:
         return jsonify({'error': 'Chybějící data'}), 400
 
-    conn = connect_to_db()
+    conn = _connect()
     add_user(username, email, password, conn=conn)
     conn.close()
     return jsonify({'message': 'Uživatel přidán'}), 201
 
+# POST /users/bulk – hromadný import uživatelů (NDJSON/CSV se sloupci username, email, password, role)
+@app.route('/users/bulk', methods=['POST'])
+def api_import_users():
+    return _bulk_import(import_users)
+
 # DELETE /users/<id> – smazání uživatele
 @app.route('/users/<int:user_id>', methods=['DELETE'])
 def api_delete_user(user_id):
-    conn = connect_to_db()
+    conn = _connect()
     delete_user(user_id, conn=conn)
     conn.close()
     return jsonify({'message': f'Uživatel {user_id} smazán'}), 200
@@ -86,17 +325,14 @@ def api_update_user(user_id):
     if not username or not email or not password:
         return jsonify({'error': 'Chybějící data'}), 400
 
-    conn = connect_to_db()
-    cursor = conn.cursor()
-
     query = """
     UPDATE users
     SET username = %s, email = %s, password = %s
     WHERE id = %s
     """
-    cursor.execute(query, (username, email, password, user_id))
-    conn.commit()
-    conn.close()
+    with _unit_of_work() as uow:
+        uow.conn.cursor().execute(query, (username, email, password, user_id))
+        uow.on_commit(lambda: invalidate_user(user_id))
 
     return jsonify({'message': f'Uživatel {user_id} aktualizován'}), 200
 
@@ -104,8 +340,6 @@ def api_update_user(user_id):
 @app.route('/users/<int:user_id>', methods=['PATCH'])
 def api_patch_user(user_id):
     data = request.get_json()
-    conn = connect_to_db()
-    cursor = conn.cursor()
 
     updates = []
     values = []
@@ -131,18 +365,32 @@ def api_patch_user(user_id):
 
     values.append(user_id)
     query = f"UPDATE users SET {', '.join(updates)} WHERE id = %s"
-    cursor.execute(query, values)
-    conn.commit()
-    conn.close()
+    with _unit_of_work() as uow:
+        uow.conn.cursor().execute(query, values)
+        uow.on_commit(lambda: invalidate_user(user_id))
 
     return jsonify({"message": f"Uživatel {user_id} byl aktualizován"}), 200
 
 # Metody pro tabulku Facilities
 
 # GET /facilities – výpis sportovist s možností filtrování přes query parametry
+# Stránkování stejně jako u /users (limit, after), řazení podle id; dávkově přes ?ids=
 @app.route('/facilities', methods=['GET'])
 def api_get_facilities():
-    conn = connect_to_db()
+    try:
+        ids = _parse_ids()
+    except ValueError:
+        return jsonify({'error': 'Neplatný seznam id'}), 400
+    if ids is not None:
+        return _batch_response(get_facilities_by_ids, ids)
+
+    try:
+        limit = _page_limit()
+        after = id_cursor(request.args.get("after"))
+    except ValueError:
+        return jsonify({'error': 'Neplatný limit nebo stránkovací token'}), 400
+
+    conn = _connect(read_only=True)
     cursor = conn.cursor(dictionary=True)
 
     base_query = "SELECT * FROM facilities WHERE 1=1"
@@ -158,24 +406,86 @@ def api_get_facilities():
             base_query += f" AND {column} = %s"
             values.append(value)
 
+    if after is not None:
+        base_query += " AND id > %s"
+        values.append(after)
+    base_query += " ORDER BY id LIMIT %s"
+    values.append(limit + 1)
+
     cursor.execute(base_query, values)
     facility = cursor.fetchall()
 
     conn.close()
-    return jsonify(facility)
+    return _page_response(facility, limit, lambda row: {"id": row["id"]})
+
+# GET /facilities/free?date=YYYY-MM-DD&from=18:00&to=20:00 – sportoviště volná po celé okno
+# S ?length=90m vrátí pro každé sportoviště první volné okno dané délky mezi from a to
+@app.route('/facilities/free', methods=['GET'])
+def api_get_free_facilities():
+    try:
+        day = date.fromisoformat(request.args.get('date', ''))
+        start = to_minutes(request.args.get('from', '00:00'))
+        end = to_minutes(request.args.get('to', '24:00'), round_up=True)
+        length = parse_slot(request.args['length']) if request.args.get('length') else None
+        if not 0 <= start < end <= 24 * 60:
+            raise ValueError("Neplatné okno")
+    except ValueError:
+        return jsonify({'error': 'Neplatné datum (YYYY-MM-DD), okno from/to (HH:MM) nebo délka (např. 90m)'}), 400
+
+    conn = _connect(read_only=True)
+    try:
+        if length is None:
+            facility_ids = find_free_facilities(day, start, end, conn=conn)
+        else:
+            windows = find_first_free_windows(day, length, start, end, conn=conn)
+    finally:
+        conn.close()
+
+    result = {"date": str(day), "from": format_minutes(start), "to": format_minutes(end)}
+    if length is None:
+        result["facilities"] = facility_ids
+    else:
+        result["length_minutes"] = length
+        result["windows"] = [
+            {"facility_id": facility_id, "start": format_minutes(s), "end": format_minutes(e)}
+            for facility_id, s, e in windows
+        ]
+    return jsonify(result)
 
 # GET /facilities/<id> – získání konkrétního sportoviště podle ID
 @app.route('/facilities/<int:facility_id>', methods=['GET'])
 def api_get_facility_by_id(facility_id):
-    conn = connect_to_db()
-    facility = get_facilities_by_id(facility_id, conn=conn)
-    conn.close()
+    facility = get_cached_facility(facility_id)
+    if facility is None:
+        conn = _connect()
+        facility = get_facilities_by_id(facility_id, conn=conn)
+        conn.close()
 
     if facility:
-        return jsonify(facility)
+        return jsonify(_serialize(facility))
     else:
         return jsonify({"error": "Uživatel nenalezen"}), 404
 
+# GET /facilities/<id>/availability?date=YYYY-MM-DD&slot=15m – volné termíny sportoviště v daný den
+@app.route('/facilities/<int:facility_id>/availability', methods=['GET'])
+def api_get_facility_availability(facility_id):
+    try:
+        day = date.fromisoformat(request.args.get('date', ''))
+        slot = parse_slot(request.args.get('slot'))
+    except ValueError:
+        return jsonify({'error': 'Neplatné datum (YYYY-MM-DD) nebo délka slotu (např. 15m, 1h)'}), 400
+
+    # Při zásahu do cache se k databázi vůbec nepřipojujeme
+    availability = availability_cache.get(facility_id, day, slot)
+    if availability is None:
+        conn = _connect()
+        availability = get_facility_availability(facility_id, day, slot, conn=conn)
+        conn.close()
+
+    if availability is None:
+        return jsonify({'error': 'Sportoviště nenalezeno'}), 404
+    return jsonify(availability)
+
 # POST /facilities – přidání sportoviště
 @app.route('/facilities', methods=['POST'])
 def api_add_facility():
@@ -187,7 +497,7 @@ def api_add_facility():
     if not name or description is None:
         return jsonify({'error': 'Chybí název nebo popis sportoviště'}), 400
 
-    conn = connect_to_db()
+    conn = _connect()
     add_facility(name, description, available, conn=conn)
     conn.close()
 
@@ -205,12 +515,10 @@ def api_update_facility(facility_id):
     if not name or description is None:
         return jsonify({'error': 'Chybí název nebo popis'}), 400
 
-    conn = connect_to_db()
-    cursor = conn.cursor()
     query = "UPDATE facilities SET name = %s, description = %s, available = %s WHERE id = %s"
-    cursor.execute(query, (name, description, available, facility_id))
-    conn.commit()
-    conn.close()
+    with _unit_of_work() as uow:
+        uow.conn.cursor().execute(query, (name, description, available, facility_id))
+        uow.on_commit(lambda: invalidate_facility(facility_id))
 
     return jsonify({'message': f'Sportoviště {facility_id} bylo aktualizováno'}), 200
 
@@ -222,7 +530,7 @@ def api_patch_facility(facility_id):
     updates = []
     values = []
 
-    for field in ['name', 'location', 'description', 'available']:
+    for field in ['name', 'location', 'description', 'available', 'opening_time', 'closing_time']:
         if field in data:
             updates.append(f"{field} = %s")
             values.append(data[field])
@@ -232,83 +540,122 @@ def api_patch_facility(facility_id):
 
     values.append(facility_id)
 
-    conn = connect_to_db()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        f"UPDATE facilities SET {', '.join(updates)} WHERE id = %s", values
-    )
-    conn.commit()
-    conn.close()
+    with _unit_of_work() as uow:
+        uow.conn.cursor().execute(
+            f"UPDATE facilities SET {', '.join(updates)} WHERE id = %s", values
+        )
+        uow.on_commit(lambda: invalidate_facility(facility_id))
     return jsonify({'message': f'Sportoviště {facility_id} aktualizováno (částečně)'})
 
 # DELETE /facilities/<id> – smazání sportoviště
 @app.route('/facilities/<int:facility_id>', methods=['DELETE'])
 def api_delete_facility(facility_id):
-    conn = connect_to_db()
+    conn = _connect()
     delete_facility(facility_id, conn=conn)
     conn.close()
     return jsonify({'message': f'Sportoviště {facility_id} bylo smazáno'}), 200
 
 # Funkce pro tabulku reservations
 
-# GET /reservations – výpis všech rezervací s možností filtrování
-@app.route('/reservation', methods=['GET'])
-def api_get_reservations():
-    conn = connect_to_db()
-    cursor = conn.cursor(dictionary=True)
-
-    base_query = "SELECT * FROM reservation WHERE 1=1"
-    values = []
-
+def _reservation_filter_args():
+    """
+    Načte filtry rezervací z query parametrů. Data (date, date_from, date_to)
+    ve formátu YYYY-MM-DD, časy (time_from, time_to) ve formátu HH:MM[:SS].
+    Při neplatné hodnotě vyhodí ValueError.
+    """
     filters = {
         "user_id": request.args.get("user_id"),
         "facility_id": request.args.get("facility_id"),
-        "date": request.args.get("date"),
-        "status": request.args.get("status")
+        "status": request.args.get("status"),
+        "series_id": request.args.get("series_id"),
     }
+    for name in ("date", "date_from", "date_to"):
+        value = request.args.get(name)
+        filters[name] = date.fromisoformat(value) if value else None
+    for name in ("time_from", "time_to"):
+        value = request.args.get(name)
+        filters[name] = time.fromisoformat(value) if value else None
+    return filters
 
-    for column, value in filters.items():
-        if value:
-            base_query += f" AND {column} = %s"
-            values.append(value)
-
-    cursor.execute(base_query, values)
-    reservations = cursor.fetchall()
-
-    # Převod časových objektů (time, date, datetime, timedelta) na řetězce
-    for r in reservations:
-        for k, v in r.items():
-            if isinstance(v, (time, date, datetime, timedelta)):
-                r[k] = str(v)
-
+# GET /reservations – výpis všech rezervací s možností filtrování
+# (user_id, facility_id, status, date, rozsahy date_from/date_to a time_from/time_to)
+# Stránkování: limit, after; řazení podle (start_at, id), nebo ?sort=id
+# ?expand=user,facility vnoří uživatele a sportoviště (jeden dotaz s JOINem)
+@app.route('/reservation', methods=['GET'])
+def api_get_reservations():
+    sort = request.args.get("sort", "start_at")
+    try:
+        filters = _reservation_filter_args()
+        limit = _page_limit()
+        after_token = request.args.get("after")
+        after = id_cursor(after_token) if sort == "id" else start_cursor(after_token)
+        expand = _parse_expand()
+    except ValueError:
+        return jsonify({'error': 'Neplatné datum (YYYY-MM-DD), čas (HH:MM), limit, stránkovací token nebo expand'}), 400
+    if sort not in ("start_at", "id"):
+        return jsonify({'error': 'Řadit lze podle start_at nebo id'}), 400
+
+    conn = _connect(read_only=True)
+    reservations = get_filtered_reservations(**filters, limit=limit + 1, after=after, sort=sort,
+                                             expand=expand, conn=conn)
     conn.close()
-    return jsonify(reservations)
 
-# GET /reservations/<id>
+    if sort == "id":
+        return _page_response(reservations, limit, lambda row: {"id": row["id"]})
+    return _page_response(reservations, limit, lambda row: {"start_at": row["start_at"], "id": row["id"]})
+
+# GET /reservation/export?format=ndjson|csv – streamovaný export rezervací (stejné filtry jako výpis)
+@app.route('/reservation/export', methods=['GET'])
+def api_export_reservations():
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Podporované formáty: ndjson, csv'}), 400
+    try:
+        filters = _reservation_filter_args()
+    except ValueError:
+        return jsonify({'error': 'Neplatné datum (YYYY-MM-DD) nebo čas (HH:MM)'}), 400
+
+    render, mimetype = EXPORT_FORMATS[export_format]
+    # Připojení se otevře ještě před odpovědí – uprostřed streamu už chybu vrátit nejde
+    conn = connect_to_db(testing=app.testing, read_only=True)
+    if conn is None:
+        return jsonify({'error': 'Databáze není dostupná'}), 503
+
+    def generate():
+        # Připojení se drží jen po dobu streamování a pak se vrátí do poolu
+        rows = iter_reservations(columns=RESERVATION_EXPORT_COLUMNS, conn=conn, **filters)
+        try:
+            yield from render(rows)
+        finally:
+            rows.close()
+            conn.close()
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=reservations.{export_format}"
+    # Odpověď zavřená dřív, než se generate() spustí (odpojený klient), připojení taky vrátí
+    response.call_on_close(conn.close)
+    return response
+
+# GET /reservations/<id> (?expand=user,facility jako u výpisu)
 @app.route('/reservation/<int:reservation_id>', methods=['GET'])
 def api_get_reservation_by_id(reservation_id):
-    conn = connect_to_db()
-    cursor = conn.cursor(dictionary=True)
-
-    query = "SELECT * FROM reservation WHERE id = %s"
-    cursor.execute(query, (reservation_id,))
-    reservation = cursor.fetchone()
+    try:
+        expand = _parse_expand()
+    except ValueError:
+        return jsonify({'error': 'Neplatný parametr expand (user, facility)'}), 400
 
+    conn = _connect()
+    reservation = get_reservation_by_id(reservation_id, expand=expand, conn=conn)
     conn.close()
 
     if reservation:
-        # Převedeme všechny datetime/time/date/timedelta na string
-        for k, v in reservation.items():
-            if isinstance(v, (date, time, datetime, timedelta)):
-                reservation[k] = str(v)
-
-        return jsonify(reservation)
+        return jsonify(_serialize(reservation))
     else:
         return jsonify({'error': 'Rezervace nenalezena'}), 404
 
 # POST /reservations
 @app.route('/reservations', methods=['POST'])
+@idempotent
 def api_add_reservation():
     data = request.get_json()
 
@@ -319,26 +666,211 @@ def api_add_reservation():
     end_time = data.get('end_time')      # Např. '15:00:00'
     status = data.get('status', 'pending')
 
+    # Místo date + start_time/end_time lze poslat přímo start_at/end_at ('2025-07-01 14:00:00')
+    start_at = data.get('start_at') or (date_ and start_time and f"{date_} {start_time}")
+    end_at = data.get('end_at') or (date_ and end_time and f"{date_} {end_time}")
+
     # Ověření povinných polí
-    if not all([user_id, facility_id, date_, start_time, end_time]):
+    if not all([user_id, facility_id, start_at, end_at]):
         return jsonify({'error': 'Chybějící data'}), 400
 
-    # Spojení date + time do formátu 'YYYY-MM-DD HH:MM:SS'
-    start = f"{date_} {start_time}"
-    end = f"{date_} {end_time}"
+    try:
+        start = datetime.fromisoformat(start_at)
+        end = datetime.fromisoformat(end_at)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Neplatné datum nebo čas'}), 400
+    if end <= start:
+        return jsonify({'error': 'Konec rezervace musí být po jejím začátku'}), 400
+    if not isinstance(status, str) or status not in RESERVATION_STATUSES or status == 'cancelled':
+        return jsonify({'error': f'Neplatný stav: {status}'}), 400
+    try:
+        user_id, facility_id = int(user_id), int(facility_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Neplatné id uživatele nebo sportoviště'}), 400
+
+    # Při zapnuté frontě se rezervace jen zařadí a vloží se dávkově na pozadí
+    # (neexistující uživatele a sportoviště odmítne zpracování dávky)
+    booking_queue = _get_booking_queue()
+    if booking_queue is not None:
+        ticket = booking_queue.submit((user_id, facility_id, start, end, status))
+        status_url = url_for('api_get_queued_reservation', ticket=ticket)
+        response = jsonify({'message': 'Rezervace přijata ke zpracování', 'id': ticket,
+                            'state': 'queued', 'status_url': status_url})
+        response.headers['Location'] = status_url
+        return response, 202
+
+    conn = _connect()
+    try:
+        # Jako u série a importu: neexistující id je 404, ne chyba cizího klíče (obě čtení jdou přes cache)
+        if get_user_by_id(user_id, conn=conn) is None:
+            return jsonify({'error': 'Uživatel nenalezen'}), 404
+        if get_facilities_by_id(facility_id, conn=conn) is None:
+            return jsonify({'error': 'Sportoviště nenalezeno'}), 404
+        reservation_id = add_reservation(user_id, facility_id, start, end, status, conn=conn)
+    except ReservationConflictError as e:
+        return jsonify({
+            'error': 'Termín koliduje s existující rezervací',
+            'conflicts': e.conflicting_ids
+        }), 409
+    finally:
+        conn.close()
+
+    return jsonify({'message': 'Rezervace přidána', 'id': reservation_id}), 201
+
+# GET /reservations/queue/<id> – stav rezervace přijaté frontou (202 z POST /reservations)
+@app.route('/reservations/queue/<ticket>', methods=['GET'])
+def api_get_queued_reservation(ticket):
+    booking_queue = _get_booking_queue()
+    result = booking_queue.status(ticket) if booking_queue is not None else None
+    if result is None:
+        return jsonify({'error': 'Požadavek nenalezen'}), 404
+
+    result['id'] = ticket
+    response = jsonify(result)
+    if result['state'] == 'created':
+        response.headers['Location'] = url_for(
+            'api_get_reservation_by_id', reservation_id=result['reservation_id'])
+    elif result['state'] == 'queued':
+        response.headers['Retry-After'] = '1'
+    return response, 200
+
+# PATCH /reservations/status – hromadná změna stavu jedním UPDATE
+# Tělo: {"status": "confirmed", "ids": [1, 2]} nebo
+#       {"status": "cancelled", "facility_id": 1, "date": "2025-07-01", "current_status": "pending"}
+@app.route('/reservations/status', methods=['PATCH'])
+def api_bulk_update_reservation_status():
+    data = request.get_json() or {}
+    new_status = data.get('status')
+    ids = data.get('ids')
+    if not new_status:
+        return jsonify({'error': 'Chybí cílový stav'}), 400
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        return jsonify({'error': 'ids musí být seznam čísel'}), 400
+    try:
+        day = date.fromisoformat(data['date']) if data.get('date') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Neplatné datum (YYYY-MM-DD)'}), 400
+    facility_id = data.get('facility_id')
+    try:
+        facility_id = int(facility_id) if facility_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Neplatné id sportoviště'}), 400
+    current_status = data.get('current_status')
+    if current_status is not None and (not isinstance(current_status, str)
+                                       or current_status not in RESERVATION_STATUSES):
+        return jsonify({'error': f'Neplatný stav: {current_status}'}), 400
+
+    conn = _connect()
+    try:
+        updated, skipped = bulk_update_reservation_status(
+            new_status, ids=ids, facility_id=facility_id, date=day,
+            status=current_status, conn=conn)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        conn.close()
+    return jsonify({'updated': updated, 'skipped': skipped}), 200
+
+# POST /reservations/series – opakovaná rezervace jedním voláním
+# Tělo jako u POST /reservations + frequency (daily/weekly), interval, until (YYYY-MM-DD)
+# nebo count a exclude (seznam dat, která se přeskočí)
+@app.route('/reservations/series', methods=['POST'])
+def api_add_reservation_series():
+    data = request.get_json() or {}
 
-    conn = connect_to_db()
-    add_reservation(user_id, facility_id, start, end, status, conn=conn)
-    conn.close()
+    user_id = data.get('user_id')
+    facility_id = data.get('facility_id')
+    date_ = data.get('date')
+    start_at = data.get('start_at') or (date_ and data.get('start_time') and f"{date_} {data['start_time']}")
+    end_at = data.get('end_at') or (date_ and data.get('end_time') and f"{date_} {data['end_time']}")
+    frequency = data.get('frequency', 'weekly')
 
-    return jsonify({'message': 'Rezervace přidána'}), 201
+    if not all([user_id, facility_id, start_at, end_at]):
+        return jsonify({'error': 'Chybějící data'}), 400
+
+    try:
+        user_id, facility_id = int(user_id), int(facility_id)
+        start = datetime.fromisoformat(start_at)
+        end = datetime.fromisoformat(end_at)
+        until = date.fromisoformat(data['until']) if data.get('until') else None
+        count = int(data['count']) if data.get('count') is not None else None
+        interval = int(data.get('interval', 1))
+        exclude = parse_exclude(data.get('exclude'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Neplatné id, datum, čas nebo číslo v pravidle opakování'}), 400
+
+    conn = _connect()
+    try:
+        series_id, reservation_ids = add_reservation_series(
+            user_id, facility_id, start, end, frequency, interval, until, count, exclude,
+            data.get('status', 'pending'), conn=conn)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ReservationConflictError as e:
+        return jsonify({
+            'error': 'Série koliduje s existujícími rezervacemi',
+            'conflicts': e.conflicting_ids
+        }), 409
+    finally:
+        conn.close()
+
+    return jsonify({'message': 'Série přidána', 'series_id': series_id, 'ids': reservation_ids}), 201
+
+def _update_series_status(series_id, new_status):
+    conn = _connect()
+    try:
+        updated, _ = bulk_update_reservation_status(new_status, series_id=series_id, conn=conn)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        conn.close()
+    return jsonify({'series_id': series_id, 'updated': updated}), 200
+
+# PATCH /reservations/series/<id> – změna stavu všech výskytů série ({"status": "confirmed"})
+@app.route('/reservations/series/<int:series_id>', methods=['PATCH'])
+def api_update_reservation_series(series_id):
+    new_status = (request.get_json() or {}).get('status')
+    if not new_status:
+        return jsonify({'error': 'Chybí cílový stav'}), 400
+    return _update_series_status(series_id, new_status)
+
+# DELETE /reservations/series/<id> – zrušení celé série (výskyty zůstanou jako cancelled)
+@app.route('/reservations/series/<int:series_id>', methods=['DELETE'])
+def api_cancel_reservation_series(series_id):
+    return _update_series_status(series_id, 'cancelled')
+
+# POST /reservations/bulk – hromadný import rezervací (sloupce jako u POST /reservations)
+@app.route('/reservations/bulk', methods=['POST'])
+def api_import_reservations():
+    return _bulk_import(import_reservations)
 
 @app.route('/reservations/<int:reservation_id>', methods=['DELETE'])
 def api_delete_reservation(reservation_id):
-    conn = connect_to_db()
+    conn = _connect()
     delete_reservation(reservation_id, conn=conn)
     conn.close()
     return jsonify({'message': f'Rezervace {reservation_id} byla smazána'}), 200
 
+# GET /cache/stats – počítadla cache (zásahy, minutí, vyřazení)
+@app.route('/cache/stats', methods=['GET'])
+def api_cache_stats():
+    return jsonify({"entities": entity_cache.stats()})
+
+# GET /queries/stats – nejdražší dotazy podle normalizovaného SQL (profiler.py)
+@app.route('/queries/stats', methods=['GET'])
+def api_query_stats():
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'Neplatný limit'}), 400
+    return jsonify({"queries": query_profiler.stats(limit=limit)})
+
+# GET /metrics – latence rout, dotazy, připojení a čekání na pool ve formátu Prometheus
+@app.route('/metrics', methods=['GET'])
+def api_metrics():
+    if not get_settings(testing=app.testing).metrics_enabled:
+        return jsonify({'error': 'Metriky jsou vypnuté'}), 404
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    app.run(debug=get_settings().debug)
@@ -0,0 +1,151 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import time, timedelta, datetime
+from time import monotonic
+from config import get_settings
+
+def parse_slot(value, default=15):
+    """
+    Převede délku slotu ("15m", "1h", "30") na minuty.
+    Vyhodí ValueError, pokud hodnota nedává smysl.
+    """
+    if value is None or value == "":
+        return default
+    match = re.fullmatch(r"\s*(\d+)\s*([mh]?)\s*", str(value).lower())
+    if not match:
+        raise ValueError(f"Neplatná délka slotu: {value}")
+    minutes = int(match.group(1)) * (60 if match.group(2) == "h" else 1)
+    if not 1 <= minutes <= 24 * 60:
+        raise ValueError(f"Neplatná délka slotu: {value}")
+    return minutes
+
+def to_minutes(value, round_up=False):
+    """Převede čas (time, timedelta z MySQL sloupce TIME nebo 'HH:MM[:SS]') na minuty od půlnoci."""
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+    elif isinstance(value, (time, datetime)):
+        seconds = value.hour * 3600 + value.minute * 60 + value.second
+    else:
+        parts = [int(p) for p in str(value).split(":")]
+        parts += [0] * (3 - len(parts))
+        seconds = parts[0] * 3600 + parts[1] * 60 + parts[2]
+    minutes, rest = divmod(seconds, 60)
+    return minutes + 1 if round_up and rest else minutes
+
+def minutes_since(day, value, round_up=False):
+    """Minuty od půlnoci dne day do okamžiku value (datetime); konec o půlnoci dá 1440."""
+    seconds = int((value - datetime.combine(day, time.min)).total_seconds())
+    minutes, rest = divmod(seconds, 60)
+    return minutes + 1 if round_up and rest else minutes
+
+def slot_keys(start, end, slot_minutes):
+    """
+    Sloty, které rezervace [start, end) zabírá, jako (date, slot_index);
+    index se počítá od půlnoci daného dne. Rezervace přes půlnoc zabere
+    sloty obou dnů. Délka slotu musí dělit 24 hodin.
+    """
+    step = timedelta(minutes=slot_minutes)
+    day = start.date()
+    slot_start = datetime.combine(day, time.min) + minutes_since(day, start) // slot_minutes * step
+    keys = []
+    while slot_start < end:
+        day = slot_start.date()
+        keys.append((day, minutes_since(day, slot_start) // slot_minutes))
+        slot_start += step
+    return keys
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def _add_gap(free, start, end, opening, slot):
+    # Zarovnání mezery na mřížku slotů počítanou od otevírací doby
+    start = opening + -(-(start - opening) // slot) * slot
+    end = opening + (end - opening) // slot * slot
+    if end - start >= slot:
+        free.append((start, end))
+
+def compute_free_intervals(opening, closing, busy, slot):
+    """
+    Vrátí volné intervaly (v minutách) v rámci otevírací doby.
+    busy musí být seřazené podle začátku – stačí pak jediný průchod.
+    """
+    free = []
+    cursor = opening
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start > cursor:
+            _add_gap(free, cursor, min(start, closing), opening, slot)
+        cursor = end
+        if cursor >= closing:
+            break
+    if cursor < closing:
+        _add_gap(free, cursor, closing, opening, slot)
+    return free
+
+
+class AvailabilityCache:
+    """
+    LRU cache volných termínů podle (facility_id, date).
+    Každý zápis do rezervací daného dne záznam zahodí (invalidate).
+    Zápisy jiných procesů tu invalidaci nevyvolají, proto každá délka slotu
+    platí nejvýš ttl sekund od výpočtu (0 = bez omezení).
+    """
+
+    def __init__(self, maxsize=1024, ttl=0, clock=monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        # Počítadlo zápisů na sportoviště – chrání před uložením výsledku,
+        # který se četl z DB ještě před souběžným zápisem.
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, facility_id):
+        with self._lock:
+            return self._generations.get(int(facility_id), 0)
+
+    def get(self, facility_id, day, slot):
+        key = (int(facility_id), str(day))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or slot not in entry:
+                return None
+            expires_at, value = entry[slot]
+            if expires_at is not None and expires_at <= self._clock():
+                del entry[slot]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, facility_id, day, slot, value, generation):
+        key = (int(facility_id), str(day))
+        expires_at = self._clock() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return
+            self._entries.setdefault(key, {})[slot] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, facility_id, day=None):
+        """Zahodí záznam pro daný den; bez dne všechny dny sportoviště."""
+        facility_id = int(facility_id)
+        with self._lock:
+            if day is not None:
+                self._entries.pop((facility_id, str(day)), None)
+            else:
+                for key in [key for key in self._entries if key[0] == facility_id]:
+                    del self._entries[key]
+            self._generations[facility_id] = self._generations.get(facility_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+availability_cache = AvailabilityCache(maxsize=get_settings().availability_cache_size,
+                                       ttl=get_settings().availability_cache_ttl)
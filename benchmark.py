@@ -0,0 +1,295 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from config import get_settings
+from db import connect_to_db
+from importer import batched
+from availability import availability_cache
+from intervals import reservation_index
+from repository import (
+    add_multiple_users, add_reservation, get_cached_user, get_facilities_by_id,
+    get_facility_availability, get_filtered_reservations, get_reservation_by_id, get_user_by_id,
+    get_users_by_ids, entity_cache, occupancy_index)
+
+# Velikosti syntetických dat: (uživatelé, sportoviště, rezervace)
+SIZES = {
+    "tiny": (1_000, 20, 10_000),
+    "small": (10_000, 100, 200_000),
+    "medium": (50_000, 500, 2_000_000),
+    "large": (100_000, 1_000, 10_000_000),
+}
+
+# První den generovaných rezervací; zápisové benchmarky jdou až za poslední den dat
+START_DAY = date(2030, 1, 1)
+OPENING_HOUR, CLOSING_HOUR = 8, 22
+
+def _at(day, hour):
+    return datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+
+def generate_users(count, seed=0):
+    """(username, email, password, role) – deterministicky podle seed."""
+    rng = random.Random(seed)
+    for n in range(1, count + 1):
+        yield f"user{n}", f"user{n}@bench.example", "heslo", "admin" if rng.random() < 0.01 else "user"
+
+def generate_facilities(count, seed=0):
+    """(name, location, description, available)."""
+    rng = random.Random(seed + 1)
+    cities = ("Brno", "Praha", "Ostrava", "Olomouc", "Plzeň")
+    for n in range(1, count + 1):
+        yield f"Sportoviště {n}", rng.choice(cities), f"Syntetické sportoviště {n}", rng.random() > 0.02
+
+def generate_reservations(count, users, facilities, seed=0, start_day=START_DAY):
+    """
+    (user_id, facility_id, start_at, end_at, status) bez překryvů na sportovišti.
+    Rezervace se rozdělují mezi sportoviště dokola; na každém jdou po sobě
+    v otevírací době s náhodnou délkou a mezerou. Id uživatelů a sportovišť
+    jsou 1..users a 1..facilities (tabulky se před nahráním vyprázdní).
+    """
+    rng = random.Random(seed + 2)
+    cursors = [_at(start_day, OPENING_HOUR)] * facilities
+    for n in range(count):
+        facility = n % facilities
+        start = cursors[facility] + timedelta(minutes=15 * rng.randint(0, 4))
+        end = start + timedelta(minutes=rng.choice((60, 90, 120)))
+        if end > _at(start.date(), CLOSING_HOUR):
+            start = _at(start.date() + timedelta(days=1), OPENING_HOUR)
+            end = start + timedelta(minutes=rng.choice((60, 90, 120)))
+        cursors[facility] = end
+        roll = rng.random()
+        status = "cancelled" if roll < 0.1 else "confirmed" if roll < 0.6 else "pending"
+        yield rng.randint(1, users), facility + 1, start, end, status
+
+def load_dataset(conn, users, facilities, reservations, seed=0, batch_size=5000, progress=None):
+    """Vyprázdní tabulky a nahraje syntetická data po dávkách (executemany)."""
+    cursor = conn.cursor()
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in ("reservation_slots", "reservations", "reservation_series", "facilities", "users"):
+        cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    conn.commit()
+
+    steps = (
+        ("users", "INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
+         generate_users(users, seed)),
+        ("facilities", "INSERT INTO facilities (name, location, description, available) VALUES (%s, %s, %s, %s)",
+         generate_facilities(facilities, seed)),
+        ("reservations", "INSERT INTO reservations (user_id, facility_id, start_at, end_at, status) "
+                         "VALUES (%s, %s, %s, %s, %s)",
+         generate_reservations(reservations, users, facilities, seed)),
+    )
+    for table, query, rows in steps:
+        loaded = 0
+        for batch in batched(rows, batch_size):
+            cursor.executemany(query, batch)
+            conn.commit()
+            loaded += len(batch)
+            if progress:
+                progress(table, loaded)
+    cursor.close()
+
+    availability_cache.clear()
+    reservation_index.clear()
+    entity_cache.clear()
+    occupancy_index.clear()
+
+
+def percentile(sorted_values, pct):
+    """Percentil metodou nejbližšího pořadí nad seřazeným seznamem."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+def summarize(durations):
+    """Souhrn časů v sekundách: percentily v ms a propustnost (operace/s)."""
+    values = sorted(durations)
+    total = sum(values)
+    return {
+        "count": len(values),
+        "mean_ms": round(total * 1000 / len(values), 4) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 4),
+        "p90_ms": round(percentile(values, 90) * 1000, 4),
+        "p99_ms": round(percentile(values, 99) * 1000, 4),
+        "max_ms": round(values[-1] * 1000, 4) if values else 0.0,
+        "ops_per_sec": round(len(values) / total, 1) if total else 0.0,
+    }
+
+def measure(call, iterations, warmup=10):
+    """Zavolá call(i) warmup + iterations krát a vrátí časy měřených volání."""
+    for i in range(warmup):
+        call(i)
+    durations = []
+    for i in range(warmup, warmup + iterations):
+        started = time.perf_counter()
+        call(i)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+class Dataset:
+    """Parametry nahraných dat, ze kterých benchmarky volí náhodné argumenty."""
+
+    def __init__(self, users, facilities, reservations, seed=0):
+        self.users = users
+        self.facilities = facilities
+        self.reservations = reservations
+        # Průměrně 90 min rezervace + 30 min mezera -> odhad rozsahu dat pro čtecí dotazy
+        per_day = (CLOSING_HOUR - OPENING_HOUR) * 60 // 120
+        self.days = max(1, reservations // max(facilities, 1) // per_day)
+        self.rng = random.Random(seed + 3)
+        self.run = int(time.time())
+
+    def user_id(self):
+        return self.rng.randint(1, self.users)
+
+    def facility_id(self):
+        return self.rng.randint(1, self.facilities)
+
+    def day(self):
+        return START_DAY + timedelta(days=self.rng.randrange(self.days))
+
+    def free_slot(self, i, first_day):
+        """i-tý hodinový slot od first_day dál – po sportovištích, pak po hodinách a dnech."""
+        hours_per_day = CLOSING_HOUR - OPENING_HOUR
+        hour = i // self.facilities
+        start = _at(first_day + timedelta(days=hour // hours_per_day), OPENING_HOUR + hour % hours_per_day)
+        return i % self.facilities + 1, start, start + timedelta(hours=1)
+
+
+def _add_reservation(data, conn):
+    # Zapisuje se až za poslední existující rezervaci, takže nevznikají kolize
+    # ani při opakovaném běhu nad stejnými daty (--skip-load)
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(end_at) FROM reservations")
+    (last,) = cursor.fetchone()
+    cursor.close()
+    first_day = (last.date() if last else START_DAY) + timedelta(days=1)
+
+    def call(i):
+        facility_id, start, end = data.free_slot(i, first_day)
+        add_reservation(data.user_id(), facility_id, start, end, conn=conn)
+    return call
+
+def _add_multiple_users(data, conn):
+    def call(i):
+        add_multiple_users([(f"bench{data.run}-{i}-{k}", f"bench{data.run}-{i}-{k}@bench.example", "heslo", "user")
+                            for k in range(100)], conn=conn)
+    return call
+
+# Název -> funkce (data, conn) vracející call(i); zápisové benchmarky data rozšiřují
+BENCHMARKS = {
+    "get_filtered_reservations.facility_day": lambda data, conn: lambda i: get_filtered_reservations(
+        facility_id=data.facility_id(), date=data.day(), conn=conn),
+    "get_filtered_reservations.user_page": lambda data, conn: lambda i: get_filtered_reservations(
+        user_id=data.user_id(), limit=50, conn=conn),
+    "get_reservation_by_id": lambda data, conn: lambda i: get_reservation_by_id(
+        data.rng.randint(1, data.reservations), conn=conn),
+    "get_user_by_id": lambda data, conn: lambda i: get_user_by_id(data.user_id(), conn=conn),
+    "get_cached_user": lambda data, conn: lambda i: get_cached_user(data.rng.randint(1, min(data.users, 100))),
+    "get_users_by_ids.100": lambda data, conn: lambda i: get_users_by_ids(
+        [data.user_id() for _ in range(100)], conn=conn),
+    "get_facilities_by_id": lambda data, conn: lambda i: get_facilities_by_id(data.facility_id(), conn=conn),
+    "get_facility_availability": lambda data, conn: lambda i: get_facility_availability(
+        data.facility_id(), data.day(), conn=conn),
+    "add_reservation": _add_reservation,
+    "add_multiple_users.100": _add_multiple_users,
+}
+
+def run_benchmarks(conn, data, names=None, iterations=200, warmup=10):
+    """Spustí vybrané benchmarky nad nahranými daty a vrátí {název: souhrn}."""
+    results = {}
+    for name in names or BENCHMARKS:
+        call = BENCHMARKS[name](data, conn)
+        results[name] = summarize(measure(call, iterations, warmup))
+    return results
+
+
+def compare(current, baseline, threshold=0.2, metric="p50_ms", min_delta_ms=0.05):
+    """
+    Porovná výsledky s uloženou baseline. Regrese je zhoršení metric o víc
+    než threshold (poměrně) a zároveň o víc než min_delta_ms (šum u rychlých
+    volání). Vrátí seznam regresí.
+    """
+    regressions = []
+    for size, benchmarks in current["results"].items():
+        for name, summary in benchmarks.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if not before or not before.get(metric):
+                continue
+            ratio = summary[metric] / before[metric]
+            if ratio > 1 + threshold and summary[metric] - before[metric] > min_delta_ms:
+                regressions.append({"size": size, "benchmark": name, "metric": metric,
+                                    "baseline": before[metric], "current": summary[metric],
+                                    "ratio": round(ratio, 3)})
+    return regressions
+
+def _metadata(args):
+    settings = get_settings(testing=True)
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": settings.db_backend,
+        "database": settings.sqlite_path if settings.db_backend == "sqlite" else settings.db_name,
+        "seed": args.seed,
+        "iterations": args.iterations,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mikrobenchmarky repository.py nad syntetickými daty.")
+    parser.add_argument("--sizes", default="tiny", help=f"čárkou oddělené velikosti ({', '.join(SIZES)})")
+    parser.add_argument("--only", help="čárkou oddělené názvy benchmarků")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-load", action="store_true", help="použít data nahraná předchozím během")
+    parser.add_argument("--save", help="uložit výsledky jako JSON (baseline)")
+    parser.add_argument("--compare", help="porovnat s baseline JSON a ohlásit regrese")
+    parser.add_argument("--threshold", type=float, default=0.2, help="povolené zhoršení (0.2 = 20 %%)")
+    parser.add_argument("--metric", default="p50_ms", choices=("mean_ms", "p50_ms", "p90_ms", "p99_ms"))
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    names = [name.strip() for name in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = [size for size in sizes if size not in SIZES] + [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Neznámé velikosti nebo benchmarky: {', '.join(unknown)}")
+
+    report = {"meta": _metadata(args), "results": {}}
+    # Jen testovací databáze – data se před nahráním mažou (connect_to_db to ověří)
+    conn = connect_to_db(testing=True)
+    try:
+        for size in sizes:
+            users, facilities, reservations = SIZES[size]
+            if not args.skip_load:
+                print(f"⏳ Nahrávám data '{size}' ({users} uživatelů, {facilities} sportovišť, "
+                      f"{reservations} rezervací)…", file=sys.stderr)
+                load_dataset(conn, users, facilities, reservations, seed=args.seed)
+            data = Dataset(users, facilities, reservations, seed=args.seed)
+            report["results"][size] = run_benchmarks(conn, data, names, args.iterations, args.warmup)
+            for name, summary in report["results"][size].items():
+                print(f"{size:7} {name:42} p50 {summary['p50_ms']:9.3f} ms  p99 {summary['p99_ms']:9.3f} ms  "
+                      f"{summary['ops_per_sec']:10.1f} op/s")
+    finally:
+        conn.close()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold, args.metric)
+        for r in regressions:
+            print(f"❗ Regrese {r['size']} {r['benchmark']}: {r['metric']} {r['baseline']} -> {r['current']} "
+                  f"(×{r['ratio']})")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
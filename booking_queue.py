@@ -0,0 +1,234 @@
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from mysql.connector import Error
+
+log = logging.getLogger(__name__)
+
+# Stavy požadavku v tabulce booking_requests, které klient vidí jako "queued"
+_PENDING_STATES = ("queued", "processing")
+
+class MemoryQueueBackend:
+    """
+    Fronta v paměti procesu (queue.Queue) – výchozí backend a náhrada v testech.
+    Rozhraní backendu: put(položka), get_batch(max_položek, timeout) -> seznam,
+    complete({id: výsledek}) a status(id) -> sdílený výsledek nebo None.
+
+    Jen pro jeden proces: fronta i výsledky (LRU v BookingQueue) zaniknou
+    s procesem a jiný worker stav požadavku nezná. Pro víc workerů BOOKING_QUEUE=db.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def get_batch(self, max_items, timeout):
+        try:
+            batch = [self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()]
+        except queue.Empty:
+            return []
+        while len(batch) < max_items:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def complete(self, outcomes):
+        # Výsledky drží BookingQueue v paměti procesu
+        pass
+
+    def status(self, ticket):
+        return None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+
+class DatabaseQueueBackend:
+    """
+    Fronta v tabulce booking_requests – přežije restart a sdílí ji všechny
+    procesy (workery). get_batch() si dávku zamykacím čtením přivlastní (stav
+    processing); dávku procesu, který spadl uprostřed zpracování, po
+    claim_timeout sekundách převezme jiný. Výsledky zůstávají v tabulce
+    retention sekund, takže stav požadavku zná každý worker.
+    """
+
+    def __init__(self, connect, claim_timeout=300, retention=86400):
+        self._connect = connect
+        self.claim_timeout = claim_timeout
+        self.retention = retention
+
+    def _run(self, work):
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            result = work(cursor)
+            conn.commit()
+            return result
+        except Error:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def put(self, item):
+        ticket, (user_id, facility_id, start, end, status) = item
+        self._run(lambda cursor: cursor.execute("""
+            INSERT INTO booking_requests (ticket, user_id, facility_id, start_at, end_at, status, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (ticket, user_id, facility_id, start, end, status, datetime.now())))
+
+    def _claim(self, cursor, max_items):
+        now = datetime.now()
+        cursor.execute("""
+            SELECT ticket, user_id, facility_id, start_at, end_at, status FROM booking_requests
+            WHERE state IN ('queued', 'processing') AND (state = 'queued' OR claimed_at <= %s)
+            ORDER BY created_at
+            LIMIT %s
+            FOR UPDATE
+        """, (now - timedelta(seconds=self.claim_timeout), max_items))
+        rows = cursor.fetchall()
+        if rows:
+            placeholders = ", ".join(["%s"] * len(rows))
+            cursor.execute(f"""
+                UPDATE booking_requests SET state = 'processing', claimed_at = %s
+                WHERE ticket IN ({placeholders})
+            """, (now, *[row[0] for row in rows]))
+        return [(ticket, tuple(values)) for ticket, *values in rows]
+
+    def get_batch(self, max_items, timeout):
+        batch = self._run(lambda cursor: self._claim(cursor, max_items))
+        if not batch and timeout:
+            # Tabulku se dotazujeme nejvýš jednou za timeout
+            time.sleep(timeout)
+        return batch
+
+    def complete(self, outcomes):
+        def work(cursor):
+            cursor.executemany("UPDATE booking_requests SET state = %s, result = %s WHERE ticket = %s",
+                               [(result["state"], json.dumps(result), ticket)
+                                for ticket, result in outcomes.items()])
+            cursor.execute("""
+                DELETE FROM booking_requests
+                WHERE state IN ('created', 'rejected', 'failed') AND created_at < %s
+            """, (datetime.now() - timedelta(seconds=self.retention),))
+        self._run(work)
+
+    def status(self, ticket):
+        def work(cursor):
+            cursor.execute("SELECT state, result FROM booking_requests WHERE ticket = %s", (ticket,))
+            return cursor.fetchall()
+        rows = self._run(work)
+        if not rows:
+            return None
+        state, result = rows[0]
+        return {"state": "queued"} if state in _PENDING_STATES else json.loads(result)
+
+
+def make_queue_backend(kind, connect=None, retention=86400):
+    """Backend podle BOOKING_QUEUE: memory (jeden proces) nebo db (sdílená, trvalá fronta)."""
+    if kind in ("memory", "memory://"):
+        return MemoryQueueBackend()
+    if kind == "db":
+        return DatabaseQueueBackend(connect, retention=retention)
+    raise ValueError(f"Nepodporovaný BOOKING_QUEUE: {kind}")
+
+
+class BookingQueue:
+    """
+    Asynchronní příjem rezervací (write-behind). submit() jen zařadí požadavek
+    a vrátí dočasné id; pracovní vlákno frontu vybírá po dávkách a předá je
+    funkci process (repository.add_queued_reservations), která vrátí
+    výsledek pro každé id. Výsledky se drží v omezené LRU paměti a předají
+    se backendu; stav, který proces sám nezná, se dohledá v backendu.
+    """
+
+    def __init__(self, backend, process, batch_size=500, poll_interval=0.5, max_results=100000):
+        self.backend = backend
+        self.process = process
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_results = max_results
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stopping = threading.Event()
+
+    def _set_result(self, ticket, result):
+        with self._lock:
+            self._results[ticket] = result
+            self._results.move_to_end(ticket)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def submit(self, values):
+        """Zařadí rezervaci (user_id, facility_id, start, end, status) a vrátí její dočasné id."""
+        ticket = uuid.uuid4().hex
+        self._set_result(ticket, {"state": "queued"})
+        self.backend.put((ticket, values))
+        return ticket
+
+    def status(self, ticket):
+        """Stav požadavku (queued / created / rejected / failed), nebo None pro neznámé id."""
+        with self._lock:
+            result = self._results.get(ticket)
+            result = dict(result) if result is not None else None
+        if result is None or result["state"] == "queued":
+            # Požadavek mohl přijmout nebo zpracovat jiný proces
+            return self.backend.status(ticket) or result
+        return result
+
+    def process_once(self, timeout=0):
+        """Zpracuje jednu dávku; vrátí počet zpracovaných požadavků."""
+        batch = self.backend.get_batch(self.batch_size, timeout)
+        if not batch:
+            return 0
+        try:
+            outcomes = self.process(batch)
+        except Exception as e:
+            # Celá dávka selhala (např. výpadek DB) – klient může požadavek poslat znovu
+            outcomes = {ticket: {"state": "failed", "error": str(e)} for ticket, _ in batch}
+        results = {ticket: outcomes.get(ticket, {"state": "failed", "error": "Bez výsledku"})
+                   for ticket, _ in batch}
+        for ticket, result in results.items():
+            self._set_result(ticket, result)
+        self.backend.complete(results)
+        return len(batch)
+
+    def drain(self):
+        """Zpracuje vše, co je ve frontě (bez pracovního vlákna – testy, ukončení)."""
+        while self.process_once():
+            pass
+
+    def start(self):
+        """Spustí pracovní vlákno, pokud ještě neběží."""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopping.clear()
+            self._worker = threading.Thread(target=self._run, name="booking-queue", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.process_once(timeout=self.poll_interval)
+            except Exception:
+                # Nedostupný backend (DB) nesmí ukončit pracovní vlákno
+                log.exception("Chyba fronty rezervací")
+                self._stopping.wait(self.poll_interval)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self.drain()
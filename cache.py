@@ -0,0 +1,244 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from datetime import time as time_of_day
+
+class MemoryBackend:
+    """
+    Sdílený backend v paměti procesu – náhrada za Redis v testech a při vývoji.
+    Rozhraní: get(key) -> hodnota nebo None, set(key, value, ttl), delete(key),
+    incr(key) -> nová hodnota počítadla.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+
+    def incr(self, key):
+        """Atomicky zvýší počítadlo (bez TTL) a vrátí novou hodnotu."""
+        with self._lock:
+            entry = self._data.get(key)
+            value = (entry[1] if entry is not None and entry[0] > self._clock() else 0) + 1
+            self._data[key] = (float("inf"), value)
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Typy z řádků DB, které JSON nemá – ukládají se jako {"__type__": …, "value": …}
+_JSON_TYPES = {
+    "datetime": (datetime, datetime.isoformat, datetime.fromisoformat),
+    "date": (date, date.isoformat, date.fromisoformat),
+    "time": (time_of_day, time_of_day.isoformat, time_of_day.fromisoformat),
+    "timedelta": (timedelta, timedelta.total_seconds, lambda value: timedelta(seconds=value)),
+}
+
+def _encode(value):
+    # datetime je podtřída date – musí se zkusit dřív (pořadí _JSON_TYPES)
+    for name, (value_type, encode, _) in _JSON_TYPES.items():
+        if isinstance(value, value_type):
+            return {"__type__": name, "value": encode(value)}
+    raise TypeError(f"Hodnotu typu {type(value).__name__} nelze uložit do cache")
+
+def _decode(obj):
+    if "__type__" in obj and obj.keys() == {"__type__", "value"}:
+        return _JSON_TYPES[obj["__type__"]][2](obj["value"])
+    return obj
+
+def dumps(value):
+    """Serializace hodnoty pro sdílený backend (JSON – na rozdíl od pickle načtení nespustí kód)."""
+    return json.dumps(value, default=_encode, ensure_ascii=False)
+
+def loads(raw):
+    return json.loads(raw, object_hook=_decode)
+
+
+class RedisBackend:
+    """Sdílená cache v Redisu (volitelná závislost – balíček redis)."""
+
+    def __init__(self, url, prefix="sportbooking:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Pro CACHE_URL=redis://… je potřeba balíček redis (pip install redis).") from e
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        return loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, dumps(value), ex=max(1, int(ttl)))
+
+    def incr(self, key):
+        return self._client.incr(self._prefix + key)
+
+    def delete(self, key):
+        self._client.delete(self._prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(self._prefix + "*"):
+            self._client.delete(key)
+
+
+def make_backend(url):
+    """Backend podle CACHE_URL: prázdné = jen lokální cache, memory:// nebo redis://…"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise ValueError(f"Nepodporovaný CACHE_URL: {url}")
+
+
+# Klíče sdíleného backendu pro kontrolu zastaralých zápisů (viz ReadThroughCache.set)
+_GENERATION_KEY = "generation"
+
+def _invalidated_key(key):
+    return f"invalidated:{key}"
+
+
+class ReadThroughCache:
+    """
+    Ohraničená LRU cache s TTL před čtecími dotazy (read-through).
+
+    Bez backendu žije cache v paměti procesu. Se sdíleným backendem (Redis,
+    v testech MemoryBackend) se lokální úroveň nepoužívá – invalidace z jiného
+    workeru by se do ní nedostala a ten by do vypršení TTL vracel zastaralá data.
+    Hodnoty se vrací jako kopie, takže úprava výsledku volajícím cache nepoškodí.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, backend=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self):
+        """Počítadlo invalidací – předává se do set(), viz tam. Se sdíleným backendem je společné všem workerům."""
+        if self.backend is not None:
+            return self.backend.get(_GENERATION_KEY) or 0
+        return self._version
+
+    def get(self, key):
+        """Vrátí (nalezeno, hodnota); nenalezení se počítá jako miss."""
+        found, value = self._lookup(key)
+        if not found:
+            with self._lock:
+                self.misses += 1
+        return found, value
+
+    def peek(self, key):
+        """Jako get(), ale nenalezení nepočítá – pro rychlou kontrolu před otevřením připojení."""
+        return self._lookup(key)[1]
+
+    def _lookup(self, key):
+        if self.backend is not None:
+            return self._lookup_shared(key)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, copy.copy(value)
+                del self._entries[key]
+        return False, None
+
+    def _lookup_shared(self, key):
+        entry = self.backend.get(key)
+        if entry is not None:
+            # Hodnota načtená z DB před poslední invalidací klíče (i v jiném workeru) se nevrací
+            invalidated = self.backend.get(_invalidated_key(key))
+            if invalidated is None or entry["version"] >= invalidated:
+                with self._lock:
+                    self.hits += 1
+                return True, copy.copy(entry["value"])
+        return False, None
+
+    def set(self, key, value, version=None):
+        """
+        Uloží hodnotu. S version (z version() před čtením z DB) se hodnota
+        nepoužije, pokud mezitím proběhla invalidace – mohla by být zastaralá.
+        Ve sdíleném backendu se hodnota uloží i s verzí a kontroluje se při čtení,
+        takže ji neprosadí ani pomalý worker, který invalidaci jiného workeru neviděl.
+        """
+        if self.backend is not None:
+            if version is None:
+                version = self.version()
+            self.backend.set(key, {"version": version, "value": value}, self.ttl)
+            return
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._store(key, value, self._clock())
+
+    def _store(self, key, value, now):
+        # Volá se pod self._lock
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._version += 1
+        if self.backend is not None:
+            generation = self.backend.incr(_GENERATION_KEY)
+            # Záznam o invalidaci stačí držet po dobu TTL – déle žádná uložená hodnota nevydrží
+            self.backend.set(_invalidated_key(key), generation, self.ttl)
+            self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
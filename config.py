@@ -1,13 +1,173 @@
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from dotenv import dotenv_values
 import os
+import threading
 
-def load_config(testing=False):
+@dataclass(frozen=True)
+class Settings:
+    """
+    Neměnné nastavení aplikace. Načítá se jednou za proces (zvlášť pro
+    testovací a produkční režim) – viz get_settings() a reload_settings().
+    """
+    testing: bool
+    db_host: str
+    db_user: str
+    db_password: str
+    db_name: str
+    db_port: int = 3306
+    db_backend: str = "mysql"
+    sqlite_path: str = ":memory:"
+    pool_enabled: bool = True
+    pool_size: int = 5
+    pool_overflow: int = 10
+    pool_timeout: float = 30
+    connect_timeout: int = 10
+    replica_hosts: tuple = ()
+    debug: bool = True
+    opening_time: str = "08:00"
+    closing_time: str = "22:00"
+    availability_cache_size: int = 1024
+    availability_cache_ttl: float = 10
+    page_size_default: int = 50
+    page_size_max: int = 500
+    entity_cache_size: int = 4096
+    entity_cache_ttl: float = 60
+    cache_url: str = ""
+    import_batch_size: int = 1000
+    slot_booking: bool = False
+    slot_minutes: int = 15
+    occupancy_cache_ttl: float = 10
+    idempotency_store: str = "memory"
+    idempotency_ttl: float = 86400
+    idempotency_wait_timeout: float = 30
+    booking_queue: str = ""
+    booking_queue_batch_size: int = 500
+    booking_queue_poll_interval: float = 0.5
+    booking_queue_retention: float = 86400
+    metrics_enabled: bool = True
+    slow_query_ms: float = 500
+    slow_query_sample: float = 1.0
+    slow_query_explain: bool = False
+    query_budget: int = 0
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_format: str = "json"
+
+    def db_config(self, host=None):
+        """
+        Parametry připojení pro backend DB_BACKEND (mysql.connector.connect()
+        nebo sqlite_backend.connect()); host lze přepsat (repliky, jen MySQL).
+        """
+        if self.db_backend == "sqlite":
+            return {
+                "backend": "sqlite",
+                "database": self.sqlite_path,
+                "timeout": self.connect_timeout,
+            }
+        return {
+            "backend": "mysql",
+            "host": host or self.db_host,
+            "port": self.db_port,
+            "user": self.db_user,
+            "password": self.db_password,
+            "database": self.db_name,
+            "connection_timeout": self.connect_timeout,
+        }
+
+    def pool_config(self):
+        if not self.pool_enabled:
+            # Bez poolu: žádná nečinná připojení, každé se po vrácení zavře
+            # a počet souběžných není prakticky omezený (srovnávací měření)
+            return {"size": 0, "overflow": 10000, "timeout": self.pool_timeout}
+        return {
+            "size": self.pool_size,
+            "overflow": self.pool_overflow,
+            "timeout": self.pool_timeout,
+        }
+
+
+def _to_bool(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+def _to_tuple(value):
+    return tuple(part.strip() for part in value.split(",") if part.strip())
+
+# Pole nastavení -> (proměnná prostředí, převod, výchozí hodnota)
+_ENV_FIELDS = {
+    "db_host": ("DB_HOST", str, None),
+    "db_user": ("DB_USER", str, None),
+    "db_password": ("DB_PASSWORD", str, None),
+    "db_name": ("DB_NAME", str, None),
+    "db_port": ("DB_PORT", int, "3306"),
+    "db_backend": ("DB_BACKEND", str, "mysql"),
+    "sqlite_path": ("SQLITE_PATH", str, ":memory:"),
+    "pool_enabled": ("DB_POOL_ENABLED", _to_bool, "true"),
+    "pool_size": ("DB_POOL_SIZE", int, "5"),
+    "pool_overflow": ("DB_POOL_OVERFLOW", int, "10"),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float, "30"),
+    "connect_timeout": ("DB_CONNECT_TIMEOUT", int, "10"),
+    "replica_hosts": ("DB_REPLICA_HOSTS", _to_tuple, ""),
+    "debug": ("APP_DEBUG", _to_bool, "true"),
+    "opening_time": ("FACILITY_OPENING_TIME", str, "08:00"),
+    "closing_time": ("FACILITY_CLOSING_TIME", str, "22:00"),
+    "availability_cache_size": ("AVAILABILITY_CACHE_SIZE", int, "1024"),
+    "availability_cache_ttl": ("AVAILABILITY_CACHE_TTL", float, "10"),
+    "page_size_default": ("PAGE_SIZE_DEFAULT", int, "50"),
+    "page_size_max": ("PAGE_SIZE_MAX", int, "500"),
+    "entity_cache_size": ("ENTITY_CACHE_SIZE", int, "4096"),
+    "entity_cache_ttl": ("ENTITY_CACHE_TTL", float, "60"),
+    "cache_url": ("CACHE_URL", str, ""),
+    "import_batch_size": ("IMPORT_BATCH_SIZE", int, "1000"),
+    "slot_booking": ("SLOT_BOOKING", _to_bool, "false"),
+    "slot_minutes": ("SLOT_MINUTES", int, "15"),
+    "occupancy_cache_ttl": ("OCCUPANCY_CACHE_TTL", float, "10"),
+    "idempotency_store": ("IDEMPOTENCY_STORE", str, "memory"),
+    "idempotency_ttl": ("IDEMPOTENCY_TTL", float, "86400"),
+    "idempotency_wait_timeout": ("IDEMPOTENCY_WAIT_TIMEOUT", float, "30"),
+    "booking_queue": ("BOOKING_QUEUE", str, ""),
+    "booking_queue_batch_size": ("BOOKING_QUEUE_BATCH_SIZE", int, "500"),
+    "booking_queue_poll_interval": ("BOOKING_QUEUE_POLL_INTERVAL", float, "0.5"),
+    "booking_queue_retention": ("BOOKING_QUEUE_RETENTION", float, "86400"),
+    "metrics_enabled": ("METRICS_ENABLED", _to_bool, "true"),
+    "slow_query_ms": ("SLOW_QUERY_MS", float, "500"),
+    "slow_query_sample": ("SLOW_QUERY_SAMPLE", float, "1.0"),
+    "slow_query_explain": ("SLOW_QUERY_EXPLAIN", _to_bool, "false"),
+    "query_budget": ("QUERY_BUDGET", int, "0"),
+    "log_level": ("LOG_LEVEL", str, "INFO"),
+    "log_levels": ("LOG_LEVELS", str, ""),
+    "log_format": ("LOG_FORMAT", str, "json"),
+}
+
+_settings = {}
+_settings_lock = threading.Lock()
+
+def _read_settings(testing):
     env_file = ".env.test" if testing else ".env"
-    load_dotenv(dotenv_path=env_file)
-
-    return {
-        "host": os.getenv("DB_HOST"),
-        "user": os.getenv("DB_USER"),
-        "password": os.getenv("DB_PASSWORD"),
-        "database": os.getenv("DB_NAME"),
-    }
+    # Hodnoty ze souboru; proměnné prostředí mají přednost (přepisy při nasazení).
+    values = dict(dotenv_values(env_file))
+    values.update(os.environ)
+
+    fields = {}
+    for field, (env_name, convert, default) in _ENV_FIELDS.items():
+        raw = values.get(env_name, default)
+        fields[field] = convert(raw) if raw is not None else None
+    return Settings(testing=testing, **fields)
+
+def get_settings(testing=False):
+    """Vrátí nastavení pro daný režim; soubor .env se čte jen při prvním volání."""
+    settings = _settings.get(testing)
+    if settings is None:
+        with _settings_lock:
+            settings = _settings.get(testing)
+            if settings is None:
+                settings = _read_settings(testing)
+                _settings[testing] = settings
+    return settings
+
+def reload_settings():
+    """Zahodí načtené nastavení; další get_settings() znovu přečte .env a prostředí."""
+    with _settings_lock:
+        _settings.clear()
+
+def load_config(testing=False):
+    return get_settings(testing=testing).db_config()
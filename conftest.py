@@ -0,0 +1,15 @@
+import pytest
+
+class FakeClock:
+    """Ručně posouvaný čas místo time.monotonic (cache a úložiště s ttl)."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
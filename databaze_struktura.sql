@@ -1,4 +1,6 @@
 -- SQL struktura tabulek pro projekt Sportbooking
+-- Aktuální stav schématu; změny přidávej jako očíslované migrace do migrations/
+-- a aplikuj je příkazem: python migrate.py
 
 -- USERS
 CREATE TABLE IF NOT EXISTS users (
@@ -16,7 +18,26 @@ CREATE TABLE IF NOT EXISTS facilities (
     name VARCHAR(100) NOT NULL,
     location VARCHAR(100),
     description TEXT,
-    available BOOLEAN DEFAULT TRUE
+    available BOOLEAN DEFAULT TRUE,
+    opening_time TIME NOT NULL DEFAULT '08:00:00',
+    closing_time TIME NOT NULL DEFAULT '22:00:00'
+);
+
+-- RESERVATION SERIES (opakované rezervace)
+CREATE TABLE IF NOT EXISTS reservation_series (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT,
+    facility_id INT,
+    frequency ENUM('daily', 'weekly') NOT NULL,
+    repeat_interval INT NOT NULL DEFAULT 1,
+    first_start_at DATETIME NOT NULL,
+    first_end_at DATETIME NOT NULL,
+    until_date DATE NULL,
+    occurrence_count INT NULL,
+    exclude_dates TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
 );
 
 -- RESERVATIONS
@@ -24,11 +45,56 @@ CREATE TABLE IF NOT EXISTS reservations (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT,
     facility_id INT,
-    date DATE NOT NULL,
-    start_time TIME NOT NULL,
-    end_time TIME NOT NULL,
+    series_id INT NULL,
+    start_at DATETIME NOT NULL,
+    end_at DATETIME NOT NULL,
+    date DATE GENERATED ALWAYS AS (DATE(start_at)) STORED,
+    start_time TIME GENERATED ALWAYS AS (TIME(start_at)) STORED,
+    end_time TIME GENERATED ALWAYS AS (TIME(end_at)) STORED,
     status ENUM('pending', 'confirmed', 'cancelled') DEFAULT 'pending',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
+    FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE,
+    CONSTRAINT fk_reservations_series FOREIGN KEY (series_id) REFERENCES reservation_series(id) ON DELETE SET NULL,
+    INDEX idx_reservations_facility_start (facility_id, start_at, end_at),
+    INDEX idx_reservations_user_start (user_id, start_at),
+    INDEX idx_reservations_status_start (status, start_at)
+);
+
+-- RESERVATION SLOTS (volitelný slotový model, SLOT_BOOKING=true)
+CREATE TABLE IF NOT EXISTS reservation_slots (
+    facility_id INT NOT NULL,
+    date DATE NOT NULL,
+    slot_index SMALLINT NOT NULL,
+    reservation_id INT NOT NULL,
+    UNIQUE KEY uq_reservation_slots (facility_id, date, slot_index),
+    INDEX idx_reservation_slots_reservation (reservation_id),
+    FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE,
+    FOREIGN KEY (reservation_id) REFERENCES reservations(id) ON DELETE CASCADE
+);
+
+-- IDEMPOTENCY KEYS (opakované POST požadavky, IDEMPOTENCY_STORE=db)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idem_key VARCHAR(255) NOT NULL PRIMARY KEY,
+    fingerprint CHAR(64) NOT NULL,
+    status_code SMALLINT NULL,
+    body MEDIUMTEXT NULL,
+    content_type VARCHAR(100) NULL,
+    expires_at DATETIME NOT NULL,
+    INDEX idx_idempotency_keys_expires (expires_at)
+);
+
+-- BOOKING REQUESTS (trvalá fronta rezervací, BOOKING_QUEUE=db)
+CREATE TABLE IF NOT EXISTS booking_requests (
+    ticket CHAR(32) NOT NULL PRIMARY KEY,
+    user_id INT NOT NULL,
+    facility_id INT NOT NULL,
+    start_at DATETIME NOT NULL,
+    end_at DATETIME NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    state ENUM('queued', 'processing', 'created', 'rejected', 'failed') NOT NULL DEFAULT 'queued',
+    result TEXT NULL,
+    claimed_at DATETIME NULL,
+    created_at DATETIME NOT NULL,
+    INDEX idx_booking_requests_state (state, created_at)
 );
@@ -1,20 +1,333 @@
+import contextvars
+import itertools
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
 import mysql.connector
 from mysql.connector import Error
-from config import load_config
+from mysql.connector.errors import PoolError
+import sqlite_backend
+from config import get_settings
+from metrics import connections_in_use, record_connect, record_pool_wait, record_query, record_rows
+from profiler import QueryRecord, query_profiler
 
-def connect_to_db(config=None, testing=False):
+log = logging.getLogger(__name__)
+
+# Backendy podle klíče "backend" v konfiguraci (DB_BACKEND) -> funkce,
+# která z ostatních parametrů otevře nové připojení s rozhraním mysql.connector
+BACKENDS = {
+    "mysql": mysql.connector.connect,
+    "sqlite": sqlite_backend.connect,
+}
+
+
+class InstrumentedCursor:
+    """
+    Obal nad kurzorem, který měří dobu dotazů a počítá načtené řádky
+    (metrics.py) a předává dotazy profileru (profiler.py). Ostatní atributy
+    (lastrowid, rowcount…) předává kurzoru.
+    """
+
+    def __init__(self, raw, conn=None):
+        self._raw = raw
+        # Neobalené připojení pro EXPLAIN pomalých dotazů
+        self._conn = conn
+        self._query = None
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _execute(self, method, operation, params, batch, args, kwargs):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return method(operation, params, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            record_query(seconds)
+            self._query = QueryRecord(operation, params, batch, seconds)
+
+    def _finish(self):
+        # Dotaz je uzavřený, až když je výsledek přečtený (nebo kurzor jde dál)
+        query, self._query = self._query, None
+        if query is not None:
+            query_profiler.finish(query, self._raw.rowcount, self._conn)
+
+    def _fetched(self, started, count, done=False):
+        record_rows(count)
+        if self._query is not None:
+            self._query.seconds += time.perf_counter() - started
+            self._query.rows += count
+            if done:
+                self._finish()
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._execute(self._raw.execute, operation, params, False, args, kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._execute(self._raw.executemany, operation, seq_params, True, args, kwargs)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._raw.fetchone()
+        self._fetched(started, 0 if row is None else 1, done=row is None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        started = time.perf_counter()
+        rows = self._raw.fetchmany(*args, **kwargs)
+        self._fetched(started, len(rows), done=not rows)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._raw.fetchall()
+        self._fetched(started, len(rows), done=True)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._finish()
+        return self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PooledConnection:
+    """
+    Obal nad připojením z poolu. Chová se jako běžné připojení,
+    ale close() připojení nezavře – vrátí ho zpět do poolu.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise Error("Připojení už bylo vráceno do poolu.")
+        return getattr(raw, name)
+
+    def cursor(self, *args, **kwargs):
+        raw = self.__getattr__("cursor")(*args, **kwargs)
+        return InstrumentedCursor(raw, self._raw)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def __del__(self):
+        # Záchranná síť: zapomenuté připojení se při úklidu objektu vrátí do poolu.
+        if self.__dict__.get("_raw") is not None:
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Pool připojení sdílený v rámci procesu (backend podle config["backend"]).
+
+    - size: počet připojení, která pool drží otevřená i v klidu
+    - overflow: kolik připojení navíc smí vzniknout ve špičce (po vrácení se zavřou)
+    - timeout: jak dlouho (v sekundách) se čeká na volné připojení, než se vyhodí PoolError
+    """
+
+    def __init__(self, config, size=5, overflow=10, timeout=30):
+        self._config = dict(config)
+        backend = self._config.pop("backend", "mysql")
+        if backend not in BACKENDS:
+            raise ValueError(f"Nepodporovaný DB_BACKEND: {backend}")
+        self._connect = BACKENDS[backend]
+        self.size = size
+        self.overflow = overflow
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size + overflow)
+
+    def get_connection(self):
+        started = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        record_pool_wait(time.perf_counter() - started)
+        if not acquired:
+            raise PoolError(f"Vypršel čas ({self.timeout} s) při čekání na volné připojení.")
+        try:
+            raw = self._checkout()
+        except BaseException:
+            self._slots.release()
+            raise
+        connections_in_use.inc()
+        return PooledConnection(self, raw)
+
+    def _checkout(self):
+        # Nejdřív zkusíme nečinné připojení; to, které mezitím spadlo, zahodíme.
+        while True:
+            try:
+                raw = self._idle.get_nowait()
+            except queue.Empty:
+                started = time.perf_counter()
+                raw = self._connect(**self._config)
+                record_connect(time.perf_counter() - started)
+                return raw
+            if self._is_alive(raw):
+                return raw
+            self._discard(raw)
+
+    @staticmethod
+    def _is_alive(raw):
+        try:
+            return raw.is_connected()
+        except Error:
+            return False
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Error:
+            pass
+
+    def release(self, raw):
+        try:
+            # Neukončená transakce nesmí přejít na dalšího uživatele připojení.
+            if raw.in_transaction:
+                raw.rollback()
+        except Error:
+            self._discard(raw)
+        else:
+            if self._idle.qsize() < self.size:
+                self._idle.put(raw)
+            else:
+                self._discard(raw)
+        finally:
+            connections_in_use.dec()
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_replica_counter = itertools.count()
+
+def get_pool(config, testing=False):
+    key = tuple(sorted(config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(config, **get_settings(testing=testing).pool_config())
+            _pools[key] = pool
+    return pool
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+
+def connect_to_db(config=None, testing=False, read_only=False):
+    """
+    Vrátí připojení z poolu. S read_only=True se čtecí dotazy rozloží
+    mezi repliky z DB_REPLICA_HOSTS (pokud žádné nejsou, použije se primární DB).
+    """
     if config is None:
-        config = load_config(testing=testing)
+        settings = get_settings(testing=testing)
+        host = None
+        if read_only and settings.replica_hosts:
+            host = settings.replica_hosts[next(_replica_counter) % len(settings.replica_hosts)]
+        config = settings.db_config(host=host)
 
-    if testing and "test" not in config["database"].lower():
+    # Databáze v paměti (SQLite) je vždy jen dočasná
+    if testing and config["database"] != sqlite_backend.MEMORY and "test" not in config["database"].lower():
         raise RuntimeError("❌ VAROVÁNÍ: Při testování musíš použít testovací databázi!")
 
+    pool = get_pool(config, testing=testing)
     try:
-        conn = mysql.connector.connect(**config)
-        if conn.is_connected():
-            print(f"✅ Připojení k databázi '{config['database']}' bylo úspěšné.")
-            return conn
+        conn = pool.get_connection()
+    except PoolError:
+        raise
     except Error as e:
-        print(f"❗ Chyba při připojení: {e}")
+        log.error("Chyba při připojení k databázi %s: %s", config["database"], e)
         return None
 
+    log.debug("Připojení k databázi %s z poolu", config["database"])
+    return conn
+
+
+class UnitOfWork:
+    """
+    Jedna transakce sdílená více operacemi z repository.py.
+    Funkce, které v ní běží, necommitují samy; on_commit() odloží akci
+    (typicky zneplatnění cache) až na úspěšný commit.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._on_commit = []
+
+    def on_commit(self, callback):
+        self._on_commit.append(callback)
+
+
+_current_uow = contextvars.ContextVar("unit_of_work", default=None)
+
+def current_unit_of_work():
+    """Právě aktivní UnitOfWork (v tomto vlákně / kontextu), jinak None."""
+    return _current_uow.get()
+
+@contextmanager
+def unit_of_work(conn=None, testing=False):
+    """
+    with unit_of_work() as uow: … – všechny zápisy uvnitř skončí jedním commitem,
+    při výjimce se celá transakce vrátí (rollback). Vnořené použití se připojí
+    k vnější transakci. Bez conn si vezme připojení z poolu a na konci ho vrátí.
+    """
+    outer = _current_uow.get()
+    if outer is not None and (conn is None or conn is outer.conn):
+        yield outer
+        return
+
+    close_conn = conn is None
+    if conn is None:
+        conn = connect_to_db(testing=testing)
+        if conn is None:
+            # connect_to_db chybu jen zalogoval – bez připojení by commit() skončil AttributeError
+            raise Error(msg="Transakci nelze začít: připojení k databázi selhalo (viz log)")
+    uow = UnitOfWork(conn)
+    token = _current_uow.set(uow)
+    try:
+        yield uow
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _current_uow.reset(token)
+        if close_conn:
+            conn.close()
+
+    for callback in uow._on_commit:
+        callback()
@@ -0,0 +1,39 @@
+import csv
+import io
+import json
+from datetime import date, time, datetime, timedelta
+
+# Sloupce exportu rezervací (pevné pořadí kvůli CSV hlavičce)
+RESERVATION_EXPORT_COLUMNS = ("id", "user_id", "facility_id", "start_at", "end_at", "status", "created_at")
+
+def _export_value(value):
+    if isinstance(value, (date, time, datetime, timedelta)):
+        return str(value)
+    return value
+
+def iter_ndjson(rows):
+    """Převede řádky (slovníky) na NDJSON – jeden JSON objekt na řádek."""
+    for row in rows:
+        yield json.dumps({k: _export_value(v) for k, v in row.items()}, ensure_ascii=False) + "\n"
+
+def iter_csv(rows, columns=RESERVATION_EXPORT_COLUMNS):
+    """Převede řádky na CSV po jednotlivých řádcích; v paměti je vždy jen jeden."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
+    writer.writerow(columns)
+    yield flush()
+    for row in rows:
+        writer.writerow([_export_value(row.get(column)) for column in columns])
+        yield flush()
+
+EXPORT_FORMATS = {
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+    "csv": (iter_csv, "text/csv"),
+}
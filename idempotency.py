@@ -0,0 +1,170 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from mysql.connector import IntegrityError, errorcode
+
+class IdempotencyKeyReused(Exception):
+    """Klíč už byl použit pro jiný obsah požadavku."""
+
+
+class IdempotencyInProgress(Exception):
+    """Požadavek se stejným klíčem pořád běží (vypršel čas čekání)."""
+
+
+class StoredResponse:
+    """Uložená odpověď, která se při opakovaném požadavku vrátí beze změny."""
+
+    def __init__(self, status_code, body, content_type):
+        self.status_code = status_code
+        self.body = body
+        self.content_type = content_type
+
+
+class MemoryIdempotencyStore:
+    """
+    Klíče v paměti procesu. Souběžný požadavek se stejným klíčem počká
+    (threading.Event), dokud první neskončí, a pak dostane jeho odpověď.
+    """
+
+    def __init__(self, ttl=86400, wait_timeout=30, clock=time.monotonic):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._clock = clock
+        # klíč -> [otisk požadavku, Event, StoredResponse nebo None, platnost do]
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        # Záznamy jsou zhruba v pořadí vypršení – stačí uklízet od začátku
+        for key in list(self._entries):
+            if self._entries[key][3] > now:
+                break
+            del self._entries[key]
+
+    def begin(self, key, fingerprint):
+        """
+        Zaregistruje klíč. Vrátí None, pokud požadavek má proběhnout,
+        jinak StoredResponse z prvního (případně po čekání na jeho dokončení).
+        """
+        deadline = self._clock() + self.wait_timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._purge(now)
+                entry = self._entries.get(key)
+                if entry is None or entry[3] <= now:
+                    self._entries.pop(key, None)
+                    self._entries[key] = [fingerprint, threading.Event(), None, float("inf")]
+                    return None
+            if entry[0] != fingerprint:
+                raise IdempotencyKeyReused(key)
+            if not entry[1].wait(max(0, deadline - self._clock())):
+                raise IdempotencyInProgress(key)
+            if entry[2] is not None:
+                return entry[2]
+            # První požadavek selhal a klíč uvolnil – zkusíme ho převzít
+
+    def complete(self, key, response):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            entry[2] = response
+            entry[3] = self._clock() + self.ttl
+            self._entries[key] = entry
+        entry[1].set()
+
+    def abort(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[1].set()
+
+
+class DatabaseIdempotencyStore:
+    """
+    Klíče v tabulce idempotency_keys – sdílené mezi procesy. Rozpracovaný
+    požadavek drží řádek bez odpovědi; souběžný ho jen periodicky kontroluje.
+    Řádek rozpracovaného požadavku vyprší po 2 × wait_timeout (pád serveru).
+    """
+
+    def __init__(self, connect, ttl=86400, wait_timeout=30, poll_interval=0.05):
+        self._connect = connect
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    def _claim(self, cursor, key, fingerprint):
+        expires_at = datetime.now() + timedelta(seconds=2 * self.wait_timeout)
+        cursor.execute(
+            "INSERT INTO idempotency_keys (idem_key, fingerprint, expires_at) VALUES (%s, %s, %s)",
+            (key, fingerprint, expires_at))
+
+    def begin(self, key, fingerprint):
+        deadline = time.monotonic() + self.wait_timeout
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            while True:
+                try:
+                    self._claim(cursor, key, fingerprint)
+                    conn.commit()
+                    return None
+                except IntegrityError as e:
+                    conn.rollback()
+                    if e.errno != errorcode.ER_DUP_ENTRY:
+                        raise
+
+                cursor.execute("""
+                    SELECT fingerprint, status_code, body, content_type, expires_at
+                    FROM idempotency_keys WHERE idem_key = %s
+                """, (key,))
+                rows = cursor.fetchall()
+                conn.commit()  # nový snímek pro další kontrolu
+                if not rows:
+                    continue
+                stored_fingerprint, status_code, body, content_type, expires_at = rows[0]
+                if expires_at <= datetime.now():
+                    cursor.execute("DELETE FROM idempotency_keys WHERE idem_key = %s AND expires_at <= %s",
+                                   (key, datetime.now()))
+                    conn.commit()
+                    continue
+                if stored_fingerprint != fingerprint:
+                    raise IdempotencyKeyReused(key)
+                if status_code is not None:
+                    return StoredResponse(status_code, body, content_type)
+                if time.monotonic() >= deadline:
+                    raise IdempotencyInProgress(key)
+                time.sleep(self.poll_interval)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def complete(self, key, response):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE idempotency_keys SET status_code = %s, body = %s, content_type = %s, expires_at = %s
+            WHERE idem_key = %s
+        """, (response.status_code, response.body, response.content_type,
+              datetime.now() + timedelta(seconds=self.ttl), key))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def abort(self, key):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM idempotency_keys WHERE idem_key = %s AND status_code IS NULL", (key,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+
+def make_store(kind, connect, ttl, wait_timeout):
+    """Úložiště podle IDEMPOTENCY_STORE: memory (výchozí, jeden proces) nebo db."""
+    if kind == "memory":
+        return MemoryIdempotencyStore(ttl=ttl, wait_timeout=wait_timeout)
+    if kind == "db":
+        return DatabaseIdempotencyStore(connect, ttl=ttl, wait_timeout=wait_timeout)
+    raise ValueError(f"Nepodporované IDEMPOTENCY_STORE: {kind}")
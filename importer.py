@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+
+# Role a stavy povolené schématem (ENUM sloupce)
+USER_ROLES = ("admin", "user")
+RESERVATION_STATUSES = ("pending", "confirmed", "cancelled")
+
+# Kolik chyb se nejvýš vypíše v reportu (počet všech chybných řádků je v "failed")
+MAX_REPORTED_ERRORS = 1000
+
+def parse_ndjson(lines):
+    """
+    Čte NDJSON po řádcích a vrací (číslo_řádku, slovník, chyba).
+    Nevalidní řádek import nepřeruší – jen se vrátí s chybou.
+    """
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_no, None, "Neplatný JSON"
+            continue
+        if not isinstance(data, dict):
+            yield line_no, None, "Řádek musí být JSON objekt"
+            continue
+        yield line_no, data, None
+
+def parse_csv(lines):
+    """Čte CSV s hlavičkou a vrací (číslo_řádku, slovník, chyba); hlavička je řádek 1."""
+    reader = csv.DictReader(lines)
+    for data in reader:
+        line_no = reader.line_num
+        if None in data:
+            yield line_no, None, "Řádek má víc sloupců než hlavička"
+            continue
+        yield line_no, {k: v for k, v in data.items() if v not in (None, "")}, None
+
+IMPORT_FORMATS = {
+    "ndjson": parse_ndjson,
+    "csv": parse_csv,
+}
+
+def import_format(fmt, content_type):
+    """Formát z parametru ?format=, jinak podle Content-Type; neznámý je ValueError."""
+    if not fmt:
+        fmt = "csv" if "csv" in (content_type or "") else "ndjson"
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Nepodporovaný formát importu: {fmt}")
+    return fmt
+
+def parse_stream(stream, fmt):
+    """Dekóduje binární stream (tělo požadavku, soubor) a čte ho po řádcích."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    return IMPORT_FORMATS[fmt](text)
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def _require(data, *fields):
+    missing = [field for field in fields if data.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Chybí pole: {', '.join(missing)}")
+
+def _require_text(data, *fields):
+    # Z NDJSON může přijít i číslo, seznam nebo objekt – str() by je tiše převedl
+    invalid = [field for field in fields if field in data and not isinstance(data[field], str)]
+    if invalid:
+        raise ValueError(f"Pole musí být text: {', '.join(invalid)}")
+
+def _to_id(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Neplatné id: {value!r}")
+    return int(value)
+
+def validate_user(data):
+    """Vrátí (username, email, password, role) pro INSERT, jinak vyhodí ValueError."""
+    _require(data, "username", "email", "password")
+    _require_text(data, "username", "email", "password", "role")
+    role = data.get("role") or "user"
+    if role not in USER_ROLES:
+        raise ValueError(f"Neplatná role: {role}")
+    email = str(data["email"]).strip()
+    if "@" not in email:
+        raise ValueError(f"Neplatný e-mail: {email}")
+    return str(data["username"]).strip(), email, str(data["password"]), role
+
+def validate_reservation(data):
+    """
+    Vrátí (user_id, facility_id, start_at, end_at, status) pro INSERT, jinak vyhodí ValueError.
+    Termín je buď start_at/end_at, nebo date + start_time/end_time (jako u POST /reservations).
+    """
+    _require(data, "user_id", "facility_id")
+    start_at = data.get("start_at") or (
+        data.get("date") and data.get("start_time") and f"{data['date']} {data['start_time']}")
+    end_at = data.get("end_at") or (
+        data.get("date") and data.get("end_time") and f"{data['date']} {data['end_time']}")
+    if not start_at or not end_at:
+        raise ValueError("Chybí začátek nebo konec (start_at/end_at nebo date + start_time/end_time)")
+    try:
+        user_id = _to_id(data["user_id"])
+        facility_id = _to_id(data["facility_id"])
+        start = datetime.fromisoformat(str(start_at).strip())
+        end = datetime.fromisoformat(str(end_at).strip())
+    except (TypeError, ValueError):
+        raise ValueError("Neplatné id, datum nebo čas") from None
+    if end <= start:
+        raise ValueError("Konec rezervace musí být po jejím začátku")
+    status = data.get("status") or "pending"
+    if not isinstance(status, str) or status not in RESERVATION_STATUSES:
+        raise ValueError(f"Neplatný stav: {status}")
+    return user_id, facility_id, start, end, status
+
+
+class ImportReport:
+    """Souhrn importu: počet vložených řádků a chyby po řádcích."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line_no, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line_no, "error": message})
+
+    def as_dict(self):
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
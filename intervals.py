@@ -0,0 +1,108 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+class IntervalIndex:
+    """
+    Seřazené intervaly [start, end) jednoho sportoviště v jednom dni.
+    Dotaz na překryv binárně najde konec a prochází jen intervaly začínající
+    méně než nejdelší interval před začátkem dotazu – O(log n + m), kde m je
+    počet takových kandidátů (při podobně dlouhých rezervacích ~ počet kolizí).
+    add() a remove() posouvají seznam, stojí tedy O(n); den má ale jen desítky rezervací.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._items = []
+        self._max_length = 0
+        for start, end, item_id in intervals:
+            self.add(start, end, item_id)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, start, end, item_id):
+        position = bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._items.insert(position, (start, end, item_id))
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, item_id):
+        for position, item in enumerate(self._items):
+            if item[2] == item_id:
+                del self._starts[position]
+                del self._items[position]
+                if item[1] - item[0] == self._max_length:
+                    # Jinak by jeden dlouhý interval rozšiřoval prohledávání navždy
+                    self._max_length = max((end - start for start, end, _ in self._items), default=0)
+                return True
+        return False
+
+    def overlaps(self, start, end):
+        """Vrátí id intervalů, které se překrývají s [start, end)."""
+        found = []
+        # Všechny intervaly s začátkem < end leží vlevo od této pozice
+        position = bisect_left(self._starts, end)
+        # Po indexech – řez self._items[:position] by kopíroval celý prefix (O(n))
+        for i in range(position - 1, -1, -1):
+            item_start, item_end, item_id = self._items[i]
+            # Dřívější intervaly skončí nejpozději v item_start + _max_length
+            if item_start + self._max_length <= start:
+                break
+            if item_end > start:
+                found.append(item_id)
+        found.reverse()
+        return found
+
+
+class ReservationIndex:
+    """
+    Registr IntervalIndex podle (facility_id, date) pro rychlou kontrolu kolizí.
+    Drží jen naposledy použité dny (LRU); databáze zůstává konečnou autoritou.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._days = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, facility_id, day, index):
+        key = (int(facility_id), str(day))
+        with self._lock:
+            self._days[key] = index
+            self._days.move_to_end(key)
+            while len(self._days) > self.maxsize:
+                self._days.popitem(last=False)
+
+    def overlaps(self, facility_id, day, start, end):
+        """Vrátí id kolidujících rezervací, nebo None, pokud den ještě není načtený."""
+        key = (int(facility_id), str(day))
+        with self._lock:
+            index = self._days.get(key)
+            if index is None:
+                return None
+            self._days.move_to_end(key)
+            return index.overlaps(start, end)
+
+    def add(self, facility_id, day, start, end, reservation_id):
+        # Do nenačteného dne nic nepřidáváme – načte se celý při první kontrole
+        with self._lock:
+            index = self._days.get((int(facility_id), str(day)))
+            if index is not None:
+                index.add(start, end, reservation_id)
+
+    def invalidate(self, facility_id, day=None):
+        facility_id = int(facility_id)
+        with self._lock:
+            if day is not None:
+                self._days.pop((facility_id, str(day)), None)
+            else:
+                for key in [key for key in self._days if key[0] == facility_id]:
+                    del self._days[key]
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+
+reservation_index = ReservationIndex()
@@ -0,0 +1,285 @@
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+from benchmark import SIZES, START_DAY, Dataset, load_dataset, summarize
+from config import get_settings
+from metrics import LATENCY_BUCKETS, connections_in_use
+
+# Výchozí mix provozu (váhy v procentech)
+DEFAULT_MIX = {"availability": 35, "list": 35, "get": 20, "book": 10}
+
+# Den, od kterého se vytvářejí nové rezervace (mimo data z benchmark.load_dataset)
+BOOKING_DAY = date(2040, 1, 1)
+
+def parse_mix(value):
+    """'availability=35,list=35,get=20,book=10' -> {operace: váha}; neznámá operace je ValueError."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Neznámá operace: {name} (podporované: {', '.join(OPERATIONS)})")
+        mix[name] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Mix provozu musí mít kladné váhy")
+    return mix
+
+
+class Scenario:
+    """Generuje požadavky podle rozsahu dat (id 1..N jako v benchmark.load_dataset)."""
+
+    def __init__(self, users, facilities, reservations, days, conflict_rate=0.2, seed=0):
+        self.users = users
+        self.facilities = facilities
+        self.reservations = reservations
+        self.days = days
+        self.conflict_rate = conflict_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._booked = []
+        self._next_slot = 0
+
+    def _day(self, rng):
+        return (START_DAY + timedelta(days=rng.randrange(self.days))).isoformat()
+
+    def availability(self, rng):
+        return "GET", f"/facilities/{rng.randint(1, self.facilities)}/availability?date={self._day(rng)}", None
+
+    def list(self, rng):
+        return "GET", f"/reservation?facility_id={rng.randint(1, self.facilities)}&date={self._day(rng)}&limit=50", None
+
+    def get(self, rng):
+        if rng.random() < 0.5:
+            return "GET", f"/reservation/{rng.randint(1, self.reservations)}", None
+        return "GET", f"/users/{rng.randint(1, self.users)}", None
+
+    def book(self, rng):
+        # S pravděpodobností conflict_rate se zopakuje už zarezervovaný termín (očekávaná 409)
+        with self._lock:
+            if self._booked and rng.random() < self.conflict_rate:
+                body = dict(rng.choice(self._booked), user_id=rng.randint(1, self.users))
+            else:
+                slot = self._next_slot
+                self._next_slot += 1
+                day = BOOKING_DAY + timedelta(days=slot // (self.facilities * 14))
+                hour = 8 + slot // self.facilities % 14
+                body = {"user_id": rng.randint(1, self.users), "facility_id": slot % self.facilities + 1,
+                        "date": day.isoformat(), "start_time": f"{hour:02d}:00:00",
+                        "end_time": f"{hour + 1:02d}:00:00"}
+                self._booked.append(body)
+        return "POST", "/reservations", body
+
+    def worker_rng(self):
+        with self._lock:
+            return random.Random(self._rng.random())
+
+OPERATIONS = ("availability", "list", "get", "book")
+
+
+class InProcessTarget:
+    """Volání aplikace přes Flask test client (bez sítě, testovací databáze)."""
+
+    def __init__(self):
+        from app import app
+        app.config['TESTING'] = True
+        self._app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_data(as_text=True)
+
+
+class HttpTarget:
+    """Volání běžícího serveru přes HTTP (urllib)."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"} if data else {})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, response.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode()
+
+
+_CONNECTS = re.compile(r"^db_connect_duration_seconds_count (\S+)$", re.M)
+_PEAK = re.compile(r"^db_connections_in_use_max (\S+)$", re.M)
+
+def db_connection_stats(target):
+    """Počet otevřených připojení a maximum souběžných z /metrics (None, pokud metriky nejsou)."""
+    status, text = target.request("GET", "/metrics")
+    if status != 200:
+        return None
+    opened, peak = _CONNECTS.search(text), _PEAK.search(text)
+    return {"opened": float(opened.group(1)) if opened else 0,
+            "peak_in_use": float(peak.group(1)) if peak else 0}
+
+
+class Results:
+    """Latence a stavové kódy po operacích (sdílené mezi vlákny)."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, operation, seconds, status, error=None):
+        with self._lock:
+            self.latencies.setdefault(operation, []).append(seconds)
+            statuses = self.statuses.setdefault(operation, {})
+            statuses[status] = statuses.get(status, 0) + 1
+            if error is not None:
+                self.errors.setdefault(operation, []).append(error)
+
+    def report(self, elapsed):
+        operations = {}
+        for operation, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[operation]
+            # 409 u rezervací je očekávaná kolize, ne chyba
+            failed = sum(count for status, count in statuses.items() if status == "error" or status >= 500)
+            histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+            for seconds in latencies:
+                histogram[next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound),
+                               len(LATENCY_BUCKETS))] += 1
+            operations[operation] = {
+                **summarize(latencies),
+                "error_rate": round(failed / len(latencies), 4),
+                "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+                "histogram": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], histogram)),
+                "sample_errors": self.errors.get(operation, [])[:5],
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        everything = [seconds for latencies in self.latencies.values() for seconds in latencies]
+        return {"requests": total, "elapsed_s": round(elapsed, 2),
+                "achieved_rps": round(total / elapsed, 1) if elapsed else 0.0,
+                "overall": summarize(everything) if everything else {}, "operations": operations}
+
+
+def run_load(target, scenario, mix, rps, concurrency, duration):
+    """
+    Otevřená smyčka: požadavky se plánují rovnoměrně na rps za sekundu
+    a rozdělují mezi concurrency vláken. Latence se měří od plánovaného
+    času odeslání, takže zahlcený server se projeví i ve frontě
+    (bez "coordinated omission").
+    """
+    results = Results()
+    operations, weights = zip(*mix.items())
+    interval = 1.0 / rps
+    started = time.perf_counter()
+    deadline = started + duration
+    counter = iter(range(sys.maxsize))
+    counter_lock = threading.Lock()
+
+    def worker():
+        rng = scenario.worker_rng()
+        while True:
+            with counter_lock:
+                scheduled = started + next(counter) * interval
+            if scheduled >= deadline:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            operation = rng.choices(operations, weights)[0]
+            method, path, body = getattr(scenario, operation)(rng)
+            try:
+                status, text = target.request(method, path, body)
+                error = text[:200] if status >= 500 else None
+            except Exception as e:
+                status, error = "error", repr(e)
+            results.add(operation, time.perf_counter() - scheduled, status, error)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results.report(time.perf_counter() - started)
+
+def _print_report(report):
+    print(f"Požadavků: {report['requests']} za {report['elapsed_s']} s ({report['achieved_rps']} req/s)")
+    for operation, stats in report["operations"].items():
+        print(f"  {operation:13} n={stats['count']:6}  p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  "
+              f"max {stats['max_ms']:8.2f} ms  chyby {stats['error_rate']:.2%}  {stats['statuses']}")
+    if report.get("db_connections"):
+        print(f"  DB připojení: {report['db_connections']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zátěžový test HTTP API (mix čtení a rezervací).")
+    parser.add_argument("--url", help="adresa běžícího serveru; bez ní se volá aplikace v procesu (test client)")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help=f"váhy operací ({', '.join(OPERATIONS)})")
+    parser.add_argument("--rps", type=float, default=50, help="cílový počet požadavků za sekundu")
+    parser.add_argument("--concurrency", type=int, default=8, help="počet souběžných klientů")
+    parser.add_argument("--duration", type=float, default=30, help="délka testu v sekundách")
+    parser.add_argument("--conflict-rate", type=float, default=0.2, help="podíl rezervací do obsazeného termínu")
+    parser.add_argument("--size", default="tiny", choices=sorted(SIZES), help="rozsah dat (viz benchmark.py)")
+    parser.add_argument("--load", action="store_true", help="před testem nahrát syntetická data (jen v procesu)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="uložit report jako JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Konfigurace se porovnává přes proměnné prostředí, např.
+    # DB_POOL_ENABLED=false python loadtest.py nebo DB_BACKEND=sqlite python loadtest.py --load
+    # (u --url je nastavuje spuštěný server)
+    if args.url:
+        if args.load:
+            parser.error("--load je jen pro běh v procesu (bez --url)")
+        target = HttpTarget(args.url)
+    else:
+        target = InProcessTarget()
+
+    users, facilities, reservations = SIZES[args.size]
+    if args.load:
+        from db import close_pools, connect_to_db
+        conn = connect_to_db(testing=True)
+        load_dataset(conn, users, facilities, reservations, seed=args.seed)
+        conn.close()
+        close_pools()  # měření začíná s prázdným poolem
+    if not args.url:
+        connections_in_use.clear()
+
+    scenario = Scenario(users, facilities, reservations, Dataset(users, facilities, reservations).days,
+                        conflict_rate=args.conflict_rate, seed=args.seed)
+
+    before = db_connection_stats(target)
+    report = run_load(target, scenario, mix, args.rps, args.concurrency, args.duration)
+    after = db_connection_stats(target)
+    if before is not None and after is not None:
+        report["db_connections"] = {"opened": int(after["opened"] - before["opened"]),
+                                    "peak_in_use": int(after["peak_in_use"])}
+    report["config"] = {"target": args.url or "in-process", "mix": mix, "rps": args.rps,
+                        "concurrency": args.concurrency, "duration": args.duration,
+                        "pool_enabled": None if args.url else get_settings(testing=True).pool_enabled,
+                        "db_backend": None if args.url else get_settings(testing=True).db_backend}
+
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Atributy LogRecord, které nejsou "extra" pole záznamu
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """Jeden JSON objekt na řádek: čas, úroveň, logger, zpráva a pole z extra=."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Čitelný výstup pro vývoj; pole z extra= se připojí jako klíč=hodnota."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        extra = {key: value for key, value in vars(record).items()
+                 if key not in _RECORD_ATTRS and not key.startswith("_")}
+        if extra:
+            text += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return text
+
+LOG_FORMATS = {
+    "json": JsonFormatter,
+    "text": TextFormatter,
+}
+
+def parse_levels(value):
+    """'repository=WARNING,db=DEBUG' -> {'repository': 'WARNING', 'db': 'DEBUG'}; neplatné je ValueError."""
+    levels = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, sep, level = part.partition("=")
+        level = level.strip().upper()
+        if not sep or not name.strip() or not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Neplatné nastavení úrovně logování: {part}")
+        levels[name.strip()] = level
+    return levels
+
+
+_listener = None
+_lock = threading.Lock()
+
+def configure_logging(settings, stream=None):
+    """
+    Nastaví kořenový logger: záznamy jdou přes QueueHandler do fronty a na výstup
+    je zapisuje samostatné vlákno (QueueListener), takže požadavek na zápis nečeká.
+    Úroveň je LOG_LEVEL, pro jednotlivé moduly ji přepíše LOG_LEVELS
+    ("repository=WARNING,db=DEBUG"). Opakované volání nastavení nahradí.
+    """
+    global _listener
+    if settings.log_format not in LOG_FORMATS:
+        raise ValueError(f"Nepodporovaný LOG_FORMAT: {settings.log_format}")
+    levels = parse_levels(settings.log_levels)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(LOG_FORMATS[settings.log_format]())
+    log_queue = queue.SimpleQueue()
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        root = logging.getLogger()
+        for old in [h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+            root.removeHandler(old)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(settings.log_level.upper())
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+
+def shutdown_logging():
+    """Vypíše zbytek fronty a zastaví zapisovací vlákno."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+atexit.register(shutdown_logging)
@@ -1,12 +1,30 @@
+import argparse
+from config import get_settings
+from logging_setup import configure_logging
+from export import EXPORT_FORMATS, RESERVATION_EXPORT_COLUMNS
 from repository import (
     get_all_users, get_all_facilities, get_all_reservations, add_user,
     add_facility, add_reservation, update_user_password, update_facility_availability,
-    update_reservation_status, delete_user, delete_reservation
+    update_reservation_status, delete_user, delete_reservation, ReservationConflictError,
+    iter_reservations, rebuild_reservation_slots
 )
 
+def export_reservations(export_format, output, **filters):
+    """Zapíše rezervace do souboru po dávkách – paměť nezávisí na velikosti tabulky."""
+    render, _ = EXPORT_FORMATS[export_format]
+    count = 0
+    with open(output, "w", encoding="utf-8", newline="") as f:
+        for chunk in render(iter_reservations(columns=RESERVATION_EXPORT_COLUMNS, **filters)):
+            f.write(chunk)
+            count += 1
+    if export_format == "csv":
+        count -= 1  # hlavička
+    print(f"📤 Exportováno {count} rezervací do '{output}'.")
+
 def menu():
+    settings = get_settings()
     while True:
-        print("\n 🏟️  SPRÁVA SPORTBOOKING DATABÁZE")
+        print(f"\n 🏟️  SPRÁVA SPORTBOOKING DATABÁZE ({settings.db_name})")
         print("1. Výpis všech uživatelů")
         print("2. Přidání uživatele")
         print("3. Výpis všech sportovišť")
@@ -16,6 +34,7 @@ def menu():
         print("7. Změna statusu rezervace")
         print("8. Smazání uživatele")
         print("9. Smazání rezervace")
+        print("10. Export rezervací do souboru")
         print("0. Konec")
         
         volba = input("Zadej volbu: ")
@@ -29,7 +48,10 @@ def menu():
             password = input("Heslo: ")
             add_user(username, email, password)
         elif volba == "3":
-            get_all_facilities()
+            print("--- Sportoviště ---")
+            for facility_id, name, available in get_all_facilities():
+                dostupnost = "ANO" if available else "NE"
+                print(f"ID: {facility_id}, Název: {name}, Dostupné: {dostupnost}")
         elif volba == "4":
             name = input("Název sportoviště: ")
             description = input("Popis: ")
@@ -40,9 +62,14 @@ def menu():
             facility_id = int(input("ID sportoviště: "))
             start = input("Začátek (YYYY-MM-DD HH:MM:SS): ")
             end = input("Konec (YYYY-MM-DD HH:MM:SS): ")
-            add_reservation(user_id, facility_id, start, end)
+            try:
+                add_reservation(user_id, facility_id, start, end)
+            except ReservationConflictError as e:
+                print(f"❗ Termín koliduje s rezervacemi: {e.conflicting_ids}")
         elif volba == "6":
-            get_all_reservations()
+            print("--- Rezervace ---")
+            for res_id, user_id, facility_id, start, end, status in get_all_reservations():
+                print(f"ID: {res_id}, Uživatel: {user_id}, Sportoviště: {facility_id}, Od: {start}, Do: {end}, Stav: {status}")
         elif volba == "7":
             rid = int(input("ID rezervace: "))
             status = input("Nový status (pending/confirmed/cancelled): ")
@@ -55,6 +82,13 @@ def menu():
         elif volba == "9":
             rid = int(input("ID rezervace ke smazání: "))
             delete_reservation(rid)
+        elif volba == "10":
+            export_format = input("Formát (ndjson/csv): ").strip() or "ndjson"
+            if export_format not in EXPORT_FORMATS:
+                print("Neplatný formát!")
+                continue
+            output = input("Cílový soubor: ").strip() or f"reservations.{export_format}"
+            export_reservations(export_format, output)
         elif volba == "0":
             print("Ukončuji aplikaci...")
             break
@@ -62,4 +96,23 @@ def menu():
             print("Neplatná volba!")
 
 if __name__ == "__main__":
-    menu()
+    parser = argparse.ArgumentParser(description="Správa databáze Sportbooking.")
+    subparsers = parser.add_subparsers(dest="command")
+    export_parser = subparsers.add_parser("export", help="export rezervací (např. pro noční kontrolu)")
+    export_parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    export_parser.add_argument("--output", required=True, help="cílový soubor")
+    for name in ("user_id", "facility_id", "status", "date", "date_from", "date_to", "time_from", "time_to"):
+        export_parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+    subparsers.add_parser("rebuild-slots", help="naplnění reservation_slots ze stávajících rezervací (SLOT_BOOKING)")
+    args = parser.parse_args()
+    configure_logging(get_settings())
+
+    if args.command == "export":
+        filters = {name: value for name, value in vars(args).items()
+                   if name not in ("command", "format", "output") and value}
+        export_reservations(args.format, args.output, **filters)
+    elif args.command == "rebuild-slots":
+        count = rebuild_reservation_slots()
+        print(f"🧩 Sloty zapsány pro {count} rezervací.")
+    else:
+        menu()
@@ -0,0 +1,187 @@
+import bisect
+import contextvars
+import threading
+import time
+
+# Hranice košů histogramů v sekundách (Prometheus "le")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Hranice pro počty (dotazy, řádky na požadavek)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class Histogram:
+    """Histogram s pevnými koši, rozdělený podle štítků (labels)."""
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # štítky -> [počty v koších (nekumulativně) + přetečení, součet, počet]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            base = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(base + [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(base)} {total}")
+            lines.append(f"{self.name}_count{_labels(base)} {count}")
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Gauge:
+    """Okamžitá hodnota (např. připojení v použití) a její maximum od startu."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def inc(self):
+        with self._lock:
+            self.value += 1
+            self.peak = max(self.peak, self.value)
+
+    def dec(self):
+        with self._lock:
+            self.value -= 1
+
+    def render(self):
+        return "\n".join([
+            f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}",
+            f"# HELP {self.name}_max Maximum od startu procesu", f"# TYPE {self.name}_max gauge",
+            f"{self.name}_max {self.peak}",
+        ])
+
+    def clear(self):
+        # Aktuální hodnota odpovídá skutečnému stavu – nuluje se jen maximum
+        with self._lock:
+            self.peak = self.value
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(parts):
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class RequestStats:
+    """Počítadla jednoho HTTP požadavku (čas v sekundách)."""
+
+    __slots__ = ("started", "connect", "pool_wait", "query", "queries", "rows", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.connect = 0.0
+        self.pool_wait = 0.0
+        self.query = 0.0
+        self.queries = 0
+        self.rows = 0
+        # Normalizované SQL jednotlivých dotazů – jen při zapnutém QUERY_BUDGET (profiler.py)
+        self.statements = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        """Hodnota hlavičky Server-Timing (doby v milisekundách)."""
+        return ", ".join([
+            f"db;desc=\"{self.queries} queries, {self.rows} rows\";dur={self.query * 1000:.2f}",
+            f"connect;dur={self.connect * 1000:.2f}",
+            f"pool;dur={self.pool_wait * 1000:.2f}",
+            f"app;dur={total * 1000:.2f}",
+        ])
+
+
+_current_request = contextvars.ContextVar("request_stats", default=None)
+
+def start_request():
+    stats = RequestStats()
+    _current_request.set(stats)
+    return stats
+
+def end_request():
+    _current_request.set(None)
+
+def current_request():
+    """Počítadla právě obsluhovaného požadavku, mimo požadavek None."""
+    return _current_request.get()
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Doba obsluhy HTTP požadavku", ("method", "route", "status"))
+request_queries = Histogram(
+    "db_queries_per_request", "Počet SQL dotazů na HTTP požadavek", ("route",), COUNT_BUCKETS)
+request_rows = Histogram(
+    "db_rows_per_request", "Počet načtených řádků na HTTP požadavek", ("route",), COUNT_BUCKETS)
+query_duration = Histogram("db_query_duration_seconds", "Doba provedení SQL dotazu")
+connect_duration = Histogram("db_connect_duration_seconds", "Doba otevření nového připojení k DB")
+pool_wait_duration = Histogram("db_pool_wait_seconds", "Doba čekání na volné připojení z poolu")
+connections_in_use = Gauge("db_connections_in_use", "Počet připojení k DB právě v použití")
+
+REGISTRY = (request_duration, request_queries, request_rows, query_duration, connect_duration,
+            pool_wait_duration, connections_in_use)
+
+def record_query(seconds):
+    query_duration.observe(seconds)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query += seconds
+
+def record_rows(count):
+    stats = _current_request.get()
+    if stats is not None:
+        stats.rows += count
+
+def record_connect(seconds):
+    connect_duration.observe(seconds)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.connect += seconds
+
+def record_pool_wait(seconds):
+    pool_wait_duration.observe(seconds)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+def record_request(stats, method, route, status):
+    total = stats.elapsed()
+    request_duration.observe(total, method, route, str(status))
+    request_queries.observe(stats.queries, route)
+    request_rows.observe(stats.rows, route)
+    return total
+
+def render_metrics():
+    """Všechny metriky v textovém formátu Prometheus (text/plain; version=0.0.4)."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+def clear_metrics():
+    for metric in REGISTRY:
+        metric.clear()
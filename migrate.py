@@ -0,0 +1,149 @@
+import argparse
+import logging
+import os
+import re
+from mysql.connector import Error, errorcode
+from config import get_settings
+from db import connect_to_db
+from logging_setup import configure_logging
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Chyby, které znamenají, že změna už v databázi je (např. DB vytvořená
+# přímo z databaze_struktura.sql) – příkaz pak jen přeskočíme. Platí jen pro
+# příkaz, který tím je idempotentní: chyba -> (příkaz, klauzule ALTER TABLE).
+# UPDATE, MODIFY a jiné změny dat se nepřeskakují nikdy.
+_ALREADY_APPLIED = {
+    errorcode.ER_TABLE_EXISTS_ERROR: ("CREATE TABLE", ()),
+    errorcode.ER_DUP_KEYNAME: ("CREATE (UNIQUE )?INDEX", ("ADD INDEX", "ADD KEY", "ADD UNIQUE")),
+    errorcode.ER_CANT_DROP_FIELD_OR_KEY: ("DROP INDEX", ("DROP INDEX", "DROP KEY", "DROP COLUMN",
+                                                         "DROP FOREIGN KEY")),
+    errorcode.ER_DUP_FIELDNAME: (None, ("ADD COLUMN",)),
+    errorcode.ER_FK_DUP_NAME: (None, ("ADD CONSTRAINT",)),
+}
+
+# Kontroly dat před migrací: verze -> (dotaz na počet řádků, které migrace neumí
+# převést, zpráva). Při nálezu se migrace vůbec nezačne – nic nezůstane napůl.
+_PRECHECKS = {
+    4: ("SELECT COUNT(*) FROM reservations WHERE date IS NULL OR start_time IS NULL OR end_time IS NULL",
+        "Rezervace bez data nebo času nelze převést na start_at/end_at – doplňte je nebo smažte"),
+}
+
+class MigrationError(Exception):
+    """Data v databázi neumožňují migraci aplikovat."""
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """Vrátí seznam (verze, název, cesta) migrací seřazený podle čísla verze."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = re.fullmatch(r"(\d+)_(\w+)\.sql", filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    return sorted(migrations)
+
+def split_statements(sql):
+    """Rozdělí SQL skript na jednotlivé příkazy (bez komentářů '--')."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+def _words(text):
+    return " ".join(text.upper().split())
+
+def _alter_clauses(statement):
+    """Klauzule ALTER TABLE (rozdělené podle čárek mimo závorky a řetězce)."""
+    match = re.match(r"ALTER\s+TABLE\s+\S+\s+(.*)", statement, re.I | re.S)
+    if not match:
+        return []
+    clauses, depth, quote, start = [], 0, None, 0
+    body = match.group(1)
+    for i, char in enumerate(body):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char in "()":
+            depth += 1 if char == "(" else -1
+        elif char == "," and depth == 0:
+            clauses.append(body[start:i])
+            start = i + 1
+    clauses.append(body[start:])
+    return [_words(clause) for clause in clauses]
+
+def _already_applied(statement, errno):
+    """Znamená chyba errno u tohoto příkazu, že jeho změna už v databázi je?"""
+    if errno not in _ALREADY_APPLIED:
+        return False
+    command, clause_prefixes = _ALREADY_APPLIED[errno]
+    text = _words(statement)
+    if command and re.match(command + r"\b", text):
+        return True
+    clauses = _alter_clauses(statement)
+    return bool(clauses) and all(clause.startswith(clause_prefixes) for clause in clauses)
+
+def get_applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_version")
+    return {row[0] for row in cursor.fetchall()}
+
+def apply_migrations(conn=None, testing=False, directory=MIGRATIONS_DIR):
+    """
+    Aplikuje všechny dosud neaplikované migrace v pořadí verzí a vrátí jejich čísla.
+    Opakované spuštění nic nemění (idempotentní).
+    """
+    close_conn = False
+    if conn is None:
+        conn = connect_to_db(testing=testing)
+        close_conn = True
+
+    cursor = conn.cursor()
+    applied = get_applied_versions(cursor)
+    newly_applied = []
+
+    for version, name, path in list_migrations(directory):
+        if version in applied:
+            continue
+        with open(path, encoding="utf-8") as f:
+            statements = split_statements(f.read())
+        if version in _PRECHECKS:
+            query, message = _PRECHECKS[version]
+            cursor.execute(query)
+            (count,) = cursor.fetchone()
+            if count:
+                conn.rollback()
+                raise MigrationError(f"Migrace {version:04d}_{name}: {message} ({count} řádků)")
+        for statement in statements:
+            try:
+                cursor.execute(statement)
+            except Error as e:
+                if not _already_applied(statement, e.errno):
+                    conn.rollback()
+                    raise
+        cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (version, name))
+        conn.commit()
+        newly_applied.append(version)
+        log.info("Migrace %04d_%s aplikována", version, name)
+
+    cursor.close()
+    if close_conn:
+        conn.close()
+
+    return newly_applied
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplikuje SQL migrace ze složky migrations/.")
+    parser.add_argument("--testing", action="store_true", help="použít testovací databázi (.env.test)")
+    args = parser.parse_args()
+    configure_logging(get_settings(testing=args.testing))
+
+    versions = apply_migrations(testing=args.testing)
+    if not versions:
+        print("✅ Databáze je aktuální.")
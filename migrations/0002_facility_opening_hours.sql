@@ -0,0 +1,4 @@
+-- Otevírací doba sportovišť (pro výpočet volných termínů)
+ALTER TABLE facilities
+    ADD COLUMN opening_time TIME NOT NULL DEFAULT '08:00:00',
+    ADD COLUMN closing_time TIME NOT NULL DEFAULT '22:00:00';
@@ -0,0 +1,5 @@
+-- Složené indexy podle přístupových cest k rezervacím:
+-- sportoviště + den (dostupnost, kolize), uživatel + den, stav + den
+CREATE INDEX idx_reservations_facility_date_start ON reservations (facility_id, date, start_time);
+CREATE INDEX idx_reservations_user_date ON reservations (user_id, date);
+CREATE INDEX idx_reservations_status_date ON reservations (status, date);
@@ -0,0 +1,32 @@
+-- Rezervace jako indexovatelný rozsah start_at/end_at (DATETIME).
+-- Sloupce date/start_time/end_time zůstávají kvůli zpětné kompatibilitě
+-- jako generované (STORED) sloupce odvozené z rozsahu.
+ALTER TABLE reservations
+    ADD COLUMN start_at DATETIME NULL AFTER facility_id,
+    ADD COLUMN end_at DATETIME NULL AFTER start_at;
+
+-- Řádky bez data nebo času by tu dostaly NULL a MODIFY … NOT NULL by selhal až po
+-- změně schématu – migrate.py (_PRECHECKS) je proto odmítne před prvním příkazem.
+UPDATE reservations
+SET start_at = TIMESTAMP(date, start_time),
+    end_at = TIMESTAMP(date, end_time)
+WHERE start_at IS NULL;
+
+ALTER TABLE reservations
+    MODIFY start_at DATETIME NOT NULL,
+    MODIFY end_at DATETIME NOT NULL;
+
+ALTER TABLE reservations
+    MODIFY date DATE GENERATED ALWAYS AS (DATE(start_at)) STORED,
+    MODIFY start_time TIME GENERATED ALWAYS AS (TIME(start_at)) STORED,
+    MODIFY end_time TIME GENERATED ALWAYS AS (TIME(end_at)) STORED;
+
+-- Indexy nad rozsahem nahrazují indexy nad sloupcem date z migrace 0003
+-- (nové se zakládají dřív, aby cizí klíče měly pořád svůj index)
+CREATE INDEX idx_reservations_facility_start ON reservations (facility_id, start_at, end_at);
+CREATE INDEX idx_reservations_user_start ON reservations (user_id, start_at);
+CREATE INDEX idx_reservations_status_start ON reservations (status, start_at);
+
+DROP INDEX idx_reservations_facility_date_start ON reservations;
+DROP INDEX idx_reservations_user_date ON reservations;
+DROP INDEX idx_reservations_status_date ON reservations;
@@ -0,0 +1,22 @@
+-- Opakované rezervace: série s pravidlem opakování, výskyty odkazují přes series_id.
+CREATE TABLE reservation_series (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT,
+    facility_id INT,
+    frequency ENUM('daily', 'weekly') NOT NULL,
+    repeat_interval INT NOT NULL DEFAULT 1,
+    first_start_at DATETIME NOT NULL,
+    first_end_at DATETIME NOT NULL,
+    until_date DATE NULL,
+    occurrence_count INT NULL,
+    exclude_dates TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
+);
+
+ALTER TABLE reservations ADD COLUMN series_id INT NULL AFTER facility_id;
+
+ALTER TABLE reservations
+    ADD CONSTRAINT fk_reservations_series FOREIGN KEY (series_id)
+    REFERENCES reservation_series(id) ON DELETE SET NULL;
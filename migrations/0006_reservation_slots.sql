@@ -0,0 +1,13 @@
+-- Volitelný slotový model (SLOT_BOOKING=true): každá nezrušená rezervace zabere
+-- řádky (sportoviště, den, index slotu). Dvojí rezervaci odmítne unikátní klíč
+-- bez zamykacích čtení. Při zapnutí na existujících datech: python main.py rebuild-slots
+CREATE TABLE reservation_slots (
+    facility_id INT NOT NULL,
+    date DATE NOT NULL,
+    slot_index SMALLINT NOT NULL,
+    reservation_id INT NOT NULL,
+    UNIQUE KEY uq_reservation_slots (facility_id, date, slot_index),
+    INDEX idx_reservation_slots_reservation (reservation_id),
+    FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE,
+    FOREIGN KEY (reservation_id) REFERENCES reservations(id) ON DELETE CASCADE
+);
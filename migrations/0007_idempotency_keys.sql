@@ -0,0 +1,11 @@
+-- Klíče Idempotency-Key s uloženou odpovědí (IDEMPOTENCY_STORE=db).
+-- Řádek bez status_code patří požadavku, který ještě běží.
+CREATE TABLE idempotency_keys (
+    idem_key VARCHAR(255) NOT NULL PRIMARY KEY,
+    fingerprint CHAR(64) NOT NULL,
+    status_code SMALLINT NULL,
+    body MEDIUMTEXT NULL,
+    content_type VARCHAR(100) NULL,
+    expires_at DATETIME NOT NULL,
+    INDEX idx_idempotency_keys_expires (expires_at)
+);
@@ -0,0 +1,16 @@
+-- Trvalá fronta rezervací sdílená procesy (BOOKING_QUEUE=db).
+-- Požadavek čeká ve stavu queued, zpracovávaný je processing (od claimed_at);
+-- výsledek (id rezervace nebo důvod odmítnutí) je v result jako JSON.
+CREATE TABLE booking_requests (
+    ticket CHAR(32) NOT NULL PRIMARY KEY,
+    user_id INT NOT NULL,
+    facility_id INT NOT NULL,
+    start_at DATETIME NOT NULL,
+    end_at DATETIME NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    state ENUM('queued', 'processing', 'created', 'rejected', 'failed') NOT NULL DEFAULT 'queued',
+    result TEXT NULL,
+    claimed_at DATETIME NULL,
+    created_at DATETIME NOT NULL,
+    INDEX idx_booking_requests_state (state, created_at)
+);
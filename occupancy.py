@@ -0,0 +1,162 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+from time import monotonic
+import numpy as np
+from availability import minutes_since, to_minutes
+
+class DayOccupancy:
+    """
+    Obsazenost všech sportovišť v jednom dni jako bitová mapa:
+    matice bool (sportoviště × sloty), True = obsazeno nebo zavřeno.
+    """
+
+    def __init__(self, facility_ids, slot_minutes):
+        self.slot_minutes = slot_minutes
+        self.facility_ids = np.asarray(facility_ids, dtype=np.int64)
+        self._rows = {int(facility_id): row for row, facility_id in enumerate(facility_ids)}
+        self.busy = np.zeros((len(facility_ids), 24 * 60 // slot_minutes), dtype=bool)
+
+    def _slots(self, start_minute, end_minute):
+        # Slot je obsazený, pokud do něj interval zasahuje aspoň částečně
+        return start_minute // self.slot_minutes, -(-end_minute // self.slot_minutes)
+
+    def mark(self, facility_id, start_minute, end_minute):
+        row = self._rows.get(int(facility_id))
+        if row is not None:
+            first, last = self._slots(max(start_minute, 0), min(end_minute, 24 * 60))
+            self.busy[row, first:last] = True
+
+    def free_facilities(self, start_minute, end_minute):
+        """Id sportovišť volných po celé okno [start, end)."""
+        first, last = self._slots(start_minute, end_minute)
+        return self.facility_ids[~self.busy[:, first:last].any(axis=1)].tolist()
+
+    def first_free(self, length_minutes, start_minute=0, end_minute=24 * 60):
+        """
+        Pro každé sportoviště první volné okno délky length v rámci [start, end)
+        jako (facility_id, začátek, konec) v minutách; sportoviště bez okna chybí.
+        Okna začínají na hranici slotu.
+        """
+        needed = -(-length_minutes // self.slot_minutes)
+        first = -(-start_minute // self.slot_minutes)
+        last = end_minute // self.slot_minutes
+        if needed == 0 or last - first < needed:
+            return []
+
+        free = ~self.busy[:, first:last]
+        # Součet přes klouzavé okno pomocí kumulativního součtu: okno je volné,
+        # pokud obsahuje needed volných slotů
+        totals = np.concatenate(
+            [np.zeros((free.shape[0], 1), dtype=np.int64), np.cumsum(free, axis=1)], axis=1)
+        window_free = (totals[:, needed:] - totals[:, :-needed]) == needed
+        has_window = window_free.any(axis=1)
+        offsets = window_free.argmax(axis=1)
+
+        results = []
+        for facility_id, offset in zip(self.facility_ids[has_window], offsets[has_window]):
+            start = (first + int(offset)) * self.slot_minutes
+            results.append((int(facility_id), start, start + length_minutes))
+        return results
+
+
+def build_day(day, facilities, reservations, slot_minutes, opening_time, closing_time):
+    """
+    Sestaví DayOccupancy dne day. facilities jsou řádky s id, available,
+    opening_time, closing_time (mimo otevírací dobu je obsazeno, nedostupné
+    sportoviště celé), reservations řádky s facility_id, start_at, end_at.
+    """
+    occupancy = DayOccupancy([facility["id"] for facility in facilities], slot_minutes)
+    for facility in facilities:
+        if not facility.get("available", True):
+            occupancy.mark(facility["id"], 0, 24 * 60)
+            continue
+        opening = to_minutes(facility.get("opening_time") or opening_time)
+        closing = to_minutes(facility.get("closing_time") or closing_time, round_up=True)
+        occupancy.mark(facility["id"], 0, opening)
+        occupancy.mark(facility["id"], closing, 24 * 60)
+
+    for reservation in reservations:
+        occupancy.mark(reservation["facility_id"], minutes_since(day, reservation["start_at"]),
+                       minutes_since(day, reservation["end_at"], round_up=True))
+    return occupancy
+
+def day_window(day):
+    """Rozsah [půlnoc, další půlnoc) – rezervace z předchozího dne mohou zasahovat přes půlnoc."""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+class OccupancyIndex:
+    """
+    LRU registr DayOccupancy podle data. Nové rezervace se do načteného dne
+    jen dopíšou (mark); zrušení a změny sportovišť den zahodí – při dalším
+    dotazu se sestaví znovu. mark() ale vidí jen rezervace vlastního procesu,
+    takže den se po ttl sekundách sestaví z databáze celý znovu (0 = nikdy).
+    """
+
+    def __init__(self, slot_minutes=15, maxsize=366, ttl=0, clock=monotonic):
+        self.slot_minutes = slot_minutes
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        # Den -> okamžik vypršení (u ttl=0 se neeviduje)
+        self._expires = {}
+        self._days = OrderedDict()
+        # Počítadlo invalidací – výsledek načtený před souběžným zápisem se neuloží
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def get(self, day):
+        with self._lock:
+            occupancy = self._days.get(day)
+            if occupancy is not None:
+                expires_at = self._expires.get(day)
+                if expires_at is not None and expires_at <= self._clock():
+                    del self._days[day]
+                    del self._expires[day]
+                    return None
+                self._days.move_to_end(day)
+            return occupancy
+
+    def put(self, day, occupancy, version):
+        with self._lock:
+            if version != self._version:
+                return
+            self._days[day] = occupancy
+            self._days.move_to_end(day)
+            if self.ttl > 0:
+                self._expires[day] = self._clock() + self.ttl
+            while len(self._days) > self.maxsize:
+                self._expires.pop(self._days.popitem(last=False)[0], None)
+
+    def mark(self, facility_id, start_at, end_at):
+        """Dopíše novou rezervaci do všech načtených dnů, do kterých zasahuje."""
+        with self._lock:
+            self._version += 1
+            day = start_at.date()
+            while datetime.combine(day, time.min) < end_at:
+                occupancy = self._days.get(day)
+                if occupancy is not None:
+                    occupancy.mark(facility_id, minutes_since(day, start_at),
+                                   minutes_since(day, end_at, round_up=True))
+                day += timedelta(days=1)
+
+    def invalidate(self, day=None):
+        with self._lock:
+            if day is None:
+                self._days.clear()
+                self._expires.clear()
+            else:
+                # Rezervace přes půlnoc zasahuje i do dalšího dne
+                for key in (day, day + timedelta(days=1)):
+                    self._days.pop(key, None)
+                    self._expires.pop(key, None)
+            self._version += 1
+
+    def clear(self):
+        self.invalidate()
@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+
+def parse_limit(value, default=50, maximum=500):
+    """
+    Velikost stránky z query parametru. Chybějící hodnota -> default,
+    větší než maximum se ořízne, takže neomezené čtení není možné.
+    """
+    if value is None or value == "":
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("Limit musí být kladný.")
+    return min(limit, maximum)
+
+def encode_cursor(values):
+    """Zakóduje klíč posledního řádku stránky do neprůhledného tokenu pro parametr after."""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token):
+    """Opak encode_cursor(); při poškozeném tokenu vyhodí ValueError."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Neplatný stránkovací token.") from e
+    if not isinstance(values, dict):
+        raise ValueError("Neplatný stránkovací token.")
+    return values
+
+def id_cursor(after):
+    """Klíč stránkování podle id; vrátí poslední id předchozí stránky nebo None."""
+    values = decode_cursor(after)
+    if values is None:
+        return None
+    try:
+        return int(values["id"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Neplatný stránkovací token.") from e
+
+def start_cursor(after):
+    """Klíč stránkování rezervací (start_at, id); vrátí dvojici nebo None."""
+    values = decode_cursor(after)
+    if values is None:
+        return None
+    try:
+        return datetime.fromisoformat(values["start_at"]), int(values["id"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Neplatný stránkovací token.") from e
@@ -0,0 +1,166 @@
+import functools
+import logging
+import random
+import re
+import threading
+from mysql.connector import Error
+from config import get_settings
+from metrics import current_request
+
+slow_query_log = logging.getLogger("sportbooking.slow_query")
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_REPEATED_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """
+    Tvar dotazu bez konkrétních hodnot: literály -> ?, seznamy parametrů
+    (IN (%s, %s, …), VALUES (…), (…)) -> (...), bílé znaky sloučené.
+    Dotazy skládané f-stringem se tak seskupí podle struktury.
+    """
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _REPEATED_LIST.sub("(...)", sql)
+
+def _is_select(sql):
+    return sql[:6].upper() == "SELECT"
+
+def _summarize_params(params, batch, limit=200):
+    if batch:
+        return f"<{len(params)} řádků>"
+    text = repr(params)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class QueryRecord:
+    """Jeden provedený dotaz; řádky a čas čtení se přičítají při fetch*()."""
+
+    __slots__ = ("sql", "params", "batch", "seconds", "rows")
+
+    def __init__(self, sql, params, batch, seconds):
+        self.sql = sql
+        self.params = params
+        self.batch = batch
+        self.seconds = seconds
+        self.rows = 0
+
+
+class QueryProfiler:
+    """
+    Souhrn dotazů podle normalizovaného SQL (počet, celkový a nejdelší čas,
+    vrácené řádky) a vzorkovaný log pomalých dotazů (logger sportbooking.slow_query)
+    s volitelným EXPLAIN.
+
+    - slow_ms: od jaké doby (ms) je dotaz pomalý; 0 log vypne
+    - sample: podíl pomalých dotazů, které se zapíšou (0–1)
+    - explain: k pomalému SELECT/UPDATE/DELETE přiloží EXPLAIN
+    - max_statements: kolik různých dotazů se nejvýš sleduje v souhrnu
+    """
+
+    def __init__(self, slow_ms=500, sample=1.0, explain=False, max_statements=1000):
+        self.slow_ms = slow_ms
+        self.sample = sample
+        self.explain = explain
+        self.max_statements = max_statements
+        # normalizované SQL -> [počet, celkový čas, nejdelší čas, vrácené řádky, ovlivněné řádky]
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(slow_ms=settings.slow_query_ms, sample=settings.slow_query_sample,
+                   explain=settings.slow_query_explain)
+
+    def finish(self, query, rowcount, conn=None):
+        """Uzavře dotaz (po přečtení výsledku nebo před dalším execute na kurzoru)."""
+        normalized = normalize_sql(query.sql)
+        # U SELECT je rowcount počet vrácených řádků, ten už je v query.rows
+        affected = 0 if _is_select(normalized) or rowcount is None or rowcount < 0 else rowcount
+        with self._lock:
+            entry = self._statements.get(normalized)
+            if entry is None and len(self._statements) < self.max_statements:
+                entry = self._statements[normalized] = [0, 0.0, 0.0, 0, 0]
+            if entry is not None:
+                entry[0] += 1
+                entry[1] += query.seconds
+                entry[2] = max(entry[2], query.seconds)
+                entry[3] += query.rows
+                entry[4] += affected
+
+        stats = current_request()
+        if stats is not None and stats.statements is not None:
+            stats.statements.append(normalized)
+
+        if self.slow_ms and query.seconds * 1000 >= self.slow_ms and random.random() < self.sample:
+            self._log_slow(query, normalized, affected, conn)
+
+    def _log_slow(self, query, normalized, affected, conn):
+        plan = self._explain(query, conn) if self.explain and conn is not None else None
+        fields = {
+            "sql": normalized,
+            "params": _summarize_params(query.params, query.batch),
+            "duration_ms": round(query.seconds * 1000, 2),
+            "rows_returned": query.rows,
+            "rows_affected": affected,
+        }
+        if plan is not None:
+            fields["explain"] = plan
+            # MySQL počet prozkoumaných řádků nevrací – použije se odhad z EXPLAIN
+            fields["rows_examined_estimate"] = sum(row.get("rows") or 0 for row in plan)
+        slow_query_log.warning("Pomalý dotaz (%.1f ms): %s", query.seconds * 1000, normalized,
+                               extra={"query": fields})
+
+    @staticmethod
+    def _explain(query, conn):
+        if query.batch or query.sql.lstrip()[:6].upper() not in ("SELECT", "UPDATE", "DELETE"):
+            return None
+        try:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute("EXPLAIN " + query.sql, query.params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        except Error:
+            # Připojení může mít nepřečtený výsledek jiného kurzoru – EXPLAIN se vynechá
+            return None
+
+    def stats(self, limit=20):
+        """Nejdražší dotazy podle celkového času."""
+        with self._lock:
+            items = [(sql, list(entry)) for sql, entry in self._statements.items()]
+        items.sort(key=lambda item: item[1][1], reverse=True)
+        return [
+            {"sql": sql, "count": count, "total_ms": round(total * 1000, 2),
+             "avg_ms": round(total * 1000 / count, 3), "max_ms": round(longest * 1000, 2),
+             "rows_returned": rows, "rows_affected": affected}
+            for sql, (count, total, longest, rows, affected) in items[:limit]
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._statements.clear()
+
+
+def check_query_budget(stats, budget, method, route):
+    """Varování, pokud požadavek provedl víc než budget dotazů (typicky N+1)."""
+    if not budget or stats.queries <= budget:
+        return False
+    top = {}
+    for sql in stats.statements or ():
+        top[sql] = top.get(sql, 0) + 1
+    repeated = sorted(top.items(), key=lambda item: item[1], reverse=True)[:5]
+    slow_query_log.warning(
+        "Požadavek %s %s provedl %d dotazů (limit %d)", method, route, stats.queries, budget,
+        extra={"query_budget": {"queries": stats.queries, "budget": budget,
+                                "top": [{"sql": sql, "count": count} for sql, count in repeated]}})
+    return True
+
+
+query_profiler = QueryProfiler.from_settings(get_settings())
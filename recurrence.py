@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+# Podporované frekvence opakování -> krok v dnech
+FREQUENCIES = {
+    "daily": 1,
+    "weekly": 7,
+}
+
+# Horní mez počtu výskytů jedné série (ochrana před pravidlem "každý den navždy")
+MAX_OCCURRENCES = 500
+
+def expand_rule(start_at, end_at, frequency, interval=1, until=None, count=None, exclude=()):
+    """
+    Rozvine pravidlo opakování na seznam termínů (start, end).
+
+    start_at/end_at je první výskyt, další se posouvají o interval dní
+    (daily) nebo týdnů (weekly). Série končí dnem until (včetně) nebo po count
+    výskytech – aspoň jedno musí být zadané. Dny z exclude se přeskočí
+    (do count se nepočítají). Výskyt nesmí být delší než krok opakování,
+    jinak by se výskyty překrývaly. Neplatné pravidlo vyhodí ValueError.
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Nepodporovaná frekvence: {frequency}")
+    if interval < 1:
+        raise ValueError("Interval musí být kladný")
+    if until is None and count is None:
+        raise ValueError("Chybí konec série (until nebo count)")
+    if count is not None and not 1 <= count <= MAX_OCCURRENCES:
+        raise ValueError(f"Počet výskytů musí být 1–{MAX_OCCURRENCES}")
+    if end_at <= start_at:
+        raise ValueError("Konec rezervace musí být po jejím začátku")
+
+    step = timedelta(days=FREQUENCIES[frequency] * interval)
+    duration = end_at - start_at
+    if duration > step:
+        raise ValueError("Výskyt je delší než krok opakování – výskyty by se překrývaly")
+    excluded = set(exclude)
+
+    occurrences = []
+    start = start_at
+    while (until is None or start.date() <= until) and (count is None or len(occurrences) < count):
+        if start.date() not in excluded:
+            if len(occurrences) == MAX_OCCURRENCES:
+                raise ValueError(f"Série má víc než {MAX_OCCURRENCES} výskytů")
+            occurrences.append((start, start + duration))
+        start += step
+    return occurrences
+
+def parse_exclude(values):
+    """Seznam dat 'YYYY-MM-DD' (nebo date) -> množina date; neplatné datum je ValueError."""
+    return {value if isinstance(value, date) else date.fromisoformat(str(value)) for value in values or ()}
+
+def format_exclude(days):
+    # Uložení výjimek do sloupce reservation_series.exclude_dates
+    return ",".join(sorted(day.isoformat() for day in days)) or None
@@ -1,14 +1,73 @@
-from db import connect_to_db
+import logging
+from datetime import datetime, date, time, timedelta
+from mysql.connector import Error, IntegrityError, errorcode
+from db import connect_to_db, current_unit_of_work
+from config import get_settings
+from availability import (
+    availability_cache, compute_free_intervals, to_minutes, minutes_since, format_minutes, slot_keys)
+from intervals import IntervalIndex, reservation_index
+from occupancy import OccupancyIndex, build_day, day_window
+from cache import ReadThroughCache, make_backend
+from importer import RESERVATION_STATUSES, ImportReport, batched, validate_user, validate_reservation
+from recurrence import expand_rule, format_exclude
+
+log = logging.getLogger(__name__)
+
+# Read-through cache pro nejčastější čtení (uživatel / sportoviště podle id).
+# Každý zápis, který řádek mění, ho musí zneplatnit (invalidate_user / invalidate_facility).
+_settings = get_settings()
+entity_cache = ReadThroughCache(
+    maxsize=_settings.entity_cache_size,
+    ttl=_settings.entity_cache_ttl,
+    backend=make_backend(_settings.cache_url),
+)
+# Bitové mapy obsazenosti všech sportovišť po dnech (hledání volného sportoviště)
+occupancy_index = OccupancyIndex(slot_minutes=_settings.slot_minutes, ttl=_settings.occupancy_cache_ttl)
+
+
+def _acquire(conn):
+    """
+    Vrátí (připojení, zavřít_po_použití). Bez conn se uvnitř unit_of_work
+    použije jeho připojení, jinak se vezme nové z poolu.
+    """
+    if conn is not None:
+        return conn, False
+    uow = current_unit_of_work()
+    if uow is not None:
+        return uow.conn, False
+    return connect_to_db(), True
+
+def _in_unit_of_work(conn):
+    uow = current_unit_of_work()
+    return uow is not None and uow.conn is conn
+
+def _commit(conn):
+    # V unit_of_work se commit odkládá na jeho konec (jedna transakce místo mnoha)
+    if not _in_unit_of_work(conn):
+        conn.commit()
+
+def _after_commit(conn, callback):
+    # Zneplatnění cache až po commitu – v unit_of_work tedy až na jeho konci
+    if _in_unit_of_work(conn):
+        current_unit_of_work().on_commit(callback)
+    else:
+        callback()
+
+
+class ReservationConflictError(Exception):
+    """Rezervace se překrývá s existujícími (nezrušenými) rezervacemi sportoviště."""
+
+    def __init__(self, conflicting_ids):
+        self.conflicting_ids = list(conflicting_ids)
+        super().__init__(f"Termín koliduje s rezervacemi {self.conflicting_ids}")
+
 
 def get_all_users(conn=None):
     """
     Vrátí seznam všech uživatelů z tabulky users.
     Pokud není předáno připojení (conn), funkce si vytvoří vlastní.
     """
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
     cursor.execute("SELECT id, username, email FROM users")
@@ -21,93 +80,329 @@ def get_all_users(conn=None):
     return results
 
 def get_all_facilities(conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, available FROM facilities")
     results = cursor.fetchall()
-    print("--- Sportoviště ---")
-    for facility_id, name, available in results:
-        dostupnost = "ANO" if available else "NE"
-        print(f"ID: {facility_id}, Název: {name}, Dostupné: {dostupnost}")
     cursor.close()
     if close_conn:
         conn.close()
     return results
 
 def get_all_reservations(conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
     cursor = conn.cursor()
     cursor.execute("""
-        SELECT id, user_id, facility_id, start_time, end_time, status 
-        FROM reservation
+        SELECT id, user_id, facility_id, start_at, end_at, status
+        FROM reservations
     """)
     results = cursor.fetchall()
-    print("--- Rezervace ---")
-    for res_id, user_id, facility_id, start, end, status in results:
-        print(f"ID: {res_id}, Uživatel: {user_id}, Sportoviště: {facility_id}, Od: {start}, Do: {end}, Stav: {status}")
     cursor.close()
     if close_conn:
         conn.close()
     return results
 
 def add_user(username, email, password, role='user', conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
     cursor.execute(
         "INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)",
         (username, email, password, role)
     )
-    conn.commit()
-    print("✅ Uživatel přidán.")
+    _commit(conn)
+    log.info("Uživatel přidán", extra={"username": username})
     cursor.close()
     if close_conn:
         conn.close()
 
 def add_facility(name, description, available=True, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
     cursor.execute(
         "INSERT INTO facilities (name, description, available) VALUES (%s, %s, %s)",
         (name, description, available)
     )
-    conn.commit()
-    print("✅ Sportoviště přidáno.")
+    _commit(conn)
+    _after_commit(conn, occupancy_index.clear)
+    log.info("Sportoviště přidáno", extra={"facility_name": name})
     cursor.close()
     if close_conn:
         conn.close()
 
-def add_reservation(user_id, facility_id, start_time, end_time, status="pending", conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+def _to_datetime(value):
+    """Převede datetime nebo řetězec 'YYYY-MM-DD HH:MM[:SS]' na datetime."""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).strip())
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+def _to_time(value):
+    if isinstance(value, time):
+        return value
+    return time.fromisoformat(str(value).strip())
+
+def _day_bounds(day):
+    """Rozsah [půlnoc, další půlnoc) dne – dotaz na start_at pak jde přes index rozsahem."""
+    start = datetime.combine(_to_date(day), time.min)
+    return start, start + timedelta(days=1)
+
+def _conflict_bounds(day):
+    """Rozsah start_at pro kontrolu kolizí – od půlnoci předchozího dne kvůli rezervacím přes půlnoc."""
+    start, end = _day_bounds(day)
+    return start - timedelta(days=1), end
+
+def _load_day_index(conn, facility_id, day):
+    # Načte celý den sportoviště do in-process indexu (bez zamykání) – i s rezervacemi
+    # předchozího dne, které končí až po půlnoci (mají záporný začátek v minutách)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, start_at, end_at FROM reservations
+        WHERE facility_id = %s AND start_at >= %s AND start_at < %s AND end_at > %s
+          AND status != 'cancelled'
+    """, (facility_id, *_conflict_bounds(day), _day_bounds(day)[0]))
+    rows = cursor.fetchall()
+    cursor.close()
+    index = IntervalIndex(
+        (minutes_since(day, start), minutes_since(day, end, round_up=True), res_id)
+        for res_id, start, end in rows
+    )
+    reservation_index.put(facility_id, day, index)
+
+def _find_conflicts(conn, cursor, facility_id, start, end):
+    """
+    Vrátí id rezervací, se kterými by nový termín kolidoval.
+
+    Nejdřív se zeptá in-process indexu – při nalezené kolizi ji jen ověří přes
+    primární klíč a rezervaci odmítne bez zamykání. Jinak rozhoduje databáze:
+    zamykací čtení (FOR UPDATE) drží zámek na rozsahu až do commitu INSERTu,
+    takže souběžná rezervace stejného termínu musí počkat.
+    Rezervace patří ke dni, ve kterém začíná. Kolidovat s ní může i rezervace
+    předchozího dne přes půlnoc, proto rozsah start_at začíná předchozím dnem
+    (stejně jako get_day_occupancy).
+    """
+    day = start.date()
+    start_m, end_m = minutes_since(day, start), minutes_since(day, end, round_up=True)
+    overlap = ("facility_id = %s AND start_at >= %s AND start_at < %s AND end_at > %s"
+               " AND status != 'cancelled'")
+    params = (facility_id, _conflict_bounds(day)[0], end, start)
+
+    candidates = reservation_index.overlaps(facility_id, day, start_m, end_m)
+    if candidates is None:
+        _load_day_index(conn, facility_id, day)
+        candidates = reservation_index.overlaps(facility_id, day, start_m, end_m)
+
+    if candidates:
+        placeholders = ", ".join(["%s"] * len(candidates))
+        cursor.execute(f"SELECT id FROM reservations WHERE id IN ({placeholders}) AND {overlap}",
+                       (*candidates, *params))
+        confirmed = [row[0] for row in cursor.fetchall()]
+        if confirmed:
+            return confirmed
+        # Index byl zastaralý (rezervace zrušená jiným procesem)
+        reservation_index.invalidate(facility_id, day)
+
+    cursor.execute(f"SELECT id FROM reservations WHERE {overlap} FOR UPDATE", params)
+    conflicts = [row[0] for row in cursor.fetchall()]
+    if conflicts:
+        reservation_index.invalidate(facility_id, day)
+    return conflicts
+
+def _insert_slots(cursor, reservations):
+    """
+    Slotový model (SLOT_BOOKING): zapíše sloty rezervací (id, facility_id, start, end).
+    Obsazený slot odmítne unikátní klíč – vyhodí IntegrityError (ER_DUP_ENTRY).
+    """
+    slot_minutes = get_settings().slot_minutes
+    rows = [
+        (facility_id, day, index, reservation_id)
+        for reservation_id, facility_id, start, end in reservations
+        for day, index in slot_keys(start, end, slot_minutes)
+    ]
+    if rows:
+        cursor.executemany(
+            "INSERT INTO reservation_slots (facility_id, date, slot_index, reservation_id)"
+            " VALUES (%s, %s, %s, %s)", rows)
+
+def _sync_slots(cursor, reservation_ids):
+    # Po změně stavu: zrušené rezervace sloty uvolní, obnovené je znovu zaberou
+    placeholders = ", ".join(["%s"] * len(reservation_ids))
+    cursor.execute(f"DELETE FROM reservation_slots WHERE reservation_id IN ({placeholders})",
+                   reservation_ids)
+    cursor.execute(f"""
+        SELECT id, facility_id, start_at, end_at FROM reservations
+        WHERE id IN ({placeholders}) AND status != 'cancelled'
+    """, reservation_ids)
+    _insert_slots(cursor, cursor.fetchall())
+
+def _slot_conflicts(cursor, facility_id, start, end):
+    """Id rezervací, které drží některý ze slotů termínu (bez zamykání)."""
+    keys = slot_keys(start, end, get_settings().slot_minutes)
+    placeholders = ", ".join(["(%s, %s)"] * len(keys))
+    cursor.execute(f"""
+        SELECT DISTINCT reservation_id FROM reservation_slots
+        WHERE facility_id = %s AND (date, slot_index) IN ({placeholders})
+    """, (facility_id, *[value for key in keys for value in key]))
+    return [row[0] for row in cursor.fetchall()]
+
+def add_reservation(user_id, facility_id, start_at, end_at, status="pending", conn=None):
+    """
+    Přidá rezervaci a vrátí její id. Začátek a konec jsou datetime nebo
+    řetězce 'YYYY-MM-DD HH:MM[:SS]'. Pokud se termín překrývá s jinou
+    nezrušenou rezervací sportoviště, vyhodí ReservationConflictError.
+    """
+    conn, close_conn = _acquire(conn)
+
+    start, end = _to_datetime(start_at), _to_datetime(end_at)
+    day = start.date()
 
     cursor = conn.cursor()
     query = """
-        INSERT INTO reservations (user_id, facility_id, start_time, end_time, status)
+        INSERT INTO reservations (user_id, facility_id, start_at, end_at, status)
         VALUES (%s, %s, %s, %s, %s)
     """
-    data = (user_id, facility_id, start_time, end_time, status)
-    cursor.execute(query, data)
-    conn.commit()
-    print("✅ Rezervace přidána.")
-    cursor.close()
-    if close_conn:
-        conn.close()
+    data = (user_id, facility_id, start, end, status)
+    # V unit_of_work o rollbacku rozhoduje on – a po deadlocku už je celá jeho
+    # transakce zrušená, takže opakovat lze jen samostatnou rezervaci.
+    in_uow = _in_unit_of_work(conn)
+    # Slotový model: kolizi odmítne unikátní klíč reservation_slots, bez zamykacích čtení
+    slot_booking = get_settings().slot_booking and status != "cancelled"
+    try:
+        # Dvě souběžné transakce se mohou na zámcích rozsahu zablokovat –
+        # databáze jednu ukončí a ta se zopakuje (podruhé už kolizi uvidí).
+        for attempt in range(3):
+            try:
+                if status != "cancelled" and not slot_booking:
+                    conflicts = _find_conflicts(conn, cursor, facility_id, start, end)
+                    if conflicts:
+                        if not in_uow:
+                            conn.rollback()
+                        raise ReservationConflictError(conflicts)
+                if slot_booking and in_uow:
+                    cursor.execute("SAVEPOINT add_reservation")
+                cursor.execute(query, data)
+                reservation_id = cursor.lastrowid
+                if slot_booking:
+                    try:
+                        _insert_slots(cursor, [(reservation_id, facility_id, start, end)])
+                    except IntegrityError as e:
+                        if e.errno != errorcode.ER_DUP_ENTRY:
+                            raise
+                        if in_uow:
+                            cursor.execute("ROLLBACK TO SAVEPOINT add_reservation")
+                        else:
+                            conn.rollback()
+                        raise ReservationConflictError(
+                            _slot_conflicts(cursor, facility_id, start, end)) from None
+                _commit(conn)
+                break
+            except Error as e:
+                if in_uow:
+                    raise
+                conn.rollback()
+                if e.errno != errorcode.ER_LOCK_DEADLOCK or attempt == 2:
+                    raise
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+
+    def update_caches():
+        if status != "cancelled":
+            reservation_index.add(facility_id, day, minutes_since(day, start),
+                                  minutes_since(day, end, round_up=True), reservation_id)
+            next_day = day + timedelta(days=1)
+            if end > _day_bounds(next_day)[0]:
+                # Přes půlnoc – index následujícího dne ji drží se záporným začátkem
+                reservation_index.add(facility_id, next_day, minutes_since(next_day, start),
+                                      minutes_since(next_day, end, round_up=True), reservation_id)
+            occupancy_index.mark(facility_id, start, end)
+        availability_cache.invalidate(facility_id, day)
+    _after_commit(conn, update_caches)
+    log.debug("Rezervace %s přidána", reservation_id)
+    return reservation_id
+
+def add_reservation_series(user_id, facility_id, start_at, end_at, frequency, interval=1,
+                           until=None, count=None, exclude=(), status="pending", conn=None):
+    """
+    Založí opakovanou rezervaci (viz recurrence.expand_rule) a vrátí
+    (id série, id výskytů). Kolize všech výskytů se ověří jediným zamykacím
+    dotazem na rozsah celé série; při kolizi se nevloží nic a vyhodí se
+    ReservationConflictError. Série i výskyty se zapíší v jedné transakci.
+    Neznámý stav, uživatel nebo sportoviště je ValueError.
+    """
+    if status not in RESERVATION_STATUSES:
+        raise ValueError(f"Neplatný stav: {status}")
+    start, end = _to_datetime(start_at), _to_datetime(end_at)
+    occurrences = expand_rule(start, end, frequency, interval, until, count, exclude)
+    if not occurrences:
+        raise ValueError("Pravidlo nevytvořilo žádný výskyt")
+
+    conn, close_conn = _acquire(conn)
+    in_uow = _in_unit_of_work(conn)
+    cursor = conn.cursor()
+    try:
+        # Jako u importu a fronty: neexistující id se ohlásí dřív, než INSERT narazí na cizí klíč
+        if not _existing_ids(cursor, "users", [user_id]):
+            raise ValueError(f"Uživatel {user_id} neexistuje")
+        if not _existing_ids(cursor, "facilities", [facility_id]):
+            raise ValueError(f"Sportoviště {facility_id} neexistuje")
+        if status != "cancelled":
+            base_day = occurrences[0][0].date()
+            cursor.execute("""
+                SELECT id, start_at, end_at FROM reservations
+                WHERE facility_id = %s AND start_at >= %s AND start_at < %s AND end_at > %s
+                  AND status != 'cancelled'
+                FOR UPDATE
+            """, (facility_id, _conflict_bounds(base_day)[0], occurrences[-1][1], occurrences[0][0]))
+            index = IntervalIndex(
+                (minutes_since(base_day, s), minutes_since(base_day, e, round_up=True), res_id)
+                for res_id, s, e in cursor.fetchall()
+            )
+            conflicts = set()
+            for s, e in occurrences:
+                conflicts.update(index.overlaps(minutes_since(base_day, s),
+                                                minutes_since(base_day, e, round_up=True)))
+            if conflicts:
+                raise ReservationConflictError(sorted(conflicts))
+
+        cursor.execute("""
+            INSERT INTO reservation_series (user_id, facility_id, frequency, repeat_interval,
+                first_start_at, first_end_at, until_date, occurrence_count, exclude_dates)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (user_id, facility_id, frequency, interval, start, end, until, count,
+              format_exclude(exclude)))
+        series_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT INTO reservations (user_id, facility_id, series_id, start_at, end_at, status)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [(user_id, facility_id, series_id, s, e, status) for s, e in occurrences])
+        cursor.execute("SELECT id, facility_id, start_at, end_at FROM reservations"
+                       " WHERE series_id = %s ORDER BY start_at", (series_id,))
+        inserted = cursor.fetchall()
+        if get_settings().slot_booking and status != "cancelled":
+            _insert_slots(cursor, inserted)
+        reservation_ids = [row[0] for row in inserted]
+        _commit(conn)
+    except (Error, ReservationConflictError, ValueError):
+        if not in_uow:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+
+    days = {(facility_id, s.date()) for s, _ in occurrences}
+    _after_commit(conn, lambda: _invalidate_days(days))
+    return series_id, reservation_ids
 
 user_list = [
     ("jirka", "jirka@email.cz", "pw123", "user"),
@@ -115,111 +410,453 @@ user_list = [
 ]
 
 def add_multiple_users(user_list, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
     query = "INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)"
     cursor.executemany(query, user_list)
-    conn.commit()
-    print(f"✅ Vloženo {cursor.rowcount} uživatelů.")
+    _commit(conn)
+    log.info("Vloženo %d uživatelů", cursor.rowcount)
     cursor.close()
     if close_conn:
         conn.close()
 
+def _run_import(rows, validate, import_batch, batch_size=None, conn=None):
+    """
+    Společný průběh hromadného importu. rows jsou (číslo_řádku, slovník, chyba)
+    z importer.parse_*; zpracovávají se po dávkách batch_size řádků.
+
+    import_batch(cursor, valid, report) dostane validní řádky dávky, ohlásí
+    zamítnuté a vrátí (dotaz INSERT, přijaté řádky, akce po vložení, akce po
+    commitu). Přijaté řádky se vloží jedním executemany a dávka se commitne. Chyba databáze
+    vrátí jen svou dávku – import pokračuje další (v unit_of_work se vyhodí).
+    """
+    batch_size = batch_size or get_settings().import_batch_size
+    report = ImportReport()
+    conn, close_conn = _acquire(conn)
+    cursor = conn.cursor()
+    try:
+        for batch in batched(rows, batch_size):
+            valid = []
+            for line_no, data, error in batch:
+                if error is None:
+                    try:
+                        valid.append((line_no, validate(data)))
+                        continue
+                    except ValueError as e:
+                        error = str(e)
+                report.error(line_no, error)
+            if not valid:
+                continue
+
+            accepted = []
+            try:
+                query, accepted, after_insert, on_commit = import_batch(cursor, valid, report)
+                if accepted:
+                    cursor.executemany(query, [values for _, values in accepted])
+                    if after_insert:
+                        after_insert(cursor, accepted)
+                    _commit(conn)
+            except Error as e:
+                if _in_unit_of_work(conn):
+                    raise
+                conn.rollback()
+                for line_no, _ in accepted or valid:
+                    report.error(line_no, f"Chyba databáze: {e.msg}")
+                continue
+            report.inserted += len(accepted)
+            if accepted and on_commit:
+                _after_commit(conn, on_commit)
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+    return report
+
+def _existing_ids(cursor, table, ids):
+    if not ids:
+        return set()
+    ids = list(ids)
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(f"SELECT id FROM {table} WHERE id IN ({placeholders})", ids)
+    return {row[0] for row in cursor.fetchall()}
+
+def import_users(rows, batch_size=None, conn=None):
+    """
+    Hromadný import uživatelů (viz _run_import). Duplicitní e-maily – v souboru
+    i v tabulce – se hlásí jako chyby řádků, kontrola je jedním dotazem na dávku.
+    Vrátí ImportReport.
+    """
+    seen_emails = set()
+
+    def import_batch(cursor, valid, report):
+        emails = [values[1] for _, values in valid]
+        placeholders = ", ".join(["%s"] * len(emails))
+        cursor.execute(f"SELECT email FROM users WHERE email IN ({placeholders})", emails)
+        existing = {row[0].lower() for row in cursor.fetchall()}
+
+        accepted = []
+        for line_no, values in valid:
+            email = values[1].lower()
+            if email in existing or email in seen_emails:
+                report.error(line_no, f"E-mail {values[1]} už existuje")
+                continue
+            seen_emails.add(email)
+            accepted.append((line_no, values))
+        query = "INSERT INTO users (username, email, password, role) VALUES (%s, %s, %s, %s)"
+        return query, accepted, None, None
+
+    return _run_import(rows, validate_user, import_batch, batch_size, conn)
+
+def _inserted_reservations(cursor, accepted):
+    """
+    executemany nevrací id řádků; nezrušená rezervace je ale podle (sportoviště,
+    začátek) jednoznačná – kolize se před vložením ověřily. Vrátí řádky
+    (id, facility_id, start_at, end_at) právě vložených nezrušených rezervací.
+    """
+    keys = [(values[1], values[2]) for _, values in accepted if values[4] != "cancelled"]
+    if not keys:
+        return []
+    placeholders = ", ".join(["(%s, %s)"] * len(keys))
+    cursor.execute(f"""
+        SELECT id, facility_id, start_at, end_at FROM reservations
+        WHERE (facility_id, start_at) IN ({placeholders}) AND status != 'cancelled'
+    """, [value for key in keys for value in key])
+    return cursor.fetchall()
+
+def _insert_imported_slots(cursor, accepted):
+    _insert_slots(cursor, _inserted_reservations(cursor, accepted))
+
+def _resolve_batch_conflicts(cursor, candidates, reject, label="požadavek {}".format):
+    """
+    Ověří dávku nových rezervací po skupinách (sportoviště, den): jedním zamykacím
+    dotazem se načtou existující rezervace dne (i ty z předchozího dne přes
+    půlnoc, viz _find_conflicts) a proti nim i proti dříve přijatým kandidátům
+    se termíny ověří v paměti (IntervalIndex).
+
+    candidates jsou (klíč, (user_id, facility_id, start, end, status)); zamítnuté
+    se ohlásí přes reject(klíč, zpráva, kolize). Vrátí (přijaté v původním
+    pořadí, dotčené dvojice (sportoviště, den)). label(klíč) označí přijatého
+    kandidáta v hlášení kolizí.
+    """
+    known_users = _existing_ids(cursor, "users", {values[0] for _, values in candidates})
+    known_facilities = _existing_ids(cursor, "facilities", {values[1] for _, values in candidates})
+
+    groups = {}
+    for position, (key, values) in enumerate(candidates):
+        if values[0] not in known_users:
+            reject(key, f"Uživatel {values[0]} neexistuje", [])
+        elif values[1] not in known_facilities:
+            reject(key, f"Sportoviště {values[1]} neexistuje", [])
+        else:
+            groups.setdefault((values[1], values[2].date()), []).append((position, key, values))
+
+    accepted = []
+    # Přijatí kandidáti přes půlnoc -> (sportoviště, následující den); dny jdou popořadě
+    overnight = {}
+    for (facility_id, day), items in sorted(groups.items()):
+        cursor.execute("""
+            SELECT id, start_at, end_at FROM reservations
+            WHERE facility_id = %s AND start_at >= %s AND start_at < %s AND end_at > %s
+              AND status != 'cancelled'
+            FOR UPDATE
+        """, (facility_id, *_conflict_bounds(day), _day_bounds(day)[0]))
+        index = IntervalIndex(
+            (minutes_since(day, start), minutes_since(day, end, round_up=True), res_id)
+            for res_id, start, end in [*cursor.fetchall(), *overnight.pop((facility_id, day), [])]
+        )
+        next_day = day + timedelta(days=1)
+        for position, key, values in items:
+            _, _, start, end, status = values
+            if status != "cancelled":
+                start_m, end_m = minutes_since(day, start), minutes_since(day, end, round_up=True)
+                conflicts = index.overlaps(start_m, end_m)
+                if conflicts:
+                    reject(key, f"Termín koliduje s rezervacemi {conflicts}", conflicts)
+                    continue
+                index.add(start_m, end_m, label(key))
+                if end > _day_bounds(next_day)[0]:
+                    overnight.setdefault((facility_id, next_day), []).append((label(key), start, end))
+            accepted.append((position, key, values))
+    accepted.sort(key=lambda item: item[0])
+    return [(key, values) for _, key, values in accepted], set(groups)
+
+def _invalidate_days(days):
+    for facility_id, day in days:
+        _invalidate_day(facility_id, day)
+
+_INSERT_RESERVATION = """
+    INSERT INTO reservations (user_id, facility_id, start_at, end_at, status)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+def import_reservations(rows, batch_size=None, conn=None):
+    """
+    Hromadný import rezervací (viz _run_import). Kolize se kontrolují po skupinách
+    (sportoviště, den) – viz _resolve_batch_conflicts – proti existujícím
+    rezervacím i dříve přijatým řádkům souboru. Vrátí ImportReport.
+    """
+    def import_batch(cursor, valid, report):
+        accepted, days = _resolve_batch_conflicts(
+            cursor, valid, lambda line_no, message, conflicts: report.error(line_no, message),
+            label="řádek {}".format)
+        after_insert = _insert_imported_slots if get_settings().slot_booking else None
+        return _INSERT_RESERVATION, accepted, after_insert, lambda: _invalidate_days(days)
+
+    return _run_import(rows, validate_reservation, import_batch, batch_size, conn)
+
+def add_queued_reservations(bookings, conn=None):
+    """
+    Zpracuje dávku rezervací z fronty (booking_queue.BookingQueue). bookings jsou
+    (klíč, (user_id, facility_id, start, end, status)) s nezrušeným stavem.
+    Kolize se ověří jako u importu, přijaté se vloží jedním executemany
+    v jedné transakci. Vrátí {klíč: výsledek} – výsledek má state
+    "created" s reservation_id, nebo "rejected" s error a conflicts.
+    """
+    results = {}
+
+    def reject(key, message, conflicts):
+        results[key] = {"state": "rejected", "error": message, "conflicts": list(conflicts)}
+
+    conn, close_conn = _acquire(conn)
+    cursor = conn.cursor()
+    try:
+        accepted, days = _resolve_batch_conflicts(cursor, bookings, reject)
+        inserted = []
+        if accepted:
+            cursor.executemany(_INSERT_RESERVATION, [values for _, values in accepted])
+            inserted = _inserted_reservations(cursor, accepted)
+            if get_settings().slot_booking:
+                _insert_slots(cursor, inserted)
+        _commit(conn)
+    except Error:
+        if not _in_unit_of_work(conn):
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+
+    ids = {(facility_id, start): reservation_id for reservation_id, facility_id, start, _ in inserted}
+    for key, values in accepted:
+        results[key] = {"state": "created", "reservation_id": ids.get((values[1], values[2]))}
+    _after_commit(conn, lambda: _invalidate_days(days))
+    return results
+
+def rebuild_reservation_slots(conn=None):
+    """
+    Znovu naplní reservation_slots ze všech nezrušených rezervací – při zapnutí
+    SLOT_BOOKING na existujících datech. Vrátí počet zapsaných rezervací.
+    Překrývající se rezervace (na úrovni slotů) vyhodí IntegrityError.
+    """
+    conn, close_conn = _acquire(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM reservation_slots")
+        cursor.execute("SELECT id, facility_id, start_at, end_at FROM reservations WHERE status != 'cancelled'")
+        reservations = cursor.fetchall()
+        for batch in batched(reservations, IN_CHUNK_SIZE):
+            _insert_slots(cursor, batch)
+        _commit(conn)
+    except Error:
+        if not _in_unit_of_work(conn):
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if close_conn:
+            conn.close()
+    return len(reservations)
+
 def update_user_password(user_id, new_password, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
     query = "UPDATE users SET password = %s WHERE id = %s"
     cursor.execute(query, (new_password, user_id))
 
-    conn.commit()
-    print("🔐 Heslo uživatele bylo aktualizováno.")
+    _commit(conn)
+    _after_commit(conn, lambda: invalidate_user(user_id))
+    log.info("Heslo uživatele %s bylo aktualizováno", user_id)
 
     cursor.close()
     if close_conn:
         conn.close()
 
 def update_facility_availability(facility_id, is_available, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
-    query = "UPDATE facilitie SET available = %s WHERE id = %s"
+    query = "UPDATE facilities SET available = %s WHERE id = %s"
     cursor.execute(query, (is_available, facility_id))
 
-    conn.commit()
-    print("📍 Stav dostupnosti sportoviště byl změněn.")
+    _commit(conn)
+    _after_commit(conn, lambda: invalidate_facility(facility_id))
+    log.info("Dostupnost sportoviště %s změněna na %s", facility_id, is_available)
 
     cursor.close()
     if close_conn:
         conn.close()
 
+def _invalidate_day(facility_id, day=None):
+    # Zápis do rezervací dne -> zahodit cache dostupnosti i index kolizí
+    availability_cache.invalidate(facility_id, day)
+    reservation_index.invalidate(facility_id, day)
+    if day is not None:
+        # Index kolizí následujícího dne drží i rezervace přes půlnoc
+        reservation_index.invalidate(facility_id, _to_date(day) + timedelta(days=1))
+    occupancy_index.invalidate(_to_date(day) if day is not None else None)
+
+def _get_reservation_day(cursor, reservation_id):
+    """Vrátí (facility_id, date) rezervace – podle nich se zahazuje cache dostupnosti."""
+    cursor.execute("SELECT facility_id, date FROM reservations WHERE id = %s", (reservation_id,))
+    rows = cursor.fetchall()
+    return rows[0] if rows else None
+
 def update_reservation_status(reservation_id, new_status, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
-    query = "UPDATE reservation SET status = %s WHERE id = %s"
+    reservation_day = _get_reservation_day(cursor, reservation_id)
+    query = "UPDATE reservations SET status = %s WHERE id = %s"
     cursor.execute(query, (new_status, reservation_id))
+    if get_settings().slot_booking:
+        _sync_slots(cursor, [reservation_id])
 
-    conn.commit()
-    print(f"📦 Stav rezervace byl změněn na '{new_status}'.")
+    _commit(conn)
+    if reservation_day:
+        _after_commit(conn, lambda: _invalidate_day(*reservation_day))
+    log.info("Stav rezervace %s změněn na %s", reservation_id, new_status)
 
     cursor.close()
     if close_conn:
         conn.close()
 
+# Povolené přechody stavu rezervace (odkud -> kam)
+STATUS_TRANSITIONS = {
+    "pending": ("confirmed", "cancelled"),
+    "confirmed": ("cancelled",),
+    "cancelled": (),
+}
+
+def bulk_update_reservation_status(new_status, ids=None, facility_id=None, date=None,
+                                   status=None, series_id=None, conn=None):
+    """
+    Změní stav více rezervací jedním UPDATE. Rezervace se vybírají podle
+    seznamu ids, nebo filtrem (facility_id, date, series_id, současný status). Změní se
+    jen ty, u kterých je přechod do new_status povolený (STATUS_TRANSITIONS).
+
+    Vrátí (změněná_id, přeskočená_id); přeskočená jsou jen z předaného ids.
+    Cache dostupnosti se zneplatní jednou za každý dotčený den sportoviště.
+    Nepovolený cílový stav nebo chybějící výběr vyhodí ValueError.
+    """
+    allowed_from = [old for old, targets in STATUS_TRANSITIONS.items() if new_status in targets]
+    if not allowed_from:
+        raise ValueError(f"Do stavu '{new_status}' nelze rezervaci převést")
+    if not ids and not facility_id and not date and not series_id:
+        raise ValueError("Chybí výběr rezervací (ids, facility_id, date nebo series_id)")
+    if status and status not in allowed_from:
+        return [], list(ids or [])
+
+    conn, close_conn = _acquire(conn)
+    cursor = conn.cursor()
+
+    conditions, values = _reservation_filters(facility_id=facility_id, date=date, status=status,
+                                              series_id=series_id)
+    if ids:
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        conditions.append(f"r.id IN ({', '.join(['%s'] * len(ids))})")
+        values.extend(ids)
+    conditions.append(f"r.status IN ({', '.join(['%s'] * len(allowed_from))})")
+    values.extend(allowed_from)
+
+    # Zamknout vybrané řádky – MySQL nemá UPDATE … RETURNING, id potřebujeme znát
+    cursor.execute(
+        f"SELECT r.id, r.facility_id, r.date FROM reservations r WHERE {' AND '.join(conditions)} FOR UPDATE",
+        values)
+    rows = cursor.fetchall()
+    updated = [row[0] for row in rows]
+    if updated:
+        placeholders = ", ".join(["%s"] * len(updated))
+        cursor.execute(f"UPDATE reservations SET status = %s WHERE id IN ({placeholders})",
+                       (new_status, *updated))
+        if get_settings().slot_booking:
+            _sync_slots(cursor, updated)
+    _commit(conn)
+    cursor.close()
+    if close_conn:
+        conn.close()
+
+    days = {(facility_id, day) for _, facility_id, day in rows}
+    _after_commit(conn, lambda: _invalidate_days(days))
+
+    updated_set = set(updated)
+    skipped = [i for i in ids if i not in updated_set] if ids else []
+    return updated, skipped
+
 def delete_user(user_id, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
     query = "DELETE FROM users WHERE id = %s"
     data = (user_id,)
     cursor.execute(query, data)
-    conn.commit()
-    print(f"🗑️ Uživatel s ID {user_id} byl smazán.")
+    _commit(conn)
+    _after_commit(conn, lambda: invalidate_user(user_id))
+    log.info("Uživatel %s smazán", user_id)
     cursor.close()
 
     if close_conn:
         conn.close()
 
 def delete_reservation(reservation_id, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
-    query = "DELETE FROM reservation WHERE id = %s"
+    reservation_day = _get_reservation_day(cursor, reservation_id)
+    query = "DELETE FROM reservations WHERE id = %s"
     data = (reservation_id,)
     cursor.execute(query, data)
-    conn.commit()
-    print(f"📦 Rezervace s ID {reservation_id} byla smazána.")
+    _commit(conn)
+    if reservation_day:
+        _after_commit(conn, lambda: _invalidate_day(*reservation_day))
+    log.info("Rezervace %s smazána", reservation_id)
     cursor.close()
 
     if close_conn:
         conn.close()
 
 # Přidáné funkce 
+def invalidate_user(user_id):
+    entity_cache.invalidate(f"user:{int(user_id)}")
+
+def invalidate_facility(facility_id):
+    entity_cache.invalidate(f"facility:{int(facility_id)}")
+    _invalidate_day(facility_id)
+
+def get_cached_user(user_id):
+    """Vrátí uživatele jen z cache (bez dotazu do DB), jinak None."""
+    return entity_cache.peek(f"user:{int(user_id)}")
+
+def get_cached_facility(facility_id):
+    """Vrátí sportoviště jen z cache (bez dotazu do DB), jinak None."""
+    return entity_cache.peek(f"facility:{int(facility_id)}")
+
+# Sloupce, které se nesmí dostat do cache (sdílený Redis) – ani do výsledků z ní
+_CREDENTIAL_COLUMNS = ("password",)
+
+def _without_credentials(row):
+    return {column: value for column, value in row.items() if column not in _CREDENTIAL_COLUMNS}
+
 def get_user_by_id(user_id, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    key = f"user:{int(user_id)}"
+    found, user = entity_cache.get(key)
+    if found:
+        return user
+    version = entity_cache.version()
+
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor(dictionary=True)
     query = "SELECT * FROM users WHERE id = %s"
@@ -230,13 +867,19 @@ def get_user_by_id(user_id, conn=None):
     if close_conn:
         conn.close()
 
+    if user:
+        user = _without_credentials(user)
+        entity_cache.set(key, dict(user), version=version)
     return user
 
 def get_facilities_by_id(facility_id, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    key = f"facility:{int(facility_id)}"
+    found, facility = entity_cache.get(key)
+    if found:
+        return facility
+    version = entity_cache.version()
+
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor(dictionary=True)
     query = "SELECT * FROM facilities WHERE id = %s"
@@ -247,50 +890,261 @@ def get_facilities_by_id(facility_id, conn=None):
     if close_conn:
         conn.close()
 
+    if facility:
+        entity_cache.set(key, dict(facility), version=version)
     return facility
 
+# Maximální počet hodnot v jednom WHERE id IN (…) – delší seznamy se dělí na dávky
+IN_CHUNK_SIZE = 500
+
+def _get_by_ids(table, key_prefix, ids, conn=None, chunk_size=IN_CHUNK_SIZE):
+    """
+    Vrátí řádky tabulky pro dané id jako slovník {id: řádek}.
+    Co je v entity_cache, se nenačítá; zbytek jedním dotazem WHERE id IN (…)
+    na každou dávku chunk_size id. Neexistující id ve výsledku chybí.
+    """
+    results = {}
+    missing = []
+    for item_id in dict.fromkeys(int(i) for i in ids):
+        found, row = entity_cache.get(f"{key_prefix}:{item_id}")
+        if found:
+            results[item_id] = row
+        else:
+            missing.append(item_id)
+    if not missing:
+        return results
+    version = entity_cache.version()
+
+    conn, close_conn = _acquire(conn)
+
+    cursor = conn.cursor(dictionary=True)
+    for offset in range(0, len(missing), chunk_size):
+        chunk = missing[offset:offset + chunk_size]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f"SELECT * FROM {table} WHERE id IN ({placeholders})", chunk)
+        for row in cursor.fetchall():
+            row = _without_credentials(row)
+            results[row["id"]] = row
+            entity_cache.set(f"{key_prefix}:{row['id']}", dict(row), version=version)
+    cursor.close()
+
+    if close_conn:
+        conn.close()
+
+    return results
+
+def get_users_by_ids(ids, conn=None, chunk_size=IN_CHUNK_SIZE):
+    """Vrátí uživatele podle seznamu id jako {id: uživatel}."""
+    return _get_by_ids("users", "user", ids, conn=conn, chunk_size=chunk_size)
+
+def get_facilities_by_ids(ids, conn=None, chunk_size=IN_CHUNK_SIZE):
+    """Vrátí sportoviště podle seznamu id jako {id: sportoviště}."""
+    return _get_by_ids("facilities", "facility", ids, conn=conn, chunk_size=chunk_size)
+
 def delete_facility(facility_id, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+    conn, close_conn = _acquire(conn)
 
     cursor = conn.cursor()
     query = "DELETE FROM facilities WHERE id = %s"
     cursor.execute(query, (facility_id,))
-    conn.commit()
-    print(f"🗑️ Sportoviště s ID {facility_id} bylo smazáno.")
+    _commit(conn)
+    _after_commit(conn, lambda: invalidate_facility(facility_id))
+    log.info("Sportoviště %s smazáno", facility_id)
     cursor.close()
 
     if close_conn:
         conn.close()
 
 
-def get_filtered_reservations(user_id=None, facility_id=None, date=None, status=None, conn=None):
-    close_conn = False
-    if conn is None:
-        conn = connect_to_db()
-        close_conn = True
+# Vnořitelné entity pro ?expand= – (tabulka, alias, cizí klíč, sloupce).
+# Sloupce jsou vyjmenované, aby se do výsledku nikdy nedostalo heslo.
+RESERVATION_EXPANSIONS = {
+    "user": ("users", "u", "user_id", ("id", "username", "email", "role")),
+    "facility": ("facilities", "f", "facility_id",
+                 ("id", "name", "location", "available", "opening_time", "closing_time")),
+}
 
-    cursor = conn.cursor(dictionary=True)
+def _expand_query(expand):
+    """Vrátí (sloupce, JOINy) pro připojení vnořených entit k rezervacím (alias r)."""
+    columns = []
+    joins = []
+    for name in expand:
+        table, alias, foreign_key, fields = RESERVATION_EXPANSIONS[name]
+        columns += [f"{alias}.{field} AS {name}__{field}" for field in fields]
+        joins.append(f"LEFT JOIN {table} {alias} ON {alias}.id = r.{foreign_key}")
+    return columns, joins
 
-    query = "SELECT * FROM reservations WHERE 1=1"
+def _nest_expanded(row, expand):
+    # Sloupce name__field z JOINu přesune do vnořeného slovníku row[name]
+    for name in expand:
+        prefix = f"{name}__"
+        nested = {key[len(prefix):]: row.pop(key) for key in list(row) if key.startswith(prefix)}
+        row[name] = nested if nested.get("id") is not None else None
+    return row
+
+def _reservation_filters(user_id=None, facility_id=None, date=None, status=None,
+                         date_from=None, date_to=None, time_from=None, time_to=None,
+                         series_id=None):
+    """
+    Sestaví podmínky WHERE (nad aliasem r) a jejich hodnoty pro výběr rezervací.
+
+    Datum se převádí na rozsah nad start_at, takže ho databáze obslouží
+    průchodem indexu (facility_id / user_id / status, start_at). Časy
+    time_from/time_to vybírají rezervace, které do denního okna zasahují.
+    """
+    conditions = []
     values = []
 
+    if date:
+        date_from = date_to = date
+
     if user_id:
-        query += " AND user_id = %s"
+        conditions.append("r.user_id = %s")
         values.append(user_id)
     if facility_id:
-        query += " AND facility_id = %s"
+        conditions.append("r.facility_id = %s")
         values.append(facility_id)
-    if date:
-        query += " AND date = %s"
-        values.append(date)
     if status:
-        query += " AND status = %s"
+        conditions.append("r.status = %s")
         values.append(status)
+    if series_id:
+        conditions.append("r.series_id = %s")
+        values.append(series_id)
+    if date_from:
+        conditions.append("r.start_at >= %s")
+        values.append(_day_bounds(date_from)[0])
+    if date_to:
+        if time_to and date_from and _to_date(date_from) == _to_date(date_to):
+            # Jediný den s časovým oknem – horní mez rozsahu lze zúžit přímo na start_at
+            conditions.append("r.start_at < %s")
+            values.append(datetime.combine(_to_date(date_to), _to_time(time_to)))
+        else:
+            conditions.append("r.start_at < %s")
+            values.append(_day_bounds(date_to)[1])
+    if time_from:
+        conditions.append("r.end_time > %s")
+        values.append(_to_time(time_from))
+    if time_to:
+        conditions.append("r.start_time < %s")
+        values.append(_to_time(time_to))
+
+    return conditions, values
+
+def _keyset_condition(after, sort):
+    # Stránkování podle klíče: pokračuje se za posledním řádkem předchozí stránky
+    if sort == "id":
+        return "r.id > %s", [after]
+    start_at, reservation_id = after
+    return "(r.start_at > %s OR (r.start_at = %s AND r.id > %s))", [start_at, start_at, reservation_id]
+
+def get_filtered_reservations(user_id=None, facility_id=None, date=None, status=None,
+                              date_from=None, date_to=None, time_from=None, time_to=None,
+                              limit=None, after=None, sort="start_at", expand=(), series_id=None,
+                              conn=None):
+    """
+    Vrátí rezervace podle filtrů seřazené stabilně podle (start_at, id),
+    případně podle id (sort="id"). S limit/after vrací jednu stránku:
+    after je klíč posledního řádku předchozí stránky – (start_at, id), resp. id.
+    expand (např. ("user", "facility")) připojí uživatele a sportoviště
+    jedním JOINem jako vnořené slovníky.
+    """
+    conn, close_conn = _acquire(conn)
+
+    cursor = conn.cursor(dictionary=True)
+
+    conditions, values = _reservation_filters(
+        user_id, facility_id, date, status, date_from, date_to, time_from, time_to, series_id)
+    if after is not None:
+        condition, condition_values = _keyset_condition(after, sort)
+        conditions.append(condition)
+        values.extend(condition_values)
+
+    columns, joins = _expand_query(expand)
+    query = f"SELECT {', '.join(['r.*'] + columns)} FROM reservations r {' '.join(joins)} WHERE 1=1"
+    for condition in conditions:
+        query += f" AND {condition}"
+    query += " ORDER BY r.id" if sort == "id" else " ORDER BY r.start_at, r.id"
+    if limit:
+        query += " LIMIT %s"
+        values.append(int(limit))
 
     cursor.execute(query, values)
+    results = [_nest_expanded(row, expand) for row in cursor.fetchall()]
+
+    cursor.close()
+    if close_conn:
+        conn.close()
+
+    return results
+
+def iter_reservations(columns=None, batch_size=1000, conn=None, **filters):
+    """
+    Generátor rezervací pro export celé tabulky. Čte z nebufferovaného kurzoru
+    po dávkách (fetchmany), takže paměť nezávisí na velikosti výsledku.
+    Filtry jsou stejné jako u get_filtered_reservations.
+    """
+    close_conn = False
+    if conn is None:
+        conn = connect_to_db(read_only=True)
+        close_conn = True
+
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    exhausted = False
+    try:
+        conditions, values = _reservation_filters(**filters)
+        select = ", ".join(f"r.{column}" for column in columns) if columns else "r.*"
+        query = f"SELECT {select} FROM reservations r WHERE 1=1"
+        for condition in conditions:
+            query += f" AND {condition}"
+        query += " ORDER BY r.id"
+
+        cursor.execute(query, values)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                exhausted = True
+                break
+            yield from rows
+    finally:
+        if not exhausted and conn.unread_result:
+            # Export přerušený uprostřed (např. klient se odpojil) – zbytek výsledku
+            # je nutné dočíst, jinak by připojení v poolu zůstalo nepoužitelné.
+            conn.consume_results()
+        cursor.close()
+        if close_conn:
+            conn.close()
+
+def get_reservation_by_id(reservation_id, expand=(), conn=None):
+    conn, close_conn = _acquire(conn)
+
+    cursor = conn.cursor(dictionary=True)
+    columns, joins = _expand_query(expand)
+    query = f"SELECT {', '.join(['r.*'] + columns)} FROM reservations r {' '.join(joins)} WHERE r.id = %s"
+    cursor.execute(query, (reservation_id,))
+    reservation = cursor.fetchone()
+    cursor.close()
+    if reservation:
+        _nest_expanded(reservation, expand)
+
+    if close_conn:
+        conn.close()
+
+    return reservation
+
+def get_day_reservations(facility_id, day, conn=None):
+    """
+    Vrátí nezrušené rezervace sportoviště začínající v daný den
+    jako (id, start_at, end_at), seřazené podle začátku.
+    """
+    conn, close_conn = _acquire(conn)
+
+    cursor = conn.cursor()
+    query = """
+        SELECT id, start_at, end_at FROM reservations
+        WHERE facility_id = %s AND start_at >= %s AND start_at < %s AND status != 'cancelled'
+        ORDER BY start_at
+    """
+    cursor.execute(query, (facility_id, *_day_bounds(day)))
     results = cursor.fetchall()
 
     cursor.close()
@@ -298,3 +1152,91 @@ def get_filtered_reservations(user_id=None, facility_id=None, date=None, status=
         conn.close()
 
     return results
+
+def get_facility_availability(facility_id, day, slot_minutes=15, conn=None):
+    """
+    Vrátí volné intervaly sportoviště v daný den (v rámci otevírací doby),
+    zarovnané na sloty délky slot_minutes. Výsledek se cachuje podle (sportoviště, den).
+    Pokud sportoviště neexistuje, vrátí None.
+    """
+    cached = availability_cache.get(facility_id, day, slot_minutes)
+    if cached is not None:
+        return cached
+
+    generation = availability_cache.generation(facility_id)
+    conn, close_conn = _acquire(conn)
+
+    facility = get_facilities_by_id(facility_id, conn=conn)
+    if facility is None:
+        if close_conn:
+            conn.close()
+        return None
+
+    settings = get_settings()
+    opening = to_minutes(facility.get("opening_time") or settings.opening_time)
+    closing = to_minutes(facility.get("closing_time") or settings.closing_time, round_up=True)
+
+    free = []
+    if facility.get("available", True):
+        day = _to_date(day)
+        busy = [
+            (minutes_since(day, start), minutes_since(day, end, round_up=True))
+            for _, start, end in get_day_reservations(facility_id, day, conn=conn)
+        ]
+        free = compute_free_intervals(opening, closing, busy, slot_minutes)
+
+    if close_conn:
+        conn.close()
+
+    result = {
+        "facility_id": facility_id,
+        "date": str(day),
+        "slot_minutes": slot_minutes,
+        "opening_time": format_minutes(opening),
+        "closing_time": format_minutes(closing),
+        "free": [{"start": format_minutes(start), "end": format_minutes(end)} for start, end in free],
+    }
+    availability_cache.set(facility_id, day, slot_minutes, result, generation)
+    return result
+
+def get_day_occupancy(day, conn=None):
+    """
+    Vrátí DayOccupancy všech sportovišť pro daný den (z occupancy_index,
+    případně ji sestaví z get_filtered_reservations a uloží).
+    """
+    day = _to_date(day)
+    occupancy = occupancy_index.get(day)
+    if occupancy is not None:
+        return occupancy
+
+    version = occupancy_index.version()
+    conn, close_conn = _acquire(conn)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT id, available, opening_time, closing_time FROM facilities ORDER BY id")
+    facilities = cursor.fetchall()
+    cursor.close()
+
+    # I rezervace předchozího dne, které končí až po půlnoci
+    day_start, day_end = day_window(day)
+    reservations = [
+        row for row in get_filtered_reservations(date_from=day_start.date() - timedelta(days=1),
+                                                 date_to=day, conn=conn)
+        if row["status"] != "cancelled" and row["end_at"] > day_start and row["start_at"] < day_end
+    ]
+    if close_conn:
+        conn.close()
+
+    settings = get_settings()
+    occupancy = build_day(day, facilities, reservations, occupancy_index.slot_minutes,
+                          settings.opening_time, settings.closing_time)
+    occupancy_index.put(day, occupancy, version)
+    return occupancy
+
+def find_free_facilities(day, start_minute, end_minute, conn=None):
+    """Id sportovišť, která jsou v daný den volná (a otevřená) po celé okno [start, end) v minutách."""
+    return get_day_occupancy(day, conn=conn).free_facilities(start_minute, end_minute)
+
+def find_first_free_windows(day, length_minutes, start_minute=0, end_minute=24 * 60, conn=None):
+    """Pro každé sportoviště první volné okno délky length_minutes v rámci [start, end)."""
+    return get_day_occupancy(day, conn=conn).first_free(length_minutes, start_minute, end_minute)
+
@@ -0,0 +1,486 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from time import monotonic, sleep
+from mysql.connector import errorcode
+from mysql.connector.errors import DatabaseError, IntegrityError, OperationalError, ProgrammingError
+
+# Úložiště SQLite v procesu (DB_BACKEND=sqlite) se stejným rozhraním jako
+# mysql.connector, takže repository.py i aplikace běží beze změny a bez serveru:
+# - dotazy psané pro MySQL se překládají (%s -> ?, FOR UPDATE, řádkové IN,
+#   TRUNCATE, SET FOREIGN_KEY_CHECKS, SHOW INDEX, DDL z databaze_struktura.sql)
+# - chyby SQLite se vyhazují jako mysql.connector.errors se stejným errno
+# - prázdná databáze se založí z databaze_struktura.sql (bootstrap_schema)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "databaze_struktura.sql")
+
+# SQLITE_PATH pro databázi v paměti (sdílená všemi připojeními procesu)
+MEMORY = ":memory:"
+_MEMORY_URI = "file:sportbooking?mode=memory&cache=shared"
+
+
+# ---- Převody typů (jako mysql.connector: DATETIME -> datetime, TIME -> timedelta) ----
+
+def _adapt(value):
+    if isinstance(value, datetime):
+        # DATETIME bez zlomků sekund
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return value.strftime("%H:%M:%S")
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return "%02d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+    return value
+
+def _adapt_params(params):
+    return tuple(_adapt(value) for value in params) if params else ()
+
+def _to_time(value):
+    hours, minutes, seconds = value.split(":")
+    return timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+
+# Převodníky podle deklarovaného typu sloupce (sqlite3.PARSE_DECLTYPES)
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter("TIME", lambda value: _to_time(value.decode()))
+
+# Výrazy (MAX(end_at)…) deklarovaný typ nemají – datum a čas se pozná z textu
+_DATETIME_TEXT = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d+)?")
+_DATE_TEXT = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _convert_expression(value):
+    if isinstance(value, str):
+        if _DATETIME_TEXT.fullmatch(value):
+            return datetime.fromisoformat(value)
+        if _DATE_TEXT.fullmatch(value):
+            return date.fromisoformat(value)
+    return value
+
+
+# ---- Překlad dotazů z MySQL ----
+
+_FOREIGN_KEY_CHECKS = re.compile(r"SET\s+FOREIGN_KEY_CHECKS\s*=\s*(\d)", re.I)
+_TRUNCATE = re.compile(r"TRUNCATE\s+(?:TABLE\s+)?(\w+)", re.I)
+_SHOW_INDEX = re.compile(r"SHOW\s+(?:INDEX|INDEXES|KEYS)\s+FROM\s+(\w+)", re.I)
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)[^)]*", re.I | re.S)
+_INLINE_INDEX = re.compile(r"(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)", re.I | re.S)
+_AUTO_INCREMENT = re.compile(
+    r"\b(?:TINY|SMALL|MEDIUM|BIG)?INT(?:EGER)?(?:\(\d+\))?(?:\s+UNSIGNED)?(?:\s+NOT\s+NULL)?"
+    r"\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.I)
+_ENUM = re.compile(r"\bENUM\s*\(([^)]*)\)", re.I)
+_MYSQL_ONLY = re.compile(r"\s+(?:UNSIGNED|ON\s+UPDATE\s+CURRENT_TIMESTAMP)\b", re.I)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\b", re.I)
+_ROW_VALUES_IN = re.compile(r"\)\s+IN\s*\(\s*\(", re.I)
+_INSERT_IGNORE = re.compile(r"^INSERT\s+IGNORE\b", re.I)
+_EXPLAIN = re.compile(r"^EXPLAIN\s+(?!QUERY\s+PLAN\b)", re.I)
+
+_DDL = {"CREATE", "ALTER", "DROP", "RENAME"}
+_WRITES = {"INSERT", "UPDATE", "DELETE", "REPLACE", "SAVEPOINT"}
+
+def _split_top_level(body):
+    """Rozdělí tělo CREATE TABLE podle čárek mimo závorky a řetězce."""
+    items, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(body):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            items.append(body[start:i].strip())
+            start = i + 1
+    items.append(body[start:].strip())
+    return [item for item in items if item]
+
+def _create_table(match):
+    if_not_exists, table, body = match.groups()
+    columns, indexes = [], []
+    for item in _split_top_level(body):
+        index = _INLINE_INDEX.fullmatch(item)
+        if index:
+            # Názvy indexů jsou v SQLite společné pro celou databázi – v schématu mají prefix tabulky
+            unique, name, indexed = index.groups()
+            indexes.append(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({indexed})")
+            continue
+        item = _AUTO_INCREMENT.sub("INTEGER PRIMARY KEY AUTOINCREMENT", item)
+        column = item.split(None, 1)[0]
+        item = _ENUM.sub(lambda enum: f"TEXT CHECK ({column} IN ({enum.group(1)}))", item)
+        columns.append(_MYSQL_ONLY.sub("", item))
+    create = f"CREATE TABLE {'IF NOT EXISTS ' if if_not_exists else ''}{table} (\n    " + ",\n    ".join(columns) + "\n)"
+    return (create, *indexes)
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """
+    Přeloží dotaz pro MySQL na příkazy pro SQLite. Vrátí (druh, příkazy), kde
+    druh je "read", "write" (začne transakci), "ddl" (implicitní commit jako
+    v MySQL) nebo "foreign_keys" (příkaz je PRAGMA foreign_keys).
+    """
+    text = sql.strip().rstrip(";").strip()
+    match = _FOREIGN_KEY_CHECKS.fullmatch(text)
+    if match:
+        return "foreign_keys", ("PRAGMA foreign_keys = " + ("OFF" if match.group(1) == "0" else "ON"),)
+    match = _TRUNCATE.fullmatch(text)
+    if match:
+        table = match.group(1)
+        return "ddl", (f"DELETE FROM {table}", f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+    match = _SHOW_INDEX.fullmatch(text)
+    if match:
+        # Sloupce jako u MySQL: Table, Non_unique, Key_name
+        table = match.group(1)
+        return "read", (f"SELECT '{table}' AS \"Table\", NOT \"unique\" AS Non_unique, name AS Key_name"
+                        f" FROM pragma_index_list('{table}')",)
+    match = _CREATE_TABLE.fullmatch(text)
+    if match:
+        return "ddl", _create_table(match)
+
+    locking = _FOR_UPDATE.search(text) is not None
+    text = _FOR_UPDATE.sub("", text)
+    # (a, b) IN ((…), (…)) -> (a, b) IN (VALUES (…), (…))
+    text = _ROW_VALUES_IN.sub(") IN (VALUES (", text)
+    text = _INSERT_IGNORE.sub("INSERT OR IGNORE", text)
+    text = _EXPLAIN.sub("EXPLAIN QUERY PLAN ", text)
+    text = text.replace("%s", "?")
+
+    verb = text.split(None, 1)[0].upper() if text else ""
+    if verb in _DDL:
+        kind = "ddl"
+    elif locking or verb in _WRITES:
+        kind = "write"
+    else:
+        kind = "read"
+    return kind, (text,)
+
+
+# ---- Chyby jako v mysql.connector ----
+
+_INTEGRITY_ERRNOS = (
+    ("UNIQUE constraint", errorcode.ER_DUP_ENTRY),
+    ("FOREIGN KEY constraint", errorcode.ER_NO_REFERENCED_ROW_2),
+    ("NOT NULL constraint", errorcode.ER_BAD_NULL_ERROR),
+    ("CHECK constraint", errorcode.ER_CHECK_CONSTRAINT_VIOLATED),
+)
+
+_ERRORS = (
+    (re.compile(r"table \S+ already exists"), ProgrammingError, errorcode.ER_TABLE_EXISTS_ERROR),
+    (re.compile(r"index \S+ already exists"), ProgrammingError, errorcode.ER_DUP_KEYNAME),
+    (re.compile(r"duplicate column name"), ProgrammingError, errorcode.ER_DUP_FIELDNAME),
+    (re.compile(r"no such table"), ProgrammingError, errorcode.ER_NO_SUCH_TABLE),
+    (re.compile(r"no such column"), ProgrammingError, errorcode.ER_BAD_FIELD_ERROR),
+    (re.compile(r"syntax error"), ProgrammingError, errorcode.ER_PARSE_ERROR),
+    (re.compile(r"database( table)? is locked"), OperationalError, errorcode.ER_LOCK_WAIT_TIMEOUT),
+)
+
+def _translate_error(error):
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        errno = next((errno for prefix, errno in _INTEGRITY_ERRNOS if message.startswith(prefix)), None)
+        return IntegrityError(msg=message, errno=errno)
+    for pattern, error_class, errno in _ERRORS:
+        if pattern.search(message):
+            return error_class(msg=message, errno=errno)
+    if isinstance(error, sqlite3.ProgrammingError):
+        return ProgrammingError(msg=message)
+    return DatabaseError(msg=message)
+
+
+# ---- Připojení a kurzor ----
+
+class _Database:
+    """Stav jedné databáze sdílený připojeními v procesu."""
+
+    def __init__(self, path):
+        self.path = path
+        self.memory = path == MEMORY
+        # V jednu chvíli zapisuje jen jedno připojení (jako zámek zápisu v SQLite,
+        # ale čeká se v Pythonu – u sdílené paměťové DB busy timeout neplatí)
+        self.write_lock = threading.Lock()
+        self.bootstrap_lock = threading.Lock()
+        self.ready = False
+        # Paměťová databáze zanikne se zavřením posledního připojení – jedno drží modul
+        self.keeper = sqlite3.connect(_MEMORY_URI, uri=True, check_same_thread=False) if self.memory else None
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+def _database(path):
+    with _databases_lock:
+        database = _databases.get(path)
+        if database is None:
+            database = _databases[path] = _Database(path)
+    return database
+
+
+class SQLiteCursor:
+    """Kurzor s rozhraním mysql.connector (řádky jako n-tice nebo slovníky)."""
+
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._raw = conn._raw.cursor()
+        self._dictionary = dictionary
+        self._names = ()
+        self._expressions = ()
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def column_names(self):
+        return self._names
+
+    def execute(self, operation, params=None, multi=False):
+        kind, statements = translate(operation)
+        self._conn._run(self._raw, kind, statements, _adapt_params(params))
+        self._described()
+
+    def executemany(self, operation, seq_params):
+        kind, statements = translate(operation)
+        self._conn._run(self._raw, kind, statements, [_adapt_params(params) for params in seq_params], many=True)
+        self._described()
+
+    def _described(self):
+        description = self._raw.description
+        self._names = tuple(column[0] for column in description) if description else ()
+        self._expressions = tuple(i for i, name in enumerate(self._names) if "(" in name)
+
+    def _row(self, row):
+        if self._expressions:
+            row = list(row)
+            for i in self._expressions:
+                row[i] = _convert_expression(row[i])
+            row = tuple(row)
+        return dict(zip(self._names, row)) if self._dictionary else row
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        return None if row is None else self._row(row)
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._raw.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._raw.fetchall()]
+
+    def __iter__(self):
+        return (self._row(row) for row in self._raw)
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SQLiteConnection:
+    """
+    Připojení s rozhraním mysql.connector. Jako v MySQL (autocommit vypnutý)
+    zápis začne transakci, která trvá do commit()/rollback(); DDL a TRUNCATE
+    předchozí transakci commitnou.
+    """
+
+    # Výsledky se čtou z SQLite po řádcích, nedočtený výsledek připojení neblokuje
+    unread_result = False
+
+    def __init__(self, database=MEMORY, timeout=10):
+        self.database = database
+        self.timeout = timeout
+        self._db = _database(database)
+        if self._db.memory:
+            # Bez read_uncommitted: čtení nesmí vidět neuložená data jiného připojení
+            # (skončila by v cache), na zámky tabulek proto čeká (_execute)
+            raw = sqlite3.connect(_MEMORY_URI, uri=True, timeout=timeout, isolation_level=None,
+                                  check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        else:
+            raw = sqlite3.connect(database, timeout=timeout, isolation_level=None,
+                                  check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+            # WAL: čtení běží souběžně se zápisem
+            raw.execute("PRAGMA journal_mode = WAL")
+            raw.execute("PRAGMA synchronous = NORMAL")
+        raw.execute("PRAGMA foreign_keys = ON")
+        self._raw = raw
+        self._locked = False
+        # PRAGMA foreign_keys uvnitř transakce nic nedělá – provede se po jejím konci
+        self._foreign_keys = None
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def is_connected(self):
+        try:
+            self._raw.execute("SELECT 1")
+            return True
+        except (sqlite3.Error, AttributeError):
+            return False
+
+    def consume_results(self):
+        pass
+
+    def cursor(self, dictionary=False, buffered=None, **kwargs):
+        return SQLiteCursor(self, dictionary)
+
+    def _acquire(self):
+        if not self._locked:
+            if not self._db.write_lock.acquire(timeout=self.timeout):
+                raise OperationalError(msg=f"Vypršel čas ({self.timeout} s) při čekání na zápis do databáze.",
+                                       errno=errorcode.ER_LOCK_WAIT_TIMEOUT)
+            self._locked = True
+
+    def _release(self):
+        if self._locked:
+            self._locked = False
+            self._db.write_lock.release()
+
+    def _begin(self):
+        if self._raw.in_transaction:
+            return
+        self._acquire()
+        try:
+            self._raw.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self._release()
+            raise
+
+    def _end(self, statement):
+        try:
+            if self._raw.in_transaction:
+                self._raw.execute(statement)
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+        finally:
+            if not self._raw.in_transaction:
+                self._release()
+                if self._foreign_keys is not None:
+                    self._raw.execute(self._foreign_keys)
+                    self._foreign_keys = None
+
+    def commit(self):
+        self._end("COMMIT")
+
+    def rollback(self):
+        self._end("ROLLBACK")
+
+    def _run(self, cursor, kind, statements, params, many=False):
+        try:
+            if kind == "foreign_keys":
+                if self._raw.in_transaction:
+                    self._foreign_keys = statements[0]
+                else:
+                    cursor.execute(statements[0])
+                return
+            if kind == "ddl":
+                self.commit()
+            elif kind == "read":
+                for statement in statements:
+                    self._execute(cursor, statement, params)
+                return
+            self._begin()
+            for statement in statements:
+                self._execute(cursor, statement, params, many)
+        except sqlite3.Error as e:
+            if kind == "ddl":
+                self.rollback()
+            raise _translate_error(e) from e
+        if kind == "ddl":
+            self.commit()
+
+    def _execute(self, cursor, statement, params, many=False):
+        if not self._db.memory:
+            # Soubor: na zámky čeká SQLite sám (busy timeout)
+            (cursor.executemany if many else cursor.execute)(statement, params)
+            return
+        # Sdílená paměťová DB zamyká tabulky a busy timeout u nich neplatí: čtení čeká
+        # na commit zapisujícího připojení, zápis na dočtení cizích kurzorů
+        deadline = monotonic() + self.timeout
+        while True:
+            try:
+                if many:
+                    # Část dávky mohla projít – opakuje se celá od savepointu
+                    self._raw.execute("SAVEPOINT sqlite_backend_many")
+                    try:
+                        cursor.executemany(statement, params)
+                    except sqlite3.Error:
+                        self._raw.execute("ROLLBACK TO SAVEPOINT sqlite_backend_many")
+                        raise
+                    finally:
+                        self._raw.execute("RELEASE SAVEPOINT sqlite_backend_many")
+                else:
+                    cursor.execute(statement, params)
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or monotonic() >= deadline:
+                    raise
+                sleep(0.001)
+
+    def close(self):
+        if self._raw is None:
+            return
+        try:
+            self.rollback()
+        finally:
+            self._raw.close()
+            self._raw = None
+
+
+# ---- Schéma ----
+
+def _has_schema(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+    (count,) = cursor.fetchone()
+    cursor.close()
+    return count > 0
+
+def bootstrap_schema(conn, path=SCHEMA_FILE):
+    """
+    Založí tabulky z databaze_struktura.sql (aktuální stav schématu) a všechny
+    migrace zapíše jako aplikované – python migrate.py pak nic nedělá.
+    """
+    from migrate import get_applied_versions, list_migrations, split_statements
+
+    cursor = conn.cursor()
+    with open(path, encoding="utf-8") as f:
+        for statement in split_statements(f.read()):
+            cursor.execute(statement)
+    applied = get_applied_versions(cursor)
+    cursor.executemany("INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                       [(version, name) for version, name, _ in list_migrations() if version not in applied])
+    conn.commit()
+    cursor.close()
+
+def connect(database=MEMORY, timeout=10, bootstrap=True):
+    """
+    Nové připojení k SQLite (database je cesta k souboru nebo ":memory:").
+    Databázi bez schématu při prvním připojení v procesu založí (bootstrap_schema).
+    """
+    conn = SQLiteConnection(database, timeout)
+    db = conn._db
+    if bootstrap and not db.ready:
+        with db.bootstrap_lock:
+            if not db.ready:
+                if not _has_schema(conn):
+                    bootstrap_schema(conn)
+                db.ready = True
+    return conn
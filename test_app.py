@@ -1,6 +1,12 @@
+import time
 import pytest
 from app import app
-from db import connect_to_db, load_config
+from config import load_config, reload_settings
+from db import connect_to_db
+from metrics import current_request
+from availability import availability_cache
+from intervals import reservation_index
+from repository import entity_cache, occupancy_index
 from datetime import datetime, timedelta
 
 @pytest.fixture(scope="module")
@@ -13,6 +19,8 @@ def client():
     cursor = conn.cursor()
     cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
     cursor.execute("TRUNCATE TABLE reservations")
+    cursor.execute("TRUNCATE TABLE reservation_slots")
+    cursor.execute("TRUNCATE TABLE reservation_series")
     cursor.execute("TRUNCATE TABLE facilities")
     cursor.execute("TRUNCATE TABLE users")
     cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
@@ -30,13 +38,17 @@ def client():
     start = datetime.now() + timedelta(hours=1)
     end = start + timedelta(hours=2)
     cursor.execute("""
-        INSERT INTO reservations (user_id, facility_id, date, start_time, end_time)
-        VALUES (1, 1, %s, %s, %s)
-    """, (start.date(), start.time(), end.time()))
+        INSERT INTO reservations (user_id, facility_id, start_at, end_at)
+        VALUES (1, 1, %s, %s)
+    """, (start, end))
 
     conn.commit()
     cursor.close()
     conn.close()
+    availability_cache.clear()
+    reservation_index.clear()
+    entity_cache.clear()
+    occupancy_index.clear()
 
     # Flask test client
     app.config['TESTING'] = True
@@ -49,6 +61,22 @@ def test_get_users(client):
     assert response.status_code == 200
     assert isinstance(response.get_json(), list)
 
+def test_get_users_pagination(client):
+    client.post('/users', json={"username": "page_user", "email": "page@example.com", "password": "x"})
+
+    first = client.get('/users', query_string={"limit": 1})
+    assert first.status_code == 200
+    assert len(first.get_json()) == 1
+    token = first.headers["X-Next-Cursor"]
+
+    second = client.get('/users', query_string={"limit": 1, "after": token})
+    assert second.status_code == 200
+    assert second.get_json()[0]["id"] > first.get_json()[0]["id"]
+
+def test_get_users_invalid_cursor(client):
+    response = client.get('/users', query_string={"after": "nesmysl"})
+    assert response.status_code == 400
+
 def test_get_user_by_id(client):
     response = client.get('/users/1')
     assert response.status_code == 200
@@ -56,6 +84,24 @@ def test_get_user_by_id(client):
     assert data["id"] == 1
     assert "username" in data
 
+# Test: PATCH zneplatní cache, další GET vrátí novou hodnotu
+def test_user_cache_invalidated_on_patch(client):
+    assert client.get('/users/1').status_code == 200
+    response = client.patch('/users/1', json={"username": "renamed"})
+    assert response.status_code == 200
+    assert client.get('/users/1').get_json()["username"] == "renamed"
+
+def test_get_users_batch(client):
+    response = client.get('/users', query_string={"ids": "1,9999"})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert list(data) == ["1"]
+    assert data["1"]["id"] == 1
+
+def test_get_users_batch_invalid(client):
+    response = client.get('/users', query_string={"ids": "1,abc"})
+    assert response.status_code == 400
+
 def test_get_user_not_found(client):
     response = client.get('/users/9999')
     assert response.status_code == 404
@@ -77,6 +123,19 @@ def test_post_user_success(client):
     assert response.status_code == 201
     assert 'message' in response.get_json()
 
+# Test: opakovaný POST se stejným Idempotency-Key uživatele nevloží podruhé
+def test_post_user_idempotent(client):
+    payload = {"username": "idem", "email": "idem@example.com", "password": "x"}
+    headers = {"Idempotency-Key": "user-idem-1"}
+    first = client.post('/users', json=payload, headers=headers)
+    second = client.post('/users', json=payload, headers=headers)
+    assert first.status_code == second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert len(client.get('/users', query_string={"email": "idem@example.com"}).get_json()) == 1
+
+    other = client.post('/users', json=dict(payload, username="jiny"), headers=headers)
+    assert other.status_code == 422
+
 def test_delete_user(client):
     # Nejprve přidáme nového uživatele
     response = client.post('/users', json={
@@ -99,10 +158,43 @@ def test_get_facility_by_id(client):
     assert response.status_code == 200
     assert "name" in response.get_json()
 
+def test_get_facilities_batch(client):
+    response = client.get('/facilities', query_string={"ids": "1"})
+    assert response.status_code == 200
+    assert response.get_json()["1"]["name"] == "Test Hřiště"
+
 def test_get_facility_not_found(client):
     response = client.get('/facilities/9999')
     assert response.status_code == 404
 
+def test_facility_availability(client):
+    response = client.get('/facilities/1/availability', query_string={"date": "2030-01-01", "slot": "30m"})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["slot_minutes"] == 30
+    assert data["free"] == [{"start": "08:00", "end": "22:00"}]
+
+def test_facility_availability_invalid_date(client):
+    response = client.get('/facilities/1/availability', query_string={"date": "zitra"})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+def test_facility_availability_not_found(client):
+    response = client.get('/facilities/9999/availability', query_string={"date": "2030-01-01"})
+    assert response.status_code == 404
+
+def test_free_facilities(client):
+    response = client.get('/facilities/free', query_string={"date": "2030-01-01", "from": "18:00", "to": "20:00"})
+    assert response.status_code == 200
+    assert response.get_json()["facilities"] == [1]
+
+    response = client.get('/facilities/free', query_string={"date": "2030-01-01", "from": "21:00", "length": "2h"})
+    assert response.get_json()["windows"] == []
+
+def test_free_facilities_invalid_window(client):
+    response = client.get('/facilities/free', query_string={"date": "2030-01-01", "from": "20:00", "to": "18:00"})
+    assert response.status_code == 400
+
 def test_post_facility_success(client):
     response = client.post('/facilities', json={
         "name": "Nové hřiště",
@@ -127,6 +219,18 @@ def test_get_reservation_by_id(client):
     response = client.get('/reservations/1')
     assert response.status_code == 200 or response.status_code == 405  # pokud žádná není
 
+def test_get_reservation_expand(client):
+    response = client.get('/reservation/1', query_string={"expand": "user,facility"})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["facility"]["name"] == "Test Hřiště"
+    assert data["user"]["id"] == 1
+    assert "password" not in data["user"]
+
+def test_get_reservations_expand_invalid(client):
+    response = client.get('/reservation', query_string={"expand": "password"})
+    assert response.status_code == 400
+
 # def test_post_reservation_success(client):
 #     response = client.post('/reservations', json={
 #         "user_id": 1,
@@ -138,6 +242,154 @@ def test_get_reservation_by_id(client):
 #     assert response.status_code == 201
 #     assert "message" in response.get_json()
 
+def test_post_reservation_conflict(client):
+    reservation = {
+        "user_id": 1,
+        "facility_id": 1,
+        "date": "2030-01-02",
+        "start_time": "09:00:00",
+        "end_time": "10:00:00"
+    }
+    response = client.post('/reservations', json=reservation)
+    assert response.status_code == 201
+    first_id = response.get_json()["id"]
+
+    response = client.post('/reservations', json={**reservation, "start_time": "09:30:00", "end_time": "10:30:00"})
+    assert response.status_code == 409
+    assert response.get_json()["conflicts"] == [first_id]
+
+# Test: odpověď nese Server-Timing a /metrics vrací histogram podle šablony routy
+def test_metrics_and_server_timing(client):
+    response = client.get('/users')
+    assert "db;" in response.headers["Server-Timing"]
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/users",status="200"}' in text
+    assert "db_pool_wait_seconds_count" in text
+
+# Test: počítadla požadavku se uklidí i po výjimce (after_request neproběhne)
+def test_metrics_cleared_after_exception(client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("selhání")
+    monkeypatch.setattr("app._page_limit", fail)
+    with pytest.raises(RuntimeError):
+        client.get('/users')
+    assert current_request() is None
+
+# Test: při zapnuté frontě (BOOKING_QUEUE) vrátí POST 202 a stav se dohledá podle id požadavku
+def test_post_reservation_queued(client, monkeypatch):
+    monkeypatch.setenv("BOOKING_QUEUE", "memory")
+    monkeypatch.setenv("BOOKING_QUEUE_POLL_INTERVAL", "0.01")
+    reload_settings()
+    try:
+        response = client.post('/reservations', json={
+            "user_id": 1, "facility_id": 1, "start_at": "2030-02-01 09:00", "end_at": "2030-02-01 10:00"})
+        assert response.status_code == 202
+        status_url = response.headers["Location"]
+
+        deadline = time.monotonic() + 5
+        result = client.get(status_url).get_json()
+        while result["state"] == "queued" and time.monotonic() < deadline:
+            time.sleep(0.01)
+            result = client.get(status_url).get_json()
+        assert result["state"] == "created"
+        assert client.get(f"/reservation/{result['reservation_id']}").status_code == 200
+    finally:
+        monkeypatch.undo()
+        reload_settings()
+
+# Test: hromadný import – kolize uvnitř souboru a chybné řádky (i špatný typ) import nepřeruší
+def test_bulk_import_reservations(client):
+    lines = [
+        '{"user_id": 1, "facility_id": 1, "start_at": "2031-03-01 10:00", "end_at": "2031-03-01 11:00"}',
+        '{"user_id": 1, "facility_id": 1, "start_at": "2031-03-01 10:30", "end_at": "2031-03-01 11:30"}',
+        '{"user_id": 1, "facility_id": 999, "start_at": "2031-03-01 12:00", "end_at": "2031-03-01 13:00"}',
+        'nesmysl',
+        '{"user_id": [1], "facility_id": 1, "start_at": "2031-03-01 14:00", "end_at": "2031-03-01 15:00"}',
+    ]
+    response = client.post('/reservations/bulk', query_string={"batch_size": 2},
+                           data="\n".join(lines), content_type="application/x-ndjson")
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["inserted"] == 1
+    assert sorted(error["row"] for error in report["errors"]) == [2, 3, 4, 5]
+
+def test_bulk_import_users_csv(client):
+    data = "username,email,password\nbulk1,bulk1@example.com,x\nbulk2,seed@example.com,x\n"
+    response = client.post('/users/bulk', data=data, content_type="text/csv")
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["inserted"] == 1
+    assert report["errors"][0]["row"] == 3
+
+# Test: hromadné potvrzení – zrušenou rezervaci už potvrdit nelze
+def test_bulk_status_transition(client):
+    response = client.patch('/reservations/status', json={"status": "confirmed", "ids": [1, 9999]})
+    assert response.status_code == 200
+    assert response.get_json() == {"updated": [1], "skipped": [9999]}
+
+    response = client.patch('/reservations/status', json={"status": "pending", "ids": [1]})
+    assert response.status_code == 400
+
+# Test: datum, sportoviště a současný stav jiného typu jsou 400, ne chyba serveru
+@pytest.mark.parametrize("body", [
+    {"status": "cancelled", "date": 20300101},
+    {"status": "cancelled", "date": ["2030-01-01"]},
+    {"status": "cancelled", "facility_id": [1]},
+    {"status": "cancelled", "facility_id": "abc"},
+    {"status": "cancelled", "facility_id": 1, "current_status": ["pending"]},
+])
+def test_bulk_status_invalid_types(client, body):
+    assert client.patch('/reservations/status', json=body).status_code == 400
+
+# Test: série se vloží celá, kolidující série se odmítne a zrušení zasáhne všechny výskyty
+def test_reservation_series(client):
+    rule = {"user_id": 1, "facility_id": 1, "start_at": "2032-01-06 18:00", "end_at": "2032-01-06 20:00",
+            "frequency": "weekly", "count": 3, "exclude": ["2032-01-13"]}
+    response = client.post('/reservations/series', json=rule)
+    assert response.status_code == 201
+    created = response.get_json()
+    assert len(created["ids"]) == 3
+
+    clash = dict(rule, frequency="daily", start_at="2032-01-20 19:00", end_at="2032-01-20 19:30", count=1)
+    response = client.post('/reservations/series', json=clash)
+    assert response.status_code == 409
+
+    response = client.delete(f"/reservations/series/{created['series_id']}")
+    assert sorted(response.get_json()["updated"]) == sorted(created["ids"])
+
+# Test: neexistující sportoviště, neznámý stav nebo překrývající se výskyty série jsou 400
+def test_reservation_series_invalid(client):
+    rule = {"user_id": 1, "facility_id": 1, "start_at": "2033-01-06 18:00", "end_at": "2033-01-06 20:00",
+            "frequency": "weekly", "count": 2}
+    assert client.post('/reservations/series', json=dict(rule, facility_id=999)).status_code == 400
+    assert client.post('/reservations/series', json=dict(rule, user_id=999)).status_code == 400
+    assert client.post('/reservations/series', json=dict(rule, status="bogus")).status_code == 400
+    # Denní série s výskytem delším než den by kolidovala sama se sebou
+    overlapping = dict(rule, frequency="daily", end_at="2033-01-07 19:00")
+    assert client.post('/reservations/series', json=overlapping).status_code == 400
+    assert client.post('/reservations/series', json=dict(rule, user_id=[1])).status_code == 400
+    assert client.post('/reservations/series', json=dict(rule, facility_id={"id": 1})).status_code == 400
+
+def test_export_reservations_csv(client):
+    response = client.get('/reservation/export', query_string={"format": "csv"})
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith("id,user_id,facility_id")
+    assert len(lines) >= 2
+
+def test_export_reservations_invalid_format(client):
+    response = client.get('/reservation/export', query_string={"format": "xml"})
+    assert response.status_code == 400
+
+# Test: bez připojení k DB vrátí export 503 dřív, než začne streamovat
+def test_export_reservations_no_connection(client, monkeypatch):
+    monkeypatch.setattr("app.connect_to_db", lambda **kwargs: None)
+    response = client.get('/reservation/export')
+    assert response.status_code == 503
+
 def test_post_reservation_invalid_data(client):
     # Chybí `user_id` a další
     response = client.post('/reservations', json={
@@ -147,6 +399,16 @@ def test_post_reservation_invalid_data(client):
     assert response.status_code == 400
     assert "error" in response.get_json()
 
+# Test: čas nebo id jiného typu a neznámý stav jsou 400, neexistující uživatel či sportoviště 404
+def test_post_reservation_invalid_types(client):
+    body = {"user_id": 1, "facility_id": 1, "start_at": "2034-01-01 10:00", "end_at": "2034-01-01 11:00"}
+    assert client.post('/reservations', json=dict(body, start_at=123)).status_code == 400
+    assert client.post('/reservations', json=dict(body, status="bogus")).status_code == 400
+    assert client.post('/reservations', json=dict(body, user_id=[1])).status_code == 400
+    assert client.post('/reservations', json=dict(body, facility_id="abc")).status_code == 400
+    assert client.post('/reservations', json=dict(body, user_id=9999)).status_code == 404
+    assert client.post('/reservations', json=dict(body, facility_id=9999)).status_code == 404
+
 # def test_delete_reservation(client):
 #     # Přidej rezervaci, pak smaž
 #     res = client.post('/reservations', json={
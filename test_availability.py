@@ -0,0 +1,60 @@
+import pytest
+from datetime import date, datetime, time, timedelta
+from availability import (
+    parse_slot, to_minutes, compute_free_intervals, slot_keys, AvailabilityCache)
+
+# Test: převod délky slotu na minuty
+def test_parse_slot():
+    assert parse_slot("15m") == 15
+    assert parse_slot("1h") == 60
+    assert parse_slot("30") == 30
+    assert parse_slot(None) == 15
+    with pytest.raises(ValueError):
+        parse_slot("0m")
+    with pytest.raises(ValueError):
+        parse_slot("abc")
+
+# Test: sloty rezervace – nezarovnaný začátek i přechod přes půlnoc
+def test_slot_keys():
+    assert slot_keys(datetime(2030, 1, 1, 10, 10), datetime(2030, 1, 1, 10, 45), 15) == [
+        (date(2030, 1, 1), 40), (date(2030, 1, 1), 41), (date(2030, 1, 1), 42)]
+    assert slot_keys(datetime(2030, 1, 1, 23, 30), datetime(2030, 1, 2, 0, 30), 30) == [
+        (date(2030, 1, 1), 47), (date(2030, 1, 2), 0)]
+
+# Test: MySQL vrací sloupce TIME jako timedelta
+def test_to_minutes():
+    assert to_minutes(timedelta(hours=9, minutes=30)) == 570
+    assert to_minutes(time(9, 30)) == 570
+    assert to_minutes("09:30:00") == 570
+    assert to_minutes("09:30:10", round_up=True) == 571
+
+# Test: bez rezervací je volná celá otevírací doba
+def test_free_intervals_empty_day():
+    assert compute_free_intervals(480, 1320, [], 15) == [(480, 1320)]
+
+# Test: mezery mezi rezervacemi (i překrývajícími se) a zarovnání na sloty
+def test_free_intervals_between_reservations():
+    busy = [(540, 600), (590, 650), (700, 710), (1300, 1400)]
+    assert compute_free_intervals(480, 1320, busy, 15) == [(480, 540), (660, 690), (720, 1290)]
+
+# Test: zápis zahodí cache a zastaralý výsledek se už neuloží
+def test_cache_invalidation():
+    cache = AvailabilityCache(maxsize=2)
+    generation = cache.generation(1)
+    cache.set(1, "2030-01-01", 15, {"free": []}, generation)
+    assert cache.get(1, "2030-01-01", 15) == {"free": []}
+
+    cache.invalidate(1, "2030-01-01")
+    assert cache.get(1, "2030-01-01", 15) is None
+    cache.set(1, "2030-01-01", 15, {"free": []}, generation)
+    assert cache.get(1, "2030-01-01", 15) is None
+
+# Test: každá délka slotu vyprší ttl po svém výpočtu
+def test_cache_ttl(clock):
+    cache = AvailabilityCache(ttl=10, clock=clock)
+    cache.set(1, "2030-01-01", 15, {"free": []}, cache.generation(1))
+    clock.now = 5
+    cache.set(1, "2030-01-01", 60, {"free": []}, cache.generation(1))
+    clock.now = 10
+    assert cache.get(1, "2030-01-01", 15) is None
+    assert cache.get(1, "2030-01-01", 60) == {"free": []}
@@ -0,0 +1,29 @@
+from datetime import time
+from benchmark import Dataset, START_DAY, compare, generate_reservations, percentile, summarize
+
+def test_generated_reservations_do_not_overlap():
+    rows = list(generate_reservations(2000, users=50, facilities=7, seed=1))
+    assert rows == list(generate_reservations(2000, users=50, facilities=7, seed=1))
+    last_end = {}
+    for user_id, facility_id, start, end, status in rows:
+        assert 1 <= user_id <= 50 and 1 <= facility_id <= 7
+        assert start.date() == end.date() and time(8) <= start.time() and end.time() <= time(22)
+        assert last_end.get(facility_id, start) <= start
+        last_end[facility_id] = end
+
+def test_free_slots_are_unique():
+    data = Dataset(users=10, facilities=3, reservations=100)
+    slots = [data.free_slot(i, START_DAY) for i in range(100)]
+    assert len(set(slots)) == 100
+
+def test_summarize_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)])
+    assert (summary["p50_ms"], summary["p99_ms"], summary["max_ms"]) == (50.0, 99.0, 100.0)
+    assert percentile([], 50) == 0.0
+
+def test_compare_flags_regressions():
+    baseline = {"results": {"tiny": {"a": {"p50_ms": 1.0}, "b": {"p50_ms": 1.0}, "c": {"p50_ms": 0.01}}}}
+    current = {"results": {"tiny": {"a": {"p50_ms": 1.1}, "b": {"p50_ms": 2.0}, "c": {"p50_ms": 0.03},
+                                    "new": {"p50_ms": 5.0}}}}
+    [regression] = compare(current, baseline, threshold=0.2)
+    assert (regression["benchmark"], regression["ratio"]) == ("b", 2.0)
@@ -0,0 +1,79 @@
+import pytest
+from datetime import datetime
+from booking_queue import BookingQueue, DatabaseQueueBackend, MemoryQueueBackend, make_queue_backend
+from sqlite_backend import connect
+
+def test_submit_and_drain_in_batches():
+    batches = []
+
+    def process(items):
+        batches.append(len(items))
+        return {ticket: {"state": "created", "reservation_id": values} for ticket, values in items}
+
+    queue = BookingQueue(MemoryQueueBackend(), process, batch_size=2)
+    tickets = [queue.submit(n) for n in range(5)]
+    assert queue.status(tickets[0]) == {"state": "queued"}
+
+    queue.drain()
+    assert batches == [2, 2, 1]
+    assert [queue.status(t)["reservation_id"] for t in tickets] == [0, 1, 2, 3, 4]
+    assert queue.status("neznamy") is None
+
+# Test: výjimka při zpracování označí celou dávku jako failed
+def test_failed_batch():
+    def process(items):
+        raise RuntimeError("DB nedostupná")
+
+    queue = BookingQueue(MemoryQueueBackend(), process)
+    ticket = queue.submit(1)
+    queue.drain()
+    assert queue.status(ticket) == {"state": "failed", "error": "DB nedostupná"}
+
+def test_results_are_bounded():
+    queue = BookingQueue(MemoryQueueBackend(), lambda items: {}, max_results=2)
+    tickets = [queue.submit(n) for n in range(3)]
+    assert queue.status(tickets[0]) is None
+    assert queue.status(tickets[2]) == {"state": "queued"}
+
+def test_worker_thread():
+    queue = BookingQueue(MemoryQueueBackend(), lambda items: {t: {"state": "created"} for t, _ in items},
+                         poll_interval=0.01)
+    queue.start()
+    ticket = queue.submit(1)
+    queue.stop(timeout=5)
+    assert queue.status(ticket) == {"state": "created"}
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_queue_backend("redis://localhost")
+
+# Test: fronta v DB – požadavek přijatý jedním procesem zpracuje a dohledá i jiný
+def test_database_backend_shared(tmp_path):
+    path = str(tmp_path / "queue.db")
+    values = (1, 2, datetime(2030, 1, 1, 10, 0), datetime(2030, 1, 1, 11, 0), "pending")
+    seen = []
+
+    def process(items):
+        seen.extend(items)
+        return {ticket: {"state": "created", "reservation_id": 7} for ticket, _ in items}
+
+    first = BookingQueue(DatabaseQueueBackend(lambda: connect(path)), process)
+    second = BookingQueue(DatabaseQueueBackend(lambda: connect(path)), process)
+    ticket = first.submit(values)
+    assert second.status(ticket) == {"state": "queued"}
+
+    second.drain()
+    assert seen == [(ticket, values)]
+    assert first.status(ticket) == {"state": "created", "reservation_id": 7}
+
+# Test: dávku procesu, který spadl uprostřed zpracování, po claim_timeout převezme jiný
+def test_database_backend_reclaims_stale_batch(tmp_path):
+    path = str(tmp_path / "queue.db")
+    crashed = DatabaseQueueBackend(lambda: connect(path), claim_timeout=0)
+    crashed.put(("abc", (1, 2, datetime(2030, 1, 1, 10, 0), datetime(2030, 1, 1, 11, 0), "pending")))
+    assert [ticket for ticket, _ in crashed.get_batch(10, 0)] == ["abc"]
+    assert crashed.status("abc") == {"state": "queued"}
+    assert [ticket for ticket, _ in crashed.get_batch(10, 0)] == ["abc"]
+    crashed.complete({"abc": {"state": "rejected", "error": "x", "conflicts": []}})
+    assert crashed.get_batch(10, 0) == []
+    assert crashed.status("abc")["state"] == "rejected"
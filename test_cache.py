@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from cache import ReadThroughCache, MemoryBackend, dumps, loads
+
+# Test: zásah, minutí a vyřazení nejdéle nepoužité položky
+def test_lru_stats():
+    cache = ReadThroughCache(maxsize=2, ttl=60)
+    cache.set("a", {"id": 1})
+    cache.set("b", {"id": 2})
+    assert cache.get("a") == (True, {"id": 1})
+    cache.set("c", {"id": 3})
+
+    assert cache.get("b") == (False, None)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_expiry(clock):
+    cache = ReadThroughCache(ttl=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 11
+    assert cache.get("a") == (False, None)
+
+# Test: úprava vrácené hodnoty nezmění obsah cache
+def test_returns_copy():
+    cache = ReadThroughCache()
+    cache.set("a", {"id": 1})
+    cache.get("a")[1]["id"] = 99
+    assert cache.get("a") == (True, {"id": 1})
+
+# Test: hodnota načtená před invalidací se neuloží
+def test_stale_set_after_invalidate():
+    cache = ReadThroughCache()
+    version = cache.version()
+    cache.invalidate("a")
+    cache.set("a", {"id": 1}, version=version)
+    assert cache.get("a") == (False, None)
+
+# Test: sdílený backend – jiný proces (jiná lokální cache) vidí hodnotu i invalidaci
+def test_shared_backend():
+    backend = MemoryBackend()
+    first = ReadThroughCache(backend=backend)
+    second = ReadThroughCache(backend=backend)
+
+    first.set("user:1", {"id": 1})
+    assert second.get("user:1") == (True, {"id": 1})
+
+    first.set("user:2", {"id": 2})
+    first.invalidate("user:2")
+    assert second.get("user:2") == (False, None)
+
+# Test: JSON serializace pro Redis zachová typy z řádků DB (TIME je timedelta)
+def test_json_round_trip():
+    row = {"id": 1, "created_at": datetime(2030, 1, 1, 8, 30), "opening_time": timedelta(hours=8), "name": "Hala"}
+    assert loads(dumps(row)) == row
+
+# Test: invalidace v jednom workeru – druhý nevrátí starou hodnotu z lokální paměti
+def test_shared_backend_no_stale_local_copy():
+    backend = MemoryBackend()
+    first = ReadThroughCache(backend=backend)
+    second = ReadThroughCache(backend=backend)
+
+    first.set("user:1", {"id": 1, "name": "old"})
+    assert second.get("user:1") == (True, {"id": 1, "name": "old"})
+    first.invalidate("user:1")
+    assert second.get("user:1") == (False, None)
+    first.set("user:1", {"id": 1, "name": "new"})
+    assert second.get("user:1") == (True, {"id": 1, "name": "new"})
+
+# Test: pomalý worker neprosadí hodnotu načtenou před invalidací v jiném workeru
+def test_shared_backend_stale_set_after_invalidate():
+    backend = MemoryBackend()
+    first = ReadThroughCache(backend=backend)
+    slow = ReadThroughCache(backend=backend)
+
+    version = slow.version()
+    first.invalidate("user:1")
+    slow.set("user:1", {"id": 1, "name": "old"}, version=version)
+    assert first.get("user:1") == (False, None)
+    assert slow.get("user:1") == (False, None)
+
+    version = slow.version()
+    slow.set("user:1", {"id": 1, "name": "new"}, version=version)
+    assert first.get("user:1") == (True, {"id": 1, "name": "new"})
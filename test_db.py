@@ -5,6 +5,7 @@ from config import load_config
 import mysql.connector
 from mysql.connector import Error
 from mysql.connector.errors import IntegrityError
+from migrate import apply_migrations, list_migrations
 
 
 
@@ -31,7 +32,28 @@ def create_tables_if_not_exist(cursor):
                 name VARCHAR(100) NOT NULL,
                 location VARCHAR(100),
                 description TEXT,
-                available BOOLEAN DEFAULT TRUE
+                available BOOLEAN DEFAULT TRUE,
+                opening_time TIME NOT NULL DEFAULT '08:00:00',
+                closing_time TIME NOT NULL DEFAULT '22:00:00'
+            )
+        """)
+
+        # RESERVATION SERIES
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reservation_series (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT,
+                facility_id INT,
+                frequency ENUM('daily', 'weekly') NOT NULL,
+                repeat_interval INT NOT NULL DEFAULT 1,
+                first_start_at DATETIME NOT NULL,
+                first_end_at DATETIME NOT NULL,
+                until_date DATE NULL,
+                occurrence_count INT NULL,
+                exclude_dates TEXT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
             )
         """)
 
@@ -41,13 +63,65 @@ def create_tables_if_not_exist(cursor):
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 user_id INT,
                 facility_id INT,
-                date DATE NOT NULL,
-                start_time TIME NOT NULL,
-                end_time TIME NOT NULL,
+                series_id INT NULL,
+                start_at DATETIME NOT NULL,
+                end_at DATETIME NOT NULL,
+                date DATE GENERATED ALWAYS AS (DATE(start_at)) STORED,
+                start_time TIME GENERATED ALWAYS AS (TIME(start_at)) STORED,
+                end_time TIME GENERATED ALWAYS AS (TIME(end_at)) STORED,
                 status ENUM('pending', 'confirmed', 'cancelled') DEFAULT 'pending',
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
+                FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE,
+                CONSTRAINT fk_reservations_series FOREIGN KEY (series_id)
+                    REFERENCES reservation_series(id) ON DELETE SET NULL,
+                INDEX idx_reservations_facility_start (facility_id, start_at, end_at),
+                INDEX idx_reservations_user_start (user_id, start_at),
+                INDEX idx_reservations_status_start (status, start_at)
+            )
+        """)
+
+        # RESERVATION SLOTS
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reservation_slots (
+                facility_id INT NOT NULL,
+                date DATE NOT NULL,
+                slot_index SMALLINT NOT NULL,
+                reservation_id INT NOT NULL,
+                UNIQUE KEY uq_reservation_slots (facility_id, date, slot_index),
+                INDEX idx_reservation_slots_reservation (reservation_id),
+                FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE,
+                FOREIGN KEY (reservation_id) REFERENCES reservations(id) ON DELETE CASCADE
+            )
+        """)
+
+        # IDEMPOTENCY KEYS
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                idem_key VARCHAR(255) NOT NULL PRIMARY KEY,
+                fingerprint CHAR(64) NOT NULL,
+                status_code SMALLINT NULL,
+                body MEDIUMTEXT NULL,
+                content_type VARCHAR(100) NULL,
+                expires_at DATETIME NOT NULL,
+                INDEX idx_idempotency_keys_expires (expires_at)
+            )
+        """)
+
+        # BOOKING REQUESTS
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS booking_requests (
+                ticket CHAR(32) NOT NULL PRIMARY KEY,
+                user_id INT NOT NULL,
+                facility_id INT NOT NULL,
+                start_at DATETIME NOT NULL,
+                end_at DATETIME NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                state ENUM('queued', 'processing', 'created', 'rejected', 'failed') NOT NULL DEFAULT 'queued',
+                result TEXT NULL,
+                claimed_at DATETIME NULL,
+                created_at DATETIME NOT NULL,
+                INDEX idx_booking_requests_state (state, created_at)
             )
         """)
 
@@ -63,6 +137,7 @@ def db():
     conn = connect_to_db(config)
     cursor = conn.cursor()
     create_tables_if_not_exist(cursor)  # vytvoření tabulek, pokud nejsou
+    apply_migrations(conn=conn)  # dorovnání starší testovací DB na aktuální schéma
     yield cursor
     conn.rollback()  # zruší všechny změny po testech
     cursor.close()
@@ -76,6 +151,8 @@ def seed_test_data(db):
     # Vyčisti tabulky
     db.execute("SET FOREIGN_KEY_CHECKS = 0")
     db.execute("TRUNCATE TABLE reservations")
+    db.execute("TRUNCATE TABLE reservation_slots")
+    db.execute("TRUNCATE TABLE reservation_series")
     db.execute("TRUNCATE TABLE facilities")
     db.execute("TRUNCATE TABLE users")
     db.execute("SET FOREIGN_KEY_CHECKS = 1")
@@ -96,9 +173,9 @@ def seed_test_data(db):
     start = datetime.now() + timedelta(hours=1)
     end = start + timedelta(hours=2)
     db.execute("""
-        INSERT INTO reservations (user_id, facility_id, date, start_time, end_time)
-        VALUES (1, 1, %s, %s, %s)
-    """, (start.date(), start.time(), end.time()))
+        INSERT INTO reservations (user_id, facility_id, start_at, end_at)
+        VALUES (1, 1, %s, %s)
+    """, (start, end))
 
 
 # ---- TESTY ----
@@ -167,9 +244,24 @@ def test_status_default_pending(db):
     start = datetime.now() + timedelta(hours=3)
     end = start + timedelta(hours=1)
     db.execute("""
-        INSERT INTO reservations (user_id, facility_id, date, start_time, end_time)
-        VALUES (1, 1, %s, %s, %s)
-    """, (start.date(), start.time(), end.time()))
+        INSERT INTO reservations (user_id, facility_id, start_at, end_at)
+        VALUES (1, 1, %s, %s)
+    """, (start, end))
     db.execute("SELECT status FROM reservations ORDER BY id DESC LIMIT 1")
     (status,) = db.fetchone()
     assert status == 'pending'
+
+
+def test_schema_version_is_latest(db):
+    db.execute("SELECT MAX(version) FROM schema_version")
+    version = db.fetchall()[0][0]
+    assert version == list_migrations()[-1][0]
+
+def test_reservation_indexes_exist(db):
+    db.execute("SHOW INDEX FROM reservations")
+    index_names = {row[2] for row in db.fetchall()}
+    assert {
+        "idx_reservations_facility_start",
+        "idx_reservations_user_start",
+        "idx_reservations_status_start",
+    } <= index_names
@@ -0,0 +1,20 @@
+import json
+from datetime import datetime
+from export import iter_ndjson, iter_csv
+
+ROWS = [
+    {"id": 1, "user_id": 1, "facility_id": 2, "start_at": datetime(2030, 1, 1, 10, 0),
+     "end_at": datetime(2030, 1, 1, 11, 0), "status": "pending", "created_at": None},
+]
+
+def test_iter_ndjson():
+    lines = list(iter_ndjson(ROWS))
+    assert len(lines) == 1
+    assert json.loads(lines[0])["start_at"] == "2030-01-01 10:00:00"
+
+# Test: CSV se generuje po řádcích, hlavička je i u prázdného exportu
+def test_iter_csv():
+    chunks = list(iter_csv(ROWS))
+    assert chunks[0].strip() == "id,user_id,facility_id,start_at,end_at,status,created_at"
+    assert chunks[1].strip() == "1,1,2,2030-01-01 10:00:00,2030-01-01 11:00:00,pending,"
+    assert len(list(iter_csv([]))) == 1
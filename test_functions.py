@@ -1,11 +1,18 @@
 import pytest
-from db import connect_to_db
+from mysql.connector import Error
+from db import connect_to_db, unit_of_work
 from datetime import datetime, timedelta, date, time
 from repository import (
     get_all_users, get_all_facilities, get_all_reservations, add_user,
     add_facility, add_reservation, update_user_password, update_facility_availability,
-    update_reservation_status, delete_user, delete_reservation
+    update_reservation_status, delete_user, delete_reservation, ReservationConflictError,
+    get_filtered_reservations, get_users_by_ids, add_multiple_users, bulk_update_reservation_status,
+    add_queued_reservations, get_user_by_id, get_cached_user
 )
+from config import reload_settings
+from availability import availability_cache
+from intervals import reservation_index
+from repository import entity_cache, occupancy_index
 
 # Fixture: připojení k testovací databázi
 @pytest.fixture
@@ -20,11 +27,17 @@ def clear_test_data(db_conn):
     cursor = db_conn.cursor()
     cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
     cursor.execute("TRUNCATE TABLE reservations")
+    cursor.execute("TRUNCATE TABLE reservation_slots")
+    cursor.execute("TRUNCATE TABLE reservation_series")
     cursor.execute("TRUNCATE TABLE users")
     cursor.execute("TRUNCATE TABLE facilities")
     cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
     db_conn.commit()
     cursor.close()
+    availability_cache.clear()
+    reservation_index.clear()
+    entity_cache.clear()
+    occupancy_index.clear()
 
 # Test: přidání uživatele
 def test_add_user(db_conn):
@@ -47,6 +60,45 @@ def test_delete_user(db_conn):
     users_after = get_all_users(conn=db_conn)
     assert all(u[0] != user_id for u in users_after)
 
+# Test: dávkové čtení uživatelů po částech, výsledek podle id
+def test_get_users_by_ids(db_conn):
+    for i in range(5):
+        add_user(f"Batch{i}", f"batch{i}@example.com", "pass", conn=db_conn)
+    ids = [u[0] for u in get_all_users(conn=db_conn)]
+    users = get_users_by_ids(ids + [9999], conn=db_conn, chunk_size=2)
+    assert sorted(users) == sorted(ids)
+    assert all(users[i]["id"] == i for i in ids)
+
+# Test: heslo se do cache (sdílený Redis) nedostane
+def test_cached_user_without_password(db_conn):
+    add_user("Cached", "cached@example.com", "tajne", conn=db_conn)
+    user_id = next(u[0] for u in get_all_users(conn=db_conn) if u[1] == "Cached")
+    assert "password" not in get_user_by_id(user_id, conn=db_conn)
+    assert "password" not in get_cached_user(user_id)
+
+# Test: unit_of_work – více zápisů jedním commitem
+def test_unit_of_work_commits_once(db_conn):
+    with unit_of_work(conn=db_conn):
+        add_multiple_users([("UowA", "uowa@example.com", "pw", "user")])
+        add_user("UowB", "uowb@example.com", "pw")
+    names = {u[1] for u in get_all_users(conn=db_conn)}
+    assert {"UowA", "UowB"} <= names
+
+# Test: unit_of_work – nedostupná DB je chyba připojení, ne AttributeError
+def test_unit_of_work_without_connection(monkeypatch):
+    monkeypatch.setattr("db.connect_to_db", lambda **kwargs: None)
+    with pytest.raises(Error, match="připojení"):
+        with unit_of_work(testing=True):
+            pass
+
+# Test: unit_of_work – při chybě se vrátí všechny zápisy
+def test_unit_of_work_rolls_back(db_conn):
+    with pytest.raises(RuntimeError):
+        with unit_of_work(conn=db_conn):
+            add_user("UowC", "uowc@example.com", "pw")
+            raise RuntimeError("chyba uprostřed dávky")
+    assert all(u[1] != "UowC" for u in get_all_users(conn=db_conn))
+
 # Test: přidání sportoviště
 def test_add_facility(db_conn):
     add_facility("Hřiště A", "Popis hřiště A", True, conn=db_conn)
@@ -67,9 +119,10 @@ def test_add_and_get_reservation(db_conn):
     user_id = get_all_users(conn=db_conn)[0][0]
     facility_id = get_all_facilities(conn=db_conn)[0][0]
     today = date.today()
-    add_reservation(user_id, facility_id, today, time(10, 0), time(11, 0), conn=db_conn)
+    add_reservation(user_id, facility_id, datetime.combine(today, time(10, 0)),
+                    datetime.combine(today, time(11, 0)), conn=db_conn)
     reservations = get_all_reservations(conn=db_conn)
-    assert any(r[1] == "ResUser" for r in reservations)
+    assert any(r[1] == user_id for r in reservations)
 
 # Test: změna stavu rezervace
 def test_update_reservation_status(db_conn):
@@ -78,13 +131,113 @@ def test_update_reservation_status(db_conn):
     user_id = get_all_users(conn=db_conn)[0][0]
     facility_id = get_all_facilities(conn=db_conn)[0][0]
     today = date.today()
-    add_reservation(user_id, facility_id, today, time(12, 0), time(13, 0), conn=db_conn)
+    add_reservation(user_id, facility_id, datetime.combine(today, time(12, 0)),
+                    datetime.combine(today, time(13, 0)), conn=db_conn)
 
     reservation_id = get_all_reservations(conn=db_conn)[0][0]
     update_reservation_status(reservation_id, "confirmed", conn=db_conn)
     updated = get_all_reservations(conn=db_conn)[0]
     assert updated[-1] == "confirmed"
 
+# Test: hromadné zrušení celého dne sportoviště podle filtru
+def test_bulk_update_reservation_status(db_conn):
+    add_user("BulkUser", "bulkstatus@example.com", "pass", conn=db_conn)
+    add_facility("Hřiště H", "Hromadný test", True, conn=db_conn)
+    user_id = get_all_users(conn=db_conn)[0][0]
+    facility_id = get_all_facilities(conn=db_conn)[0][0]
+    day = date(2030, 5, 1)
+    for hour in (9, 11):
+        add_reservation(user_id, facility_id, datetime.combine(day, time(hour, 0)),
+                        datetime.combine(day, time(hour + 1, 0)), conn=db_conn)
+
+    updated, skipped = bulk_update_reservation_status(
+        "cancelled", facility_id=facility_id, date=day, status="pending", conn=db_conn)
+    assert len(updated) == 2 and skipped == []
+    assert all(r[-1] == "cancelled" for r in get_all_reservations(conn=db_conn))
+
+    # Zrušenou rezervaci už potvrdit nelze; do stavu pending se nepřechází vůbec
+    assert bulk_update_reservation_status("confirmed", ids=updated, conn=db_conn) == ([], updated)
+    with pytest.raises(ValueError):
+        bulk_update_reservation_status("pending", ids=updated, conn=db_conn)
+
+# Test: dávka z fronty – kolize uvnitř dávky i s existující rezervací se odmítne, zbytek se vloží
+def test_add_queued_reservations(db_conn):
+    add_user("QueueUser", "queue@example.com", "pass", conn=db_conn)
+    add_facility("Hřiště F", "Fronta", True, conn=db_conn)
+    user_id = get_all_users(conn=db_conn)[0][0]
+    facility_id = get_all_facilities(conn=db_conn)[0][0]
+    day = date(2030, 7, 1)
+    existing = add_reservation(user_id, facility_id, datetime.combine(day, time(8, 0)),
+                               datetime.combine(day, time(9, 0)), conn=db_conn)
+
+    def booking(key, start_hour, end_hour, facility=facility_id):
+        return key, (user_id, facility, datetime.combine(day, time(start_hour, 0)),
+                     datetime.combine(day, time(end_hour, 0)), "pending")
+
+    results = add_queued_reservations([
+        booking("a", 10, 12), booking("b", 11, 13), booking("c", 8, 10),
+        booking("d", 12, 13), booking("e", 14, 15, facility=9999),
+    ], conn=db_conn)
+
+    assert results["a"]["state"] == results["d"]["state"] == "created"
+    assert results["b"] == {"state": "rejected", "error": results["b"]["error"],
+                            "conflicts": ["požadavek a"]}
+    assert results["c"]["conflicts"] == [existing]
+    assert results["e"]["state"] == "rejected"
+    stored = {r[0] for r in get_all_reservations(conn=db_conn)}
+    assert {results["a"]["reservation_id"], results["d"]["reservation_id"]} <= stored
+
+# Test: dávka z fronty – kolize s rezervací přes půlnoc (uložené i dříve přijaté v dávce)
+def test_add_queued_reservations_over_midnight(db_conn):
+    add_user("NightQueue", "nightqueue@example.com", "pass", conn=db_conn)
+    add_facility("Hřiště Q", "Fronta", True, conn=db_conn)
+    user_id = get_all_users(conn=db_conn)[0][0]
+    facility_id = get_all_facilities(conn=db_conn)[0][0]
+    existing = add_reservation(user_id, facility_id, datetime(2030, 7, 1, 23, 0),
+                               datetime(2030, 7, 2, 1, 0), conn=db_conn)
+
+    def booking(key, start, end):
+        return key, (user_id, facility_id, start, end, "pending")
+
+    results = add_queued_reservations([
+        booking("a", datetime(2030, 7, 2, 0, 30), datetime(2030, 7, 2, 1, 30)),
+        booking("b", datetime(2030, 7, 2, 22, 0), datetime(2030, 7, 3, 2, 0)),
+        booking("c", datetime(2030, 7, 3, 1, 0), datetime(2030, 7, 3, 3, 0)),
+    ], conn=db_conn)
+
+    assert results["a"]["conflicts"] == [existing]
+    assert results["b"]["state"] == "created"
+    assert results["c"]["conflicts"] == ["požadavek b"]
+
+# Fixture: zapnutý slotový model (SLOT_BOOKING) jen pro jeden test
+@pytest.fixture
+def slot_booking(monkeypatch):
+    monkeypatch.setenv("SLOT_BOOKING", "true")
+    monkeypatch.setenv("SLOT_MINUTES", "30")
+    reload_settings()
+    yield
+    monkeypatch.undo()
+    reload_settings()
+
+# Test: slotový model – kolizi odmítne unikátní klíč, zrušení sloty uvolní
+def test_slot_booking_conflict(db_conn, slot_booking):
+    add_user("SlotUser", "slot@example.com", "pass", conn=db_conn)
+    add_facility("Hřiště Z", "Sloty", True, conn=db_conn)
+    user_id = get_all_users(conn=db_conn)[0][0]
+    facility_id = get_all_facilities(conn=db_conn)[0][0]
+    day = date(2030, 6, 1)
+
+    first = add_reservation(user_id, facility_id, datetime.combine(day, time(10, 0)),
+                            datetime.combine(day, time(11, 0)), conn=db_conn)
+    with pytest.raises(ReservationConflictError) as excinfo:
+        add_reservation(user_id, facility_id, datetime.combine(day, time(10, 30)),
+                        datetime.combine(day, time(12, 0)), conn=db_conn)
+    assert excinfo.value.conflicting_ids == [first]
+
+    update_reservation_status(first, "cancelled", conn=db_conn)
+    add_reservation(user_id, facility_id, datetime.combine(day, time(10, 30)),
+                    datetime.combine(day, time(12, 0)), conn=db_conn)
+
 # Test: smazání rezervace
 def test_delete_reservation(db_conn):
     add_user("DelUser", "delres@example.com", "pass", conn=db_conn)
@@ -92,9 +245,80 @@ def test_delete_reservation(db_conn):
     user_id = get_all_users(conn=db_conn)[0][0]
     facility_id = get_all_facilities(conn=db_conn)[0][0]
     today = date.today()
-    add_reservation(user_id, facility_id, today, time(14, 0), time(15, 0), conn=db_conn)
+    add_reservation(user_id, facility_id, datetime.combine(today, time(14, 0)),
+                    datetime.combine(today, time(15, 0)), conn=db_conn)
 
     reservation_id = get_all_reservations(conn=db_conn)[0][0]
     delete_reservation(reservation_id, conn=db_conn)
     reservations = get_all_reservations(conn=db_conn)
-    assert all(r[0] != reservation_id for r in reservations)
\ No newline at end of file
+    assert all(r[0] != reservation_id for r in reservations)
+
+# Test: překrývající se rezervace je odmítnuta, navazující projde
+def test_add_reservation_conflict(db_conn):
+    add_user("ConflictUser", "conflict@example.com", "pass", conn=db_conn)
+    add_facility("Hřiště K", "Kolize test", True, conn=db_conn)
+    user_id = get_all_users(conn=db_conn)[0][0]
+    facility_id = get_all_facilities(conn=db_conn)[0][0]
+    start = datetime(2030, 1, 1, 10, 0)
+
+    first_id = add_reservation(user_id, facility_id, start, start + timedelta(hours=1), conn=db_conn)
+    with pytest.raises(ReservationConflictError) as exc:
+        add_reservation(user_id, facility_id, start + timedelta(minutes=30),
+                        start + timedelta(hours=2), conn=db_conn)
+    assert exc.value.conflicting_ids == [first_id]
+
+    add_reservation(user_id, facility_id, start + timedelta(hours=1),
+                    start + timedelta(hours=2), conn=db_conn)
+
+# Test: rezervace přes půlnoc koliduje i s rezervací následujícího dne (index nenačtený i načtený)
+def test_add_reservation_conflict_over_midnight(db_conn):
+    add_user("NightUser", "night@example.com", "pass", conn=db_conn)
+    add_facility("Hřiště N", "Půlnoc test", True, conn=db_conn)
+    add_facility("Hřiště M", "Půlnoc test", True, conn=db_conn)
+    user_id = get_all_users(conn=db_conn)[0][0]
+    first_facility, second_facility = [f[0] for f in get_all_facilities(conn=db_conn)]
+    evening, night = datetime(2030, 1, 1, 23, 0), datetime(2030, 1, 2, 0, 30)
+
+    overnight = add_reservation(user_id, first_facility, evening, evening + timedelta(hours=2), conn=db_conn)
+    with pytest.raises(ReservationConflictError) as exc:
+        add_reservation(user_id, first_facility, night, night + timedelta(hours=1), conn=db_conn)
+    assert exc.value.conflicting_ids == [overnight]
+
+    # Den 2. 1. je v indexu už načtený – rezervace přes půlnoc se do něj musí propsat
+    add_reservation(user_id, second_facility, datetime(2030, 1, 2, 10, 0), datetime(2030, 1, 2, 11, 0),
+                    conn=db_conn)
+    overnight = add_reservation(user_id, second_facility, evening, evening + timedelta(hours=2), conn=db_conn)
+    with pytest.raises(ReservationConflictError) as exc:
+        add_reservation(user_id, second_facility, night, night + timedelta(hours=1), conn=db_conn)
+    assert exc.value.conflicting_ids == [overnight]
+    add_reservation(user_id, second_facility, night + timedelta(minutes=30), night + timedelta(hours=1),
+                    conn=db_conn)
+
+# Test: filtry rozsahem data a denního času
+def test_filtered_reservations_ranges(db_conn):
+    add_user("RangeUser", "range@example.com", "pass", conn=db_conn)
+    add_facility("Hřiště F", "Filtr test", True, conn=db_conn)
+    user_id = get_all_users(conn=db_conn)[0][0]
+    facility_id = get_all_facilities(conn=db_conn)[0][0]
+    for start in (datetime(2030, 1, 1, 10, 0), datetime(2030, 1, 3, 18, 0), datetime(2030, 1, 10, 18, 0)):
+        add_reservation(user_id, facility_id, start, start + timedelta(hours=1), conn=db_conn)
+
+    week = get_filtered_reservations(facility_id=facility_id, date_from="2030-01-01",
+                                     date_to="2030-01-07", conn=db_conn)
+    assert [r["start_at"] for r in week] == [datetime(2030, 1, 1, 10, 0), datetime(2030, 1, 3, 18, 0)]
+
+    evenings = get_filtered_reservations(facility_id=facility_id, date_from="2030-01-01",
+                                         date_to="2030-01-07", time_from="17:00", time_to="20:00",
+                                         conn=db_conn)
+    assert [r["start_at"] for r in evenings] == [datetime(2030, 1, 3, 18, 0)]
+
+# Test: připojení se po close() vrací do poolu a znovu se použije
+def test_pool_reuses_connection():
+    conn = connect_to_db(testing=True)
+    raw = conn._raw
+    conn.close()
+
+    conn_again = connect_to_db(testing=True)
+    assert conn_again._raw is raw
+    assert conn_again.is_connected()
+    conn_again.close()
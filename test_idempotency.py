@@ -0,0 +1,44 @@
+import threading
+import pytest
+from idempotency import (
+    MemoryIdempotencyStore, StoredResponse, IdempotencyKeyReused, IdempotencyInProgress)
+
+def test_replay_after_complete():
+    store = MemoryIdempotencyStore(ttl=10)
+    assert store.begin("k", "a") is None
+    store.complete("k", StoredResponse(201, '{"id": 1}', "application/json"))
+    stored = store.begin("k", "a")
+    assert (stored.status_code, stored.body) == (201, '{"id": 1}')
+
+def test_key_reused_with_other_body():
+    store = MemoryIdempotencyStore()
+    store.begin("k", "a")
+    store.complete("k", StoredResponse(201, "", "application/json"))
+    with pytest.raises(IdempotencyKeyReused):
+        store.begin("k", "b")
+
+# Test: souběžný duplikát počká na první požadavek a dostane jeho odpověď
+def test_concurrent_duplicate_waits():
+    store = MemoryIdempotencyStore(wait_timeout=5)
+    assert store.begin("k", "a") is None
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(store.begin("k", "a")))
+    waiter.start()
+    store.complete("k", StoredResponse(201, "ok", "text/plain"))
+    waiter.join(5)
+    assert results[0].body == "ok"
+
+def test_in_progress_timeout_and_abort():
+    store = MemoryIdempotencyStore(wait_timeout=0.01)
+    store.begin("k", "a")
+    with pytest.raises(IdempotencyInProgress):
+        store.begin("k", "a")
+    store.abort("k")
+    assert store.begin("k", "a") is None
+
+def test_expired_key_runs_again(clock):
+    store = MemoryIdempotencyStore(ttl=10, clock=clock)
+    store.begin("k", "a")
+    store.complete("k", StoredResponse(201, "", "text/plain"))
+    clock.now = 11
+    assert store.begin("k", "a") is None
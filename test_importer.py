@@ -0,0 +1,42 @@
+import io
+import pytest
+from datetime import datetime
+from importer import parse_ndjson, parse_csv, parse_stream, validate_user, validate_reservation, batched
+
+def test_parse_ndjson_reports_bad_lines():
+    rows = list(parse_ndjson(['{"username": "a"}\n', '\n', 'nesmysl\n', '[1]\n']))
+    assert rows[0] == (1, {"username": "a"}, None)
+    assert [(line, error is not None) for line, _, error in rows[1:]] == [(3, True), (4, True)]
+
+# Test: prázdné hodnoty CSV se berou jako chybějící, čísla řádků počítají i hlavičku
+def test_parse_csv():
+    stream = io.BytesIO("username,email,role\nž,z@example.com,\n".encode("utf-8"))
+    rows = list(parse_stream(stream, "csv"))
+    assert rows == [(2, {"username": "ž", "email": "z@example.com"}, None)]
+    assert list(parse_csv(["a\n", "1,2\n"]))[0][2] is not None
+
+def test_validate_user():
+    assert validate_user({"username": "a", "email": "a@b.cz", "password": "x"}) == ("a", "a@b.cz", "x", "user")
+    with pytest.raises(ValueError):
+        validate_user({"username": "a", "email": "a@b.cz", "password": "x", "role": "root"})
+    with pytest.raises(ValueError):
+        validate_user({"username": ["a"], "email": "a@b.cz", "password": 123})
+
+def test_validate_reservation():
+    values = validate_reservation({"user_id": "1", "facility_id": 2, "date": "2030-01-01",
+                                   "start_time": "10:00", "end_time": "11:30"})
+    assert values == (1, 2, datetime(2030, 1, 1, 10, 0), datetime(2030, 1, 1, 11, 30), "pending")
+    with pytest.raises(ValueError):
+        validate_reservation({"user_id": 1, "facility_id": 2,
+                              "start_at": "2030-01-01 11:00", "end_at": "2030-01-01 10:00"})
+
+# Test: hodnota špatného typu (z NDJSON) je chyba řádku, ne výjimka importu
+@pytest.mark.parametrize("field, value", [("user_id", [1]), ("facility_id", {"id": 2}), ("user_id", True),
+                                          ("status", ["pending"])])
+def test_validate_reservation_bad_types(field, value):
+    data = {"user_id": 1, "facility_id": 2, "start_at": "2030-01-01 10:00", "end_at": "2030-01-01 11:00"}
+    with pytest.raises(ValueError):
+        validate_reservation(dict(data, **{field: value}))
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
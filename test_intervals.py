@@ -0,0 +1,42 @@
+from intervals import IntervalIndex, ReservationIndex
+
+# Test: překryvy včetně dotyku hranic (konec = začátek nekoliduje)
+def test_overlaps():
+    index = IntervalIndex([(600, 660, 1), (660, 720, 2), (900, 960, 3)])
+    assert index.overlaps(630, 690) == [1, 2]
+    assert index.overlaps(720, 900) == []
+    assert index.overlaps(540, 600) == []
+    assert index.overlaps(0, 1440) == [1, 2, 3]
+
+# Test: dlouhý interval se najde, i když začíná dávno před dotazem
+def test_overlaps_long_interval():
+    index = IntervalIndex([(480, 1200, 1), (500, 510, 2), (900, 910, 3)])
+    assert index.overlaps(1000, 1010) == [1]
+
+def test_remove():
+    index = IntervalIndex([(600, 660, 1)])
+    assert index.remove(1)
+    assert index.overlaps(600, 660) == []
+    assert not index.remove(1)
+
+# Test: po odebrání nejdelšího intervalu se mez prohledávání zase zúží
+def test_remove_longest_interval():
+    index = IntervalIndex([(0, 1440, 1), (600, 610, 2), (900, 930, 3)])
+    index.remove(1)
+    assert index._max_length == 30
+    assert index.overlaps(905, 906) == [3]
+
+# Test: nenačtený den vrací None, načtený den se doplňuje o nové rezervace
+def test_reservation_index():
+    registry = ReservationIndex(maxsize=1)
+    assert registry.overlaps(1, "2030-01-01", 600, 660) is None
+
+    registry.put(1, "2030-01-01", IntervalIndex())
+    registry.add(1, "2030-01-01", 600, 660, 7)
+    assert registry.overlaps(1, "2030-01-01", 630, 640) == [7]
+
+    registry.put(2, "2030-01-01", IntervalIndex())
+    assert registry.overlaps(1, "2030-01-01", 630, 640) is None
+
+    registry.invalidate(2)
+    assert registry.overlaps(2, "2030-01-01", 0, 10) is None
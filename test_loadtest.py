@@ -0,0 +1,31 @@
+import pytest
+from loadtest import Scenario, parse_mix, run_load
+
+class FakeTarget:
+    def __init__(self):
+        self.booked = set()
+
+    def request(self, method, path, body=None):
+        if method == "POST":
+            key = (body["facility_id"], body["date"], body["start_time"])
+            if key in self.booked:
+                return 409, "{}"
+            self.booked.add(key)
+            return 201, "{}"
+        return (500, "chyba") if path.startswith("/users/") else (200, "[]")
+
+def test_parse_mix():
+    assert parse_mix("list=70,get=20,book=10") == {"list": 70, "get": 20, "book": 10}
+    with pytest.raises(ValueError):
+        parse_mix("delete=10")
+
+# Test: krátký běh – rezervace do obsazeného termínu končí 409 (ne chybou), 5xx se počítá do error_rate
+def test_run_load_reports_per_operation():
+    scenario = Scenario(users=10, facilities=3, reservations=100, days=5, conflict_rate=0.5, seed=1)
+    report = run_load(FakeTarget(), scenario, {"book": 1, "get": 1}, rps=400, concurrency=4, duration=0.25)
+
+    book, get = report["operations"]["book"], report["operations"]["get"]
+    assert report["requests"] == book["count"] + get["count"] > 0
+    assert book["error_rate"] == 0 and "201" in book["statuses"]
+    assert 0 < get["error_rate"] < 1
+    assert sum(book["histogram"].values()) == book["count"]
@@ -0,0 +1,48 @@
+import io
+import json
+import logging
+from dataclasses import replace
+import pytest
+from config import get_settings
+from logging_setup import configure_logging, parse_levels, shutdown_logging
+
+@pytest.fixture
+def log_output():
+    stream = io.StringIO()
+    yield stream
+    shutdown_logging()
+    logging.getLogger("test_modul").setLevel(logging.NOTSET)
+
+def _configure(stream, **overrides):
+    configure_logging(replace(get_settings(testing=True), **overrides), stream=stream)
+
+# Test: záznam projde frontou a vyjde jako JSON včetně polí z extra
+def test_json_output(log_output):
+    _configure(log_output, log_level="INFO", log_levels="", log_format="json")
+    logging.getLogger("test_modul").info("Rezervace %s smazána", 7, extra={"user_id": 3})
+    shutdown_logging()
+    entry = json.loads(log_output.getvalue().splitlines()[-1])
+    assert entry["message"] == "Rezervace 7 smazána"
+    assert (entry["level"], entry["logger"], entry["user_id"]) == ("INFO", "test_modul", 3)
+
+# Test: úroveň pro jeden modul – vypnutá úroveň argumenty vůbec neformátuje
+def test_per_module_level(log_output):
+    _configure(log_output, log_level="INFO", log_levels="test_modul=WARNING", log_format="text")
+
+    formatted = []
+
+    class Expensive:
+        def __str__(self):
+            formatted.append(True)
+            return "drahé"
+
+    logging.getLogger("test_modul").info("%s", Expensive())
+    assert not formatted
+    logging.getLogger("test_modul").warning("varování %s", Expensive())
+    shutdown_logging()
+    assert "varování drahé" in log_output.getvalue()
+
+def test_parse_levels():
+    assert parse_levels("repository=warning, db=DEBUG") == {"repository": "WARNING", "db": "DEBUG"}
+    with pytest.raises(ValueError):
+        parse_levels("repository=HLASITE")
@@ -0,0 +1,32 @@
+from metrics import Histogram, current_request, end_request, record_query, record_rows, start_request
+
+def test_histogram_render_is_cumulative():
+    histogram = Histogram("latency_seconds", "Test", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    text = histogram.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+def test_request_stats_collect_queries_and_rows():
+    stats = start_request()
+    try:
+        record_query(0.002)
+        record_query(0.003)
+        record_rows(7)
+        assert current_request() is stats
+        assert (stats.queries, stats.rows) == (2, 7)
+        assert stats.server_timing(0.01).startswith('db;desc="2 queries, 7 rows";dur=5.00')
+    finally:
+        end_request()
+    # Mimo požadavek se počítadla požadavku nemění
+    record_rows(1)
+    assert current_request() is None
+
+def test_label_escaping():
+    histogram = Histogram("h", "Test", ("route",), buckets=(1,))
+    histogram.observe(0, 'a"b')
+    assert 'route="a\\"b"' in histogram.render()
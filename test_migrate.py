@@ -0,0 +1,38 @@
+import pytest
+from mysql.connector import errorcode
+from migrate import MigrationError, _already_applied, apply_migrations, list_migrations
+from sqlite_backend import connect
+
+# Test: chyba "už existuje" se přeskočí jen u příkazu, který je tím idempotentní
+def test_already_applied_only_for_idempotent_statements():
+    add_columns = "ALTER TABLE reservations\n    ADD COLUMN start_at DATETIME NULL,\n    ADD COLUMN end_at DATETIME NULL"
+    assert _already_applied(add_columns, errorcode.ER_DUP_FIELDNAME)
+    assert _already_applied("CREATE UNIQUE INDEX uq ON t (a, b)", errorcode.ER_DUP_KEYNAME)
+    assert _already_applied("ALTER TABLE t ADD COLUMN role ENUM('a', 'b'), ADD COLUMN q INT",
+                            errorcode.ER_DUP_FIELDNAME)
+    assert not _already_applied("ALTER TABLE t ADD COLUMN x INT, MODIFY y INT NOT NULL",
+                                errorcode.ER_DUP_FIELDNAME)
+    assert not _already_applied("UPDATE t SET a = 1", errorcode.ER_DUP_FIELDNAME)
+    assert not _already_applied("CREATE TABLE t (a INT)", errorcode.ER_DUP_KEYNAME)
+
+# Test: staré rezervace bez času migraci 0004 zastaví dřív, než cokoli změní
+def test_precheck_rejects_legacy_nulls(tmp_path):
+    conn = connect(str(tmp_path / "legacy.db"), bootstrap=False)
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE reservations (id INT AUTO_INCREMENT PRIMARY KEY, date DATE NULL,"
+                   " start_time TIME NULL, end_time TIME NULL)")
+    cursor.execute("INSERT INTO reservations (date, start_time, end_time) VALUES ('2020-01-01', NULL, '10:00')")
+    conn.commit()
+    migration = next(path for version, _, path in list_migrations() if version == 4)
+    (tmp_path / "migrations").mkdir()
+    (tmp_path / "migrations" / "0004_reservation_datetime_range.sql").write_text(
+        open(migration, encoding="utf-8").read(), encoding="utf-8")
+
+    with pytest.raises(MigrationError):
+        apply_migrations(conn=conn, directory=str(tmp_path / "migrations"))
+    cursor.execute("SELECT COUNT(*) FROM schema_version")
+    assert cursor.fetchone()[0] == 0
+    cursor.execute("SELECT * FROM reservations")
+    assert [column[0] for column in cursor.description] == ["id", "date", "start_time", "end_time"]
+    cursor.close()
+    conn.close()
@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+from occupancy import DayOccupancy, OccupancyIndex, build_day
+
+DAY = date(2030, 1, 5)
+FACILITIES = [
+    {"id": 1, "available": True, "opening_time": timedelta(hours=8), "closing_time": timedelta(hours=22)},
+    {"id": 2, "available": True, "opening_time": None, "closing_time": None},
+    {"id": 3, "available": False, "opening_time": None, "closing_time": None},
+]
+RESERVATIONS = [
+    {"facility_id": 1, "start_at": datetime(2030, 1, 5, 18, 0), "end_at": datetime(2030, 1, 5, 19, 0)},
+    # Rezervace z předchozího dne zasahující přes půlnoc
+    {"facility_id": 2, "start_at": datetime(2030, 1, 4, 23, 0), "end_at": datetime(2030, 1, 5, 9, 0)},
+]
+
+def _day():
+    return build_day(DAY, FACILITIES, RESERVATIONS, 15, "08:00", "22:00")
+
+def test_free_facilities():
+    occupancy = _day()
+    assert occupancy.free_facilities(18 * 60, 20 * 60) == [2]
+    assert occupancy.free_facilities(19 * 60, 20 * 60) == [1, 2]
+    assert occupancy.free_facilities(7 * 60, 8 * 60) == []
+
+# Test: první volné okno dané délky – zavřeno, přes půlnoc i obsazeno se přeskočí
+def test_first_free():
+    assert _day().first_free(90, 8 * 60, 22 * 60) == [(1, 8 * 60, 9 * 60 + 30), (2, 9 * 60, 10 * 60 + 30)]
+    assert _day().first_free(90, 17 * 60, 19 * 60 + 30) == [(2, 17 * 60, 18 * 60 + 30)]
+
+def test_index_mark_and_invalidate():
+    index = OccupancyIndex(slot_minutes=15)
+    version = index.version()
+    index.put(DAY, _day(), version)
+    index.mark(2, datetime(2030, 1, 5, 19, 0), datetime(2030, 1, 5, 20, 0))
+    assert index.get(DAY).free_facilities(19 * 60, 20 * 60) == [1]
+
+    index.invalidate(DAY - timedelta(days=1))
+    assert index.get(DAY) is None
+
+# Test: výsledek sestavený před souběžným zápisem se neuloží
+def test_index_put_stale():
+    index = OccupancyIndex(slot_minutes=15)
+    version = index.version()
+    index.invalidate(DAY)
+    index.put(DAY, DayOccupancy([1], 15), version)
+    assert index.get(DAY) is None
+
+# Test: den se po ttl sestaví znovu – ani mark() jeho platnost neprodlouží
+def test_index_ttl(clock):
+    index = OccupancyIndex(slot_minutes=15, ttl=10, clock=clock)
+    index.put(DAY, _day(), index.version())
+    clock.now = 9
+    index.mark(1, datetime(2030, 1, 5, 10, 0), datetime(2030, 1, 5, 11, 0))
+    assert index.get(DAY) is not None
+    clock.now = 10
+    assert index.get(DAY) is None
@@ -0,0 +1,61 @@
+import logging
+from db import InstrumentedCursor
+from metrics import end_request, start_request
+from profiler import QueryProfiler, QueryRecord, check_query_budget, normalize_sql
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT * FROM users WHERE 1=1\n  AND role = %s") == \
+        "SELECT * FROM users WHERE ?=? AND role = %s"
+    assert normalize_sql("SELECT id FROM users WHERE id IN (%s, %s, %s)") == \
+        normalize_sql("SELECT id FROM users WHERE id IN (%s)")
+    assert normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == \
+        "INSERT INTO t (a, b) VALUES (...)"
+    assert normalize_sql("UPDATE users SET email = 'x@y.cz' WHERE id = 5") == \
+        "UPDATE users SET email = ? WHERE id = ?"
+
+def test_stats_aggregate_by_shape():
+    profiler = QueryProfiler(slow_ms=0)
+    for ids in ((1,), (1, 2)):
+        query = QueryRecord(f"SELECT * FROM users WHERE id IN ({', '.join(['%s'] * len(ids))})", ids, False, 0.01)
+        query.rows = len(ids)
+        profiler.finish(query, len(ids))
+    [entry] = profiler.stats()
+    assert (entry["count"], entry["rows_returned"], entry["rows_affected"]) == (2, 3, 0)
+
+def test_slow_query_logged(caplog):
+    profiler = QueryProfiler(slow_ms=5)
+    with caplog.at_level(logging.WARNING, logger="sportbooking.slow_query"):
+        profiler.finish(QueryRecord("UPDATE users SET role = %s", ("admin",), False, 0.001), 1)
+        profiler.finish(QueryRecord("UPDATE users SET role = %s", ("admin",), False, 0.02), 3)
+    [record] = caplog.records
+    assert record.query["duration_ms"] == 20.0
+    assert record.query["rows_affected"] == 3
+
+def test_query_budget(caplog):
+    stats = start_request()
+    stats.statements = []
+    try:
+        cursor = InstrumentedCursor(FakeCursor())
+        for user_id in range(3):
+            cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+            cursor.fetchall()
+        assert stats.queries == 3 and stats.rows == 3
+        with caplog.at_level(logging.WARNING, logger="sportbooking.slow_query"):
+            assert not check_query_budget(stats, 5, "GET", "/users")
+            assert check_query_budget(stats, 2, "GET", "/users")
+        assert caplog.records[0].query_budget["top"][0]["count"] == 3
+    finally:
+        end_request()
+
+
+class FakeCursor:
+    rowcount = 1
+
+    def execute(self, operation, params=None):
+        pass
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
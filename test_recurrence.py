@@ -0,0 +1,33 @@
+import pytest
+from datetime import date, datetime
+from recurrence import expand_rule, parse_exclude, format_exclude
+
+START = datetime(2030, 1, 1, 18, 0)
+END = datetime(2030, 1, 1, 20, 0)
+
+def test_weekly_until():
+    occurrences = expand_rule(START, END, "weekly", until=date(2030, 1, 22))
+    assert [s.date() for s, _ in occurrences] == [date(2030, 1, d) for d in (1, 8, 15, 22)]
+    assert all(e - s == END - START for s, e in occurrences)
+
+# Test: vynechané dny se do count nepočítají
+def test_daily_count_with_exclude():
+    occurrences = expand_rule(START, END, "daily", interval=2, count=3, exclude={date(2030, 1, 3)})
+    assert [s.day for s, _ in occurrences] == [1, 5, 7]
+
+def test_invalid_rule():
+    with pytest.raises(ValueError):
+        expand_rule(START, END, "monthly", count=1)
+    with pytest.raises(ValueError):
+        expand_rule(START, END, "daily")
+    with pytest.raises(ValueError):
+        expand_rule(START, END, "daily", until=date(2040, 1, 1))
+    # Výskyt delší než krok by kolidoval s následujícím
+    with pytest.raises(ValueError):
+        expand_rule(START, datetime(2030, 1, 2, 19, 0), "daily", count=2)
+    assert len(expand_rule(START, datetime(2030, 1, 2, 18, 0), "daily", count=2)) == 2
+
+def test_exclude_roundtrip():
+    days = parse_exclude(["2030-01-08", date(2030, 1, 1)])
+    assert format_exclude(days) == "2030-01-01,2030-01-08"
+    assert format_exclude(set()) is None
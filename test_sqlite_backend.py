@@ -0,0 +1,109 @@
+import threading
+import pytest
+from datetime import datetime, date, timedelta
+from mysql.connector import errorcode
+from mysql.connector.errors import IntegrityError
+from migrate import apply_migrations, list_migrations
+from repository import add_user, add_facility, add_reservation, get_filtered_reservations, ReservationConflictError
+from repository import entity_cache, occupancy_index
+from availability import availability_cache
+from intervals import reservation_index
+from sqlite_backend import MEMORY, connect, translate
+
+def test_translate_mysql_queries():
+    assert translate("SELECT id FROM reservations WHERE facility_id = %s FOR UPDATE") == (
+        "write", ("SELECT id FROM reservations WHERE facility_id = ?",))
+    kind, (sql,) = translate("SELECT id FROM t WHERE (a, b) IN ((%s, %s), (%s, %s))")
+    assert kind == "read" and sql == "SELECT id FROM t WHERE (a, b) IN (VALUES (?, ?), (?, ?))"
+    assert translate("SET FOREIGN_KEY_CHECKS = 0") == ("foreign_keys", ("PRAGMA foreign_keys = OFF",))
+    assert translate("TRUNCATE TABLE users")[1][0] == "DELETE FROM users"
+
+def test_translate_create_table():
+    kind, statements = translate("""
+        CREATE TABLE IF NOT EXISTS t (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            role ENUM('admin', 'user') NOT NULL DEFAULT 'user',
+            UNIQUE KEY uq_t_role (role),
+            INDEX idx_t_id (id, role)
+        ) ENGINE=InnoDB
+    """)
+    assert kind == "ddl"
+    assert "id INTEGER PRIMARY KEY AUTOINCREMENT" in statements[0]
+    assert "role TEXT CHECK (role IN ('admin', 'user')) NOT NULL DEFAULT 'user'" in statements[0]
+    assert statements[1:] == ("CREATE UNIQUE INDEX IF NOT EXISTS uq_t_role ON t (role)",
+                              "CREATE INDEX IF NOT EXISTS idx_t_id ON t (id, role)")
+
+# Fixture: samostatná souborová databáze (nezávisle na DB_BACKEND)
+@pytest.fixture
+def sqlite_conn(tmp_path):
+    conn = connect(str(tmp_path / "sportbooking_test.db"))
+    yield conn
+    conn.close()
+    # Cache jsou společné pro proces – nesmí přenést data do dalších testů
+    for cache in (availability_cache, reservation_index, entity_cache, occupancy_index):
+        cache.clear()
+
+# Test: schéma z databaze_struktura.sql, migrace jsou zapsané jako aplikované
+def test_bootstrap_schema(sqlite_conn):
+    cursor = sqlite_conn.cursor()
+    cursor.execute("SELECT MAX(version) FROM schema_version")
+    assert cursor.fetchone()[0] == list_migrations()[-1][0]
+    cursor.execute("SHOW INDEX FROM reservations")
+    assert "idx_reservations_facility_start" in {row[2] for row in cursor.fetchall()}
+    assert apply_migrations(conn=sqlite_conn) == []
+
+# Test: typy a chyby jako u mysql.connector
+def test_types_and_errors(sqlite_conn):
+    cursor = sqlite_conn.cursor(dictionary=True)
+    cursor.execute("INSERT INTO users (username, email, password) VALUES (%s, %s, %s)", ("a", "a@example.com", "pw"))
+    cursor.execute("INSERT INTO facilities (name) VALUES (%s)", ("Kurt",))
+    cursor.execute("INSERT INTO reservations (user_id, facility_id, start_at, end_at) VALUES (%s, %s, %s, %s)",
+                   (1, 1, datetime(2030, 1, 1, 8, 0), datetime(2030, 1, 1, 9, 30)))
+    sqlite_conn.commit()
+    cursor.execute("SELECT start_at, date, end_time, MAX(end_at) FROM reservations")
+    row = cursor.fetchone()
+    assert row["start_at"] == datetime(2030, 1, 1, 8, 0)
+    assert row["date"] == date(2030, 1, 1)
+    assert row["end_time"] == timedelta(hours=9, minutes=30)
+    assert row["MAX(end_at)"] == datetime(2030, 1, 1, 9, 30)
+    with pytest.raises(IntegrityError) as error:
+        cursor.execute("INSERT INTO users (username, email, password) VALUES ('b', 'a@example.com', 'pw')")
+    assert error.value.errno == errorcode.ER_DUP_ENTRY
+    sqlite_conn.rollback()
+    assert not sqlite_conn.in_transaction
+
+# Test: repository.py nad SQLite včetně kontroly kolizí
+def test_repository_round_trip(sqlite_conn):
+    add_user("Hráč", "hrac@example.com", "pw", conn=sqlite_conn)
+    add_facility("Hala", "Popis", True, conn=sqlite_conn)
+    add_reservation(1, 1, datetime(2030, 1, 1, 10), datetime(2030, 1, 1, 11), conn=sqlite_conn)
+    with pytest.raises(ReservationConflictError):
+        add_reservation(1, 1, datetime(2030, 1, 1, 10, 30), datetime(2030, 1, 1, 12), conn=sqlite_conn)
+    rows = get_filtered_reservations(facility_id=1, date=date(2030, 1, 1), conn=sqlite_conn)
+    assert [(r["start_at"], r["status"]) for r in rows] == [(datetime(2030, 1, 1, 10), "pending")]
+
+def _scalar(conn, query):
+    cursor = conn.cursor()
+    cursor.execute(query)
+    (value,) = cursor.fetchone()
+    cursor.close()
+    return value
+
+# Test: paměťová DB – jiné připojení neuložený zápis nevidí, čtení počká na jeho konec
+def test_memory_no_dirty_reads():
+    writer, reader = connect(MEMORY), connect(MEMORY)
+    try:
+        count = "SELECT COUNT(*) FROM users WHERE email = 'dirty@example.com'"
+        writer.cursor().execute(
+            "INSERT INTO users (username, email, password) VALUES ('d', 'dirty@example.com', 'pw')")
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(_scalar(reader, count)))
+        thread.start()
+        thread.join(0.1)
+        assert seen == []
+        writer.rollback()
+        thread.join(5)
+        assert seen == [0]
+    finally:
+        writer.close()
+        reader.close()